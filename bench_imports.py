@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the CLI.
+
+Each check runs in a fresh interpreter and is repeated; the median wall time
+is reported. A check fails when it imports a module it should not need (the
+deterministic guard) or, with --max-ms, when its median exceeds the budget.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Heavy modules and the checks that must not import them
+HEAVY_MODULES = ("pandas", "pyarrow", "pydantic", "loguru", "numpy", "openpyxl", "tiktoken")
+
+CHECKS = {
+    "import src.main": ("import src.main", HEAVY_MODULES),
+    "austin-excel --help": ("import sys; sys.argv = ['austin-excel', '--help']\n"
+                            "from src.main import app\n"
+                            "try:\n    app()\nexcept SystemExit:\n    pass", HEAVY_MODULES),
+    "austin-excel chunk (startup)": ("import src.main, src.chunker", HEAVY_MODULES),
+}
+
+REPORT = "import sys; print(','.join(m for m in {modules!r} if m in sys.modules))"
+
+
+def run_check(code: str, forbidden, repeat: int):
+    """Return (median seconds, forbidden modules that were imported)."""
+    timings = []
+    loaded = set()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code + "\n" + REPORT.format(modules=tuple(forbidden))],
+            capture_output=True, text=True, check=True
+        )
+        timings.append(time.perf_counter() - started)
+        last_line = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+        loaded.update(name for name in last_line.split(',') if name in forbidden)
+    return statistics.median(timings), sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per check")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when a median exceeds this many ms")
+    args = parser.parse_args()
+
+    baseline, _ = run_check("pass", (), args.repeat)
+    print(f"{'interpreter startup':32s} {baseline * 1000:7.1f} ms")
+
+    failed = False
+    for name, (code, forbidden) in CHECKS.items():
+        median, loaded = run_check(code, forbidden, args.repeat)
+        status = "ok"
+        if loaded:
+            status = f"FAIL imports {', '.join(loaded)}"
+            failed = True
+        elif args.max_ms is not None and median * 1000 > args.max_ms:
+            status = f"FAIL over {args.max_ms:.0f} ms"
+            failed = True
+        print(f"{name:32s} {median * 1000:7.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
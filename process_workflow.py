@@ -5,8 +5,8 @@ Workflow script that combines semantic path building and hierarchical chunking.
 
 import sys
 from pathlib import Path
-from semantic_path_builder import enhance_records_with_semantic_paths
-from chunker import process_jsonl_with_chunking
+from src.semantic_path_builder import enhance_records_with_semantic_paths
+from src.chunker import process_jsonl_with_chunking
 
 
 def main():
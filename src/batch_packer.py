@@ -0,0 +1,176 @@
+"""
+Token-budgeted batch export for embedding workers.
+
+Chunks are tokenized once with the chunker's encoding and stored in a ragged
+layout: one flat `tokens.npy` array of token ids plus an `offsets.npy` array
+where chunk i spans tokens[offsets[i]:offsets[i + 1]]. Chunks are bin-packed
+into batches whose padded size (batch size x longest chunk) stays under a
+token budget; `batches.npy` lists chunk indices batch by batch and
+`batch_offsets.npy` delimits the batches.
+
+Workers can memory-map the arrays with `TokenBatches.load` and skip
+tokenization entirely.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+import numpy as np
+
+from .chunker import encode_tokens
+from .sharding import read_records
+from .tokenizer import ENCODING_NAME
+
+
+def pack_batches(lengths: List[int], token_budget: int,
+                 max_batch_size: Optional[int] = None) -> List[List[int]]:
+    """
+    Group chunk indices into batches whose padded size fits `token_budget`.
+
+    Chunks are sorted longest first so each batch holds similarly sized chunks
+    and padding stays small. A chunk longer than the budget gets a batch of
+    its own.
+    """
+    by_length = sorted(range(len(lengths)), key=lambda i: (-lengths[i], i))
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_max = 0
+    for index in by_length:
+        length = max(lengths[index], 1)
+        longest = max(current_max, length)
+        fits = (len(current) + 1) * longest <= token_budget
+        if max_batch_size is not None and len(current) >= max_batch_size:
+            fits = False
+        if current and not fits:
+            batches.append(current)
+            current, longest = [], length
+        current.append(index)
+        current_max = longest
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def export_batches(input_file: str, output_dir: str, token_budget: int = 8192,
+                   max_batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Tokenize chunk records and write pre-packed batches to `output_dir`.
+
+    The text of each record is its `content`, the same text the chunker
+    counted, so token ids it left in the token cache are reused. Records
+    without text are skipped, and so are parents with chunk children
+    (`has_children`), whose text the children already cover.
+
+    Returns the manifest written alongside the arrays.
+    """
+    anchors: List[Dict[str, Any]] = []
+    token_arrays: List[np.ndarray] = []
+    skipped_parents = 0
+
+    # Reference-form chunk children get their text back from their parent
+    for record in read_records(input_file):
+        if record.get('has_children'):
+            skipped_parents += 1
+            continue
+
+        text = record.get('content')
+        if not text:
+            continue
+
+        token_ids = encode_tokens(text)
+        if token_ids is None:
+            raise RuntimeError("No BPE encoding available; cannot export token ids")
+
+        token_arrays.append(np.asarray(token_ids, dtype=np.uint32))
+        anchors.append({"anchor": record['anchor'], "order": record.get('order')})
+
+    lengths = [len(tokens) for tokens in token_arrays]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    tokens = np.concatenate(token_arrays) if token_arrays else np.zeros(0, dtype=np.uint32)
+
+    batches = pack_batches(lengths, token_budget, max_batch_size)
+    batch_offsets = np.zeros(len(batches) + 1, dtype=np.int64)
+    batch_offsets[1:] = np.cumsum([len(batch) for batch in batches])
+    batch_index = np.array([i for batch in batches for i in batch], dtype=np.int64)
+
+    padded = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+    real = int(offsets[-1])
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    np.save(out / "tokens.npy", tokens)
+    np.save(out / "offsets.npy", offsets)
+    np.save(out / "batches.npy", batch_index)
+    np.save(out / "batch_offsets.npy", batch_offsets)
+    with open(out / "chunks.jsonl", 'w', encoding='utf-8') as f:
+        for entry in anchors:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    manifest = {
+        "source": str(input_file),
+        "encoding": ENCODING_NAME,
+        "token_budget": token_budget,
+        "max_batch_size": max_batch_size,
+        "chunks": len(lengths),
+        "skipped_parents": skipped_parents,
+        "batches": len(batches),
+        "tokens": real,
+        "padded_tokens": padded,
+        "padding_ratio": round((padded - real) / padded, 4) if padded else 0.0,
+    }
+    with open(out / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+class TokenBatches:
+    """Read-only view over an exported batch directory."""
+
+    def __init__(self, tokens: np.ndarray, offsets: np.ndarray,
+                 batch_index: np.ndarray, batch_offsets: np.ndarray):
+        self.tokens = tokens
+        self.offsets = offsets
+        self.batch_index = batch_index
+        self.batch_offsets = batch_offsets
+
+    @classmethod
+    def load(cls, output_dir: str, mmap: bool = True) -> "TokenBatches":
+        """Load (memory-map by default) the arrays written by `export_batches`."""
+        mode = 'r' if mmap else None
+        out = Path(output_dir)
+        return cls(
+            np.load(out / "tokens.npy", mmap_mode=mode),
+            np.load(out / "offsets.npy", mmap_mode=mode),
+            np.load(out / "batches.npy", mmap_mode=mode),
+            np.load(out / "batch_offsets.npy", mmap_mode=mode),
+        )
+
+    def __len__(self) -> int:
+        return len(self.batch_offsets) - 1
+
+    def chunk_tokens(self, chunk: int) -> np.ndarray:
+        """Return the token ids of one chunk (a view, no copy)."""
+        return self.tokens[self.offsets[chunk]:self.offsets[chunk + 1]]
+
+    def batch(self, batch: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Return (chunk indices, token id views) for one batch."""
+        chunks = self.batch_index[self.batch_offsets[batch]:self.batch_offsets[batch + 1]]
+        return chunks, [self.chunk_tokens(int(chunk)) for chunk in chunks]
+
+    def padded_batch(self, batch: int, pad_id: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk indices, padded 2-D token matrix) for one batch."""
+        chunks, rows = self.batch(batch)
+        width = max((len(row) for row in rows), default=0)
+        matrix = np.full((len(rows), width), pad_id, dtype=np.uint32)
+        for i, row in enumerate(rows):
+            matrix[i, :len(row)] = row
+        return chunks, matrix
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, List[np.ndarray]]]:
+        for batch in range(len(self)):
+            yield self.batch(batch)
@@ -0,0 +1,120 @@
+"""
+Checkpoints for resumable ingest and chunk runs.
+
+A checkpoint records how far a run got: the last committed input position
+(sheet row or input record index), the byte length of each output file at
+that point, and any state needed to continue (e.g. the parser's hierarchy
+context). Outputs are flushed and fsynced before the checkpoint is written,
+and the checkpoint itself is replaced atomically, so after a crash every
+output is at least as long as the checkpoint says.
+
+On resume, outputs are truncated back to the checkpointed offsets (dropping
+anything written after the last checkpoint) and reopened for appending.
+"""
+
+import json
+import os
+from typing import Dict, Any, Optional, TextIO
+
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(output_file: str) -> str:
+    return f"{output_file}.checkpoint.json"
+
+
+def input_fingerprint(input_file: str) -> Dict[str, int]:
+    """Size and mtime of the input, used to reject checkpoints from a different input."""
+    stat = os.stat(input_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def commit_output(f: TextIO) -> int:
+    """Flush and fsync an output file and return its committed length in bytes."""
+    f.flush()
+    os.fsync(f.fileno())
+    return f.tell()
+
+
+def open_for_resume(path: str, offset: Optional[int]) -> TextIO:
+    """
+    Open an output for writing; with an `offset`, keep the first `offset`
+    bytes of the existing file and append after them.
+    """
+    if offset is None:
+        return open(path, 'w', encoding='utf-8')
+    with open(path, 'r+b') as f:
+        f.truncate(offset)
+    return open(path, 'a', encoding='utf-8')
+
+
+class Checkpointer:
+    """Load, save and clear the checkpoint of one stage run."""
+
+    def __init__(self, path: str, stage: str, input_file: str, params: Dict[str, Any]):
+        """
+        Args:
+            path: Checkpoint file (see `checkpoint_path`)
+            stage: Stage name ("ingest", "chunk")
+            input_file: Input being processed
+            params: Parameters that affect output; a checkpoint written with
+                different params is not resumed
+        """
+        self.path = path
+        self.stage = stage
+        self.input_file = input_file
+        self.params = params
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the saved checkpoint, or None if there is none.
+
+        Raises ValueError if the checkpoint belongs to a different stage,
+        input or parameter set, or its outputs are shorter than recorded.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        if state.get("version") != CHECKPOINT_VERSION or state.get("stage") != self.stage:
+            raise ValueError(f"{self.path} is not a {self.stage} checkpoint")
+        if state.get("input") != input_fingerprint(self.input_file):
+            raise ValueError(f"{self.input_file} changed since {self.path} was written")
+        if state.get("params") != self.params:
+            raise ValueError(f"Parameters differ from those recorded in {self.path}")
+        for output, offset in state["outputs"].items():
+            if not os.path.exists(output) or os.path.getsize(output) < offset:
+                raise ValueError(f"Output {output} is missing or shorter than its checkpoint")
+        return state
+
+    def save(self, position: int, outputs: Dict[str, int], context: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Atomically record that input up to `position` is committed.
+
+        Args:
+            position: Number of input rows/records fully processed
+            outputs: Output file -> committed length (see `commit_output`)
+            context: Extra state needed to continue (JSON-serializable)
+        """
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "stage": self.stage,
+            "input": input_fingerprint(self.input_file),
+            "params": self.params,
+            "position": position,
+            "outputs": outputs,
+            "context": context or {},
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the run has completed."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
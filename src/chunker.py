@@ -2,131 +2,311 @@
 Hierarchical chunking module for breaking down long content into semantic chunks.
 """
 
-import re
 import hashlib
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from datetime import datetime
 
-try:
-    import tiktoken
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
+import regex as re
+
+from .compression import open_text, detect_compression
+from .sharding import read_records
+from .normalized import NormalizedWriter, is_normalized
+from .reference_chunks import ReferenceEncoder, ReferenceWriter, is_reference
+from .tokenizer import ENCODING_NAME, get_encoding
+
+# Bump when chunking output changes so cached stage outputs are invalidated
+CHUNKER_VERSION = 2
+
+
+# Boundary markers at the start of a (possibly indented) line, outermost level first:
+# letters (A.), numbered items (1., (1), I., (I)) and bullets (•, -, –, *)
+BOUNDARY_LEVELS = ("letter", "number", "bullet")
+BOUNDARY_PATTERN = re.compile(
+    r'^[ \t]*(?:(?P<letter>[A-Z]\.(?=\s))'
+    r'|(?P<number>\(?\d+\)?\.?(?=\s)|\(?[IVX]+\)?\.?(?=\s))'
+    r'|(?P<bullet>[•\-–*](?=\s)))',
+    re.MULTILINE
+)
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\S+')
+
+Span = Tuple[int, int]
+
+
+class Boundary:
+    """A semantic unit of a text: `[start, end)` offsets, marker level and nested units."""
+    
+    __slots__ = ("start", "end", "level", "children")
+    
+    def __init__(self, start: int, end: int, level: int):
+        self.start = start
+        self.end = end
+        self.level = level  # index into BOUNDARY_LEVELS; -1 for the whole text
+        self.children: List["Boundary"] = []
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span": [self.start, self.end],
+            "level": BOUNDARY_LEVELS[self.level] if self.level >= 0 else None,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def scan_boundaries(text: str) -> Boundary:
+    """
+    Scan `text` once and return its boundary tree.
+    
+    Each marker opens a unit that runs until the next marker of the same or
+    an outer level, so bullets nest under numbered items and numbered items
+    under letters. Text before the first marker belongs to the root only.
+    """
+    root = Boundary(0, len(text), -1)
+    stack = [root]
+    for match in BOUNDARY_PATTERN.finditer(text, concurrent=True):
+        level = BOUNDARY_LEVELS.index(match.lastgroup)
+        while stack[-1].level >= level:
+            stack.pop().end = match.start()
+        node = Boundary(match.start(), len(text), level)
+        stack[-1].children.append(node)
+        stack.append(node)
+    return root
 
 
 def split_on_semantic_boundaries(text: str) -> List[str]:
     """
-    Split text on semantic boundaries in order of priority:
+    Split text on its outermost semantic boundaries, in order of priority:
     1. Top-level letters/subsections (A., B., C.)
     2. Numbered items (1., (1), I., (I))
     3. Bullets (•, -, –, *)
+    
+    Text before the first boundary stays with the first part. Matching (here
+    and in the confidence and reference helpers) runs with the GIL released,
+    so records can be chunked on a thread pool.
     """
     if not text:
         return []
     
-    # Split by top-level letters/subsections (A., B., C.)
-    letter_pattern = r'^([A-Z]\.\s+)'
-    if re.search(letter_pattern, text, re.MULTILINE):
-        parts = re.split(letter_pattern, text)
-        # Rejoin the delimiter with its content
-        result = []
-        for i in range(1, len(parts), 2):
-            if i + 1 < len(parts):
-                result.append(parts[i] + parts[i + 1])
-            else:
-                result.append(parts[i])
-        if result:
-            return result
-    
-    # Split by numbered items (1., (1), I., (I))
-    number_pattern = r'^((?:\(?\d+\)?\.?\s+)|(?:\(?[IVX]+\)?\.?\s+))'
-    if re.search(number_pattern, text, re.MULTILINE):
-        parts = re.split(number_pattern, text)
-        result = []
-        for i in range(1, len(parts), 2):
-            if i + 1 < len(parts):
-                result.append(parts[i] + parts[i + 1])
-            else:
-                result.append(parts[i])
-        if result:
-            return result
-    
-    # Split by bullets (•, -, –, *)
-    bullet_pattern = r'^([•\-–*]\s+)'
-    if re.search(bullet_pattern, text, re.MULTILINE):
-        parts = re.split(bullet_pattern, text)
-        result = []
-        for i in range(1, len(parts), 2):
-            if i + 1 < len(parts):
-                result.append(parts[i] + parts[i + 1])
-            else:
-                result.append(parts[i])
-        if result:
-            return result
+    root = scan_boundaries(text)
+    if not root.children:
+        return [text]
+    starts = [0] + [child.start for child in root.children[1:]]
+    ends = [child.end for child in root.children]
+    return [text[start:end] for start, end in zip(starts, ends)]
+
+
+# Optional persistent token cache (see token_cache.TokenCache)
+_token_cache = None
+
+
+def configure_token_cache(cache) -> None:
+    """
+    Install (or remove, with None) the persistent token cache consulted by
+    `tokenize_len` and `encode_tokens`.
+    """
+    global _token_cache
+    _token_cache = cache
+
+
+# Optional calibrated estimator for threshold checks (see token_estimator.TokenEstimator)
+_token_estimator = None
+
+
+def configure_token_estimator(estimator) -> None:
+    """
+    Install (or remove, with None) the estimator `fits_tokens` consults
+    before counting tokens exactly.
+    """
+    global _token_estimator
+    _token_estimator = estimator
+
+
+def encode_tokens(text: str) -> Optional[List[int]]:
+    """
+    Get token ids using the same encoding as `tokenize_len`.
+    Returns None when no BPE encoding is available.
+    """
+    if _token_cache is not None and _token_cache.store_ids:
+        cached = _token_cache.get_ids(text)
+        if cached is not None:
+            return cached
     
-    # If no semantic boundaries found, return the original text
-    return [text]
+    encoding = get_encoding()
+    if encoding is None:
+        return None
+    token_ids = encoding.encode(text, disallowed_special=())
+    
+    if _token_cache is not None:
+        _token_cache.put(text, len(token_ids), token_ids)
+    return token_ids
 
 
 def tokenize_len(text: str) -> int:
     """
     Get token count using tiktoken (GPT-4o mini encoding) if available;
     fallback to simple whitespace count * 0.75 as estimate.
+    Exact counts are served from the token cache when one is configured.
     """
-    if TIKTOKEN_AVAILABLE:
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")  # GPT-4o mini encoding
-            return len(encoding.encode(text))
-        except Exception:
-            pass
+    if _token_cache is not None:
+        cached = _token_cache.get_count(text)
+        if cached is not None:
+            return cached
+    
+    encoding = get_encoding()
+    if encoding is not None:
+        token_ids = encoding.encode(text, disallowed_special=())
+        if _token_cache is not None:
+            _token_cache.put(text, len(token_ids), token_ids)
+        return len(token_ids)
     
     # Fallback: simple whitespace-based estimate
     words = text.split()
     return int(len(words) * 0.75)
 
 
-def window_chunks(text: str, target: int = 250, max_len: int = 320, overlap: int = 40) -> List[str]:
+def _trim_span(text: str, start: int, end: int) -> Optional[Span]:
+    """Shrink `[start, end)` to exclude surrounding whitespace; None if blank."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def fits_tokens(text: str, limit: int, estimate: Optional[float] = None) -> bool:
     """
-    Split text into overlapping windows if it exceeds max_len.
-    Preserves sentence boundaries and avoids breaking inside code/URLs.
+    True if `text` has at most `limit` tokens.
+    Clear-cut cases are settled by the calibrated estimator when one is
+    configured (from `estimate` when already computed); the exact count is
+    taken only near the limit.
     """
-    if tokenize_len(text) <= max_len:
-        return [text]
+    if _token_estimator is not None:
+        if estimate is None:
+            decided = _token_estimator.decide(text, limit)
+        else:
+            decided = _token_estimator.settle(estimate, limit)
+        if decided is not None:
+            return decided
+    return tokenize_len(text) <= limit
+
+
+def _fits_span(text: str, span: Span, limit: int, estimates: Optional[Dict[Span, float]]) -> bool:
+    return fits_tokens(text[span[0]:span[1]], limit, estimates.get(span) if estimates else None)
+
+
+def _unit_estimates(text: str, root: Boundary) -> Optional[Dict[Span, float]]:
+    """
+    Estimated token counts of the boundary-unit spans `_collect_spans` checks,
+    from one batched estimator call; None without an estimator.
+    """
+    if _token_estimator is None:
+        return None
+    spans: List[Span] = []
+    stack = [(root, root.start)]
+    while stack:
+        node, start = stack.pop()
+        if node.level >= 0 and node.children:
+            spans.append((start, node.end))
+        trimmed = _trim_span(text, start, node.end)
+        if trimmed is not None:
+            spans.append(trimmed)
+        stack.extend((child, start if i == 0 else child.start) for i, child in enumerate(node.children))
+    estimates = _token_estimator.estimate([text[s:e] for s, e in spans])
+    return dict(zip(spans, estimates.tolist()))
+
+
+def window_spans(text: str, start: int = 0, end: Optional[int] = None, target: int = 250,
+                 max_len: int = 320, overlap: int = 40,
+                 estimates: Optional[Dict[Span, float]] = None) -> List[Span]:
+    """
+    Split `text[start:end]` into overlapping windows if it exceeds max_len.
     
-    # Split by sentences
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
-    current_chunk = ""
+    Windows are whole sentences; with `overlap`, each window after the first
+    starts at the last five words of the previous one. Returns whitespace-
+    trimmed offset pairs into `text`. `estimates` are precomputed token
+    estimates by span (see `_unit_estimates`).
+    """
+    end = len(text) if end is None else end
+    span = _trim_span(text, start, end)
+    if span is None:
+        return []
+    if _fits_span(text, span, max_len, estimates):
+        return [span]
+    
+    # Sentence spans between the breaks
+    sentences = []
+    position = span[0]
+    for match in SENTENCE_BREAK.finditer(text, span[0], span[1], concurrent=True):
+        sentences.append((position, match.start()))
+        position = match.end()
+    sentences.append((position, span[1]))
     
-    for sentence in sentences:
-        # Skip empty sentences
-        if not sentence.strip():
+    windows: List[Span] = []
+    current: Optional[Span] = None
+    for sentence_start, sentence_end in sentences:
+        if sentence_start >= sentence_end:
+            continue
+        
+        # Check if extending the window to this sentence would exceed target
+        candidate = (current[0] if current else sentence_start, sentence_end)
+        if fits_tokens(text[candidate[0]:candidate[1]], target):
+            current = candidate
             continue
         
-        # Check if adding this sentence would exceed target
-        test_chunk = current_chunk + " " + sentence if current_chunk else sentence
-        if tokenize_len(test_chunk) <= target:
-            current_chunk = test_chunk
+        if current:
+            windows.append(current)
+        if windows and overlap > 0:
+            # Start the new window at the last few words of the previous one
+            words = [m.start() for m in WORD.finditer(text, windows[-1][0], windows[-1][1])]
+            current = (words[-5:][0] if words else sentence_start, sentence_end)
         else:
-            # Current chunk is ready
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            
-            # Start new chunk with overlap if possible
-            if chunks and overlap > 0:
-                # Get last few words from previous chunk for overlap
-                last_words = chunks[-1].split()[-5:]  # Last 5 words
-                overlap_text = " " + " ".join(last_words)
-                current_chunk = overlap_text + " " + sentence
-            else:
-                current_chunk = sentence
+            current = (sentence_start, sentence_end)
     
-    # Add the last chunk
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if current:
+        windows.append(current)
+    return windows
+
+
+def window_chunks(text: str, target: int = 250, max_len: int = 320, overlap: int = 40) -> List[str]:
+    """
+    Split text into overlapping windows if it exceeds max_len.
+    Preserves sentence boundaries and avoids breaking inside code/URLs.
+    """
+    return [text[s:e] for s, e in window_spans(text, 0, len(text), target, max_len, overlap)]
+
+
+def _collect_spans(text: str, node: Boundary, max_len: int, start: Optional[int] = None,
+                   estimates: Optional[Dict[Span, float]] = None) -> List[Span]:
+    start = node.start if start is None else start
+    if not node.children or (node.level >= 0 and _fits_span(text, (start, node.end), max_len, estimates)):
+        return window_spans(text, start, node.end, target=250, max_len=max_len, overlap=40,
+                            estimates=estimates)
     
-    return chunks
+    # Too long (the whole text always splits): chunk the nested units, packing
+    # adjacent siblings together while they fit
+    spans: List[Span] = []
+    for i, child in enumerate(node.children):
+        # Text before the first nested unit (a heading or preamble) leads into it
+        for span in _collect_spans(text, child, max_len, start if i == 0 else None, estimates):
+            if spans and span[0] >= spans[-1][1] and fits_tokens(text[spans[-1][0]:span[1]], max_len):
+                spans[-1] = (spans[-1][0], span[1])
+            else:
+                spans.append(span)
+    return spans
+
+
+def chunk_spans(text: str, max_len: int = 300) -> List[Span]:
+    """
+    Offsets of the semantic chunks of `text`.
+    
+    Splits on the outermost boundaries, descends the boundary tree for units
+    longer than max_len, windows units without nested boundaries, and packs
+    adjacent sibling units into one chunk while they fit.
+    """
+    if not text:
+        return []
+    root = scan_boundaries(text)
+    return _collect_spans(text, root, max_len, estimates=_unit_estimates(text, root))
 
 
 def chunk_content(text: str, max_len: int = 300) -> List[str]:
@@ -134,29 +314,15 @@ def chunk_content(text: str, max_len: int = 300) -> List[str]:
     Split content into semantic chunks, then apply windowing if needed.
     Returns list of chunks, each ideally 150-300 tokens.
     """
-    if not text:
-        return []
-    
-    # First split on semantic boundaries
-    semantic_parts = split_on_semantic_boundaries(text)
-    
-    # Then apply windowing to parts that are too long
-    final_chunks = []
-    for part in semantic_parts:
-        if tokenize_len(part) <= max_len:
-            final_chunks.append(part)
-        else:
-            # Apply windowing to this part
-            windowed = window_chunks(part, target=250, max_len=max_len, overlap=40)
-            final_chunks.extend(windowed)
-    
-    return final_chunks
+    return [text[s:e] for s, e in chunk_spans(text, max_len)]
 
 
-def make_chunk_records(parent_record: Dict[str, Any], chunks: List[str]) -> List[Dict[str, Any]]:
+def make_chunk_records(parent_record: Dict[str, Any], chunks: List[str],
+                       spans: Optional[List[Span]] = None) -> List[Dict[str, Any]]:
     """
     Create chunk records from a parent record and its content chunks.
     If only one chunk, return parent unchanged. Otherwise create parent + children.
+    `spans` are the chunks' offsets into the parent content (see `chunk_spans`).
     """
     if len(chunks) == 1:
         # Update parent record with token count
@@ -174,7 +340,9 @@ def make_chunk_records(parent_record: Dict[str, Any], chunks: List[str]) -> List
     # Create parent record with children metadata
     parent_record['has_children'] = True
     parent_record['child_count'] = len(chunks)
-    parent_record['tokens'] = sum(tokenize_len(chunk) for chunk in chunks)
+    # Exact counts, taken once per chunk
+    chunk_tokens = [tokenize_len(chunk) for chunk in chunks]
+    parent_record['tokens'] = sum(chunk_tokens)
     
     # Add semantic content field if semantic_path_string exists
     if parent_record.get('semantic_path_string'):
@@ -203,7 +371,7 @@ def make_chunk_records(parent_record: Dict[str, Any], chunks: List[str]) -> List
             "block_type": "PARA",  # Default to paragraph for chunks
             "section_labels": parent_record['section_labels'],
             "order": int(str(parent_record['order']) + f"{i:03d}"),  # Stable sortable
-            "tokens": tokenize_len(chunk),
+            "tokens": chunk_tokens[i - 1],
             "confidence": calculate_chunk_confidence(chunk),
             "refs": extract_chunk_references(chunk),
             "hash": generate_record_hash(parent_record, chunk, i),
@@ -212,8 +380,8 @@ def make_chunk_records(parent_record: Dict[str, Any], chunks: List[str]) -> List
             "chunk_meta": {
                 "chunk_no": i,
                 "chunk_count": len(chunks),
-                "char_span": [0, len(chunk)],  # Relative to chunk content
-                "est_tokens": tokenize_len(chunk)
+                "char_span": list(spans[i - 1]) if spans else [0, len(chunk)],  # Offsets into parent content
+                "est_tokens": chunk_tokens[i - 1]
             }
         }
         
@@ -233,7 +401,7 @@ def calculate_chunk_confidence(chunk: str) -> float:
     confidence = 0.7
     
     # +0.1 if begins with list marker
-    if re.match(r'^[A-Z]\.|^[0-9]+\.|^[•\-–*]', chunk.strip()):
+    if re.match(r'^[A-Z]\.|^[0-9]+\.|^[•\-–*]', chunk.strip(), concurrent=True):
         confidence += 0.1
     
     # +0.1 if contains known heading vocabulary
@@ -246,7 +414,7 @@ def calculate_chunk_confidence(chunk: str) -> float:
         confidence += 0.1
     
     # -0.1 if very short or mostly symbols
-    if len(chunk.strip()) < 40 or len(re.findall(r'[^\w\s]', chunk)) > len(chunk) * 0.3:
+    if len(chunk.strip()) < 40 or len(re.findall(r'[^\w\s]', chunk, concurrent=True)) > len(chunk) * 0.3:
         confidence -= 0.1
     
     # Cap between 0 and 1
@@ -261,7 +429,7 @@ def extract_chunk_references(chunk: str) -> List[Dict[str, Any]]:
     
     # Pattern for Section references (Section 25-8-365)
     section_pattern = r'Section\s+(\d+-\d+-\d+)'
-    for match in re.finditer(section_pattern, chunk):
+    for match in re.finditer(section_pattern, chunk, concurrent=True):
         refs.append({
             "text": f"Section {match.group(1)}",
             "span": [match.start(), match.end()],
@@ -270,7 +438,7 @@ def extract_chunk_references(chunk: str) -> List[Dict[str, Any]]:
     
     # Pattern for LDC references (LDC 25-8-186)
     ldc_pattern = r'LDC\s+(\d+-\d+-\d+)'
-    for match in re.finditer(ldc_pattern, chunk):
+    for match in re.finditer(ldc_pattern, chunk, concurrent=True):
         refs.append({
             "text": f"LDC {match.group(1)}",
             "span": [match.start(), match.end()],
@@ -279,7 +447,7 @@ def extract_chunk_references(chunk: str) -> List[Dict[str, Any]]:
     
     # Pattern for Title references (Title 25-8)
     title_pattern = r'Title\s+(\d+-\d+)'
-    for match in re.finditer(title_pattern, chunk):
+    for match in re.finditer(title_pattern, chunk, concurrent=True):
         refs.append({
             "text": f"Title {match.group(1)}",
             "span": [match.start(), match.end()],
@@ -318,42 +486,258 @@ def generate_record_hash(record: Dict[str, Any], content: str, chunk_no: int) ->
     return f"sha256:{hash_obj.hexdigest()}"
 
 
-def process_jsonl_with_chunking(input_file: str, output_file: str, max_tokens: int = 300) -> None:
+def chunk_record(record: Dict[str, Any], max_tokens: int = 300) -> List[Dict[str, Any]]:
+    """
+    Apply hierarchical chunking to a single record.
+    Returns the record itself, or the parent followed by its chunk records.
+    """
+    # Check if content needs chunking
+    content = record.get('content', '')
+    if content and not fits_tokens(content, max_tokens):
+        # Apply chunking on offsets; only the final chunks are copied out
+        spans = chunk_spans(content, max_len=max_tokens)
+        chunks = [content[s:e] for s, e in spans]
+        return make_chunk_records(record, chunks, spans)
+    
+    # No chunking needed, just update token count
+    record['tokens'] = tokenize_len(content) if content else 0
+    return [record]
+
+
+def _stage_params(max_tokens: int) -> Dict[str, Any]:
+    """Parameters chunk outputs depend on (cache and checkpoint keys)."""
+    return {"version": CHUNKER_VERSION, "max_tokens": max_tokens,
+            "tokenizer": ENCODING_NAME if get_encoding() is not None else "estimate"}
+
+
+def _chunk_cached(record: Dict[str, Any], max_tokens: int, cache) -> List[Dict[str, Any]]:
+    """Chunk one record, serving unchanged records from the stage cache when given."""
+    if cache is None:
+        return chunk_record(record, max_tokens)
+    
+    from .stage_cache import restore_volatile_fields
+    
+    key = cache.key(record)
+    cached = cache.get(key)
+    if cached is not None:
+        return restore_volatile_fields(cached, record)
+    chunked = chunk_record(record, max_tokens)
+    cache.put(key, chunked)
+    return chunked
+
+
+def _chunk_stream(records: Iterable[Dict[str, Any]], max_tokens: int, cache,
+                  regex_threads: int = 1, window: int = 256) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the chunk output of each input record, in input order.
+
+    With `regex_threads > 1`, records are chunked on a thread pool with up to
+    `window` records in flight. Stage cache lookups and writes stay on the
+    calling thread.
+    """
+    if regex_threads <= 1:
+        for record in records:
+            yield _chunk_cached(record, max_tokens, cache)
+        return
+    
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor, Future
+    from .stage_cache import restore_volatile_fields
+    
+    def settle(key, outcome) -> List[Dict[str, Any]]:
+        if not isinstance(outcome, Future):
+            return outcome
+        chunked = outcome.result()
+        if cache is not None:
+            cache.put(key, chunked)
+        return chunked
+    
+    with ThreadPoolExecutor(max_workers=regex_threads) as pool:
+        pending = deque()
+        for record in records:
+            key = cache.key(record) if cache is not None else None
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                pending.append((key, restore_volatile_fields(cached, record)))
+            else:
+                pending.append((key, pool.submit(chunk_record, record, max_tokens)))
+            if len(pending) >= window:
+                yield settle(*pending.popleft())
+        while pending:
+            yield settle(*pending.popleft())
+
+
+def _deduplicated(outputs_stream: Iterable[List[Dict[str, Any]]], deduplicator,
+                  report=None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Apply `dedup.deduplicate_records` to each record's chunk output as it is
+    produced; `deduplicator` keeps its LRU-bounded state across records.
+    """
+    from .dedup import deduplicate_records
+    
+    on_duplicate = (lambda entry: report.write(json.dumps(entry, ensure_ascii=False) + '\n')) if report else None
+    for outputs in outputs_stream:
+        yield list(deduplicate_records(outputs, deduplicator, on_duplicate))
+
+
+def _chunk_with_checkpoints(input_file: str, output_file: str, max_tokens: int, cache,
+                            checkpoint_every: int, resume: bool, regex_threads: int = 1,
+                            deduplicator=None, dedup_report=None) -> None:
+    """
+    Stream chunked records to `output_file`, checkpointing every `checkpoint_every` input records.
+
+    With `resume`, input records before the last checkpoint are skipped and
+    the output is truncated to its checkpointed length before appending.
+    With `deduplicator`, duplicate chunks are handled as they are written;
+    after a resume, duplicates of records written before the checkpoint are
+    not detected.
+    """
+    from itertools import islice
+    from .checkpoint import Checkpointer, checkpoint_path, commit_output, open_for_resume
+    
+    if detect_compression(output_file) or is_normalized(output_file):
+        raise ValueError("Checkpointed chunking writes plain JSONL; use an uncompressed, non-normalized output file")
+    
+    checkpointer = Checkpointer(checkpoint_path(output_file), "chunk", input_file, _stage_params(max_tokens))
+    encoder = ReferenceEncoder() if is_reference(output_file) else None
+    state = checkpointer.load() if resume else None
+    position, written, offset = 0, 0, None
+    if state:
+        position = state["position"]
+        written = state["context"]["records_written"]
+        offset = state["outputs"][output_file]
+        print(f"Resuming at input record {position} ({written} records already written)")
+    
+    with open_for_resume(output_file, offset) as f:
+        records = islice(read_records(input_file), position, None)
+        stream = _chunk_stream(records, max_tokens, cache, regex_threads)
+        if deduplicator is not None:
+            stream = _deduplicated(stream, deduplicator, dedup_report)
+        for outputs in stream:
+            for chunked in outputs:
+                if encoder:
+                    chunked = encoder.encode(chunked)
+                f.write(json.dumps(chunked, ensure_ascii=False) + '\n')
+                written += 1
+            position += 1
+            if position % checkpoint_every == 0:
+                if cache:
+                    cache.flush()
+                if dedup_report:
+                    dedup_report.flush()
+                checkpointer.save(position, {output_file: commit_output(f)}, {"records_written": written})
+    
+    _close_stage_cache(cache)
+    checkpointer.clear()
+    
+    print(f"Processed {written} records (including chunks)")
+    print(f"Output written to: {output_file}")
+
+
+def process_jsonl_with_chunking(input_file: str, output_file: str, max_tokens: int = 300,
+                                dedup: bool = False, dedup_report: Optional[str] = None,
+                                cache_dir: Optional[str] = None, checkpoint_every: Optional[int] = None,
+                                resume: bool = False, regex_threads: int = 1) -> None:
     """
     Process a JSONL file and apply hierarchical chunking to long content.
+
+    With `dedup`, exact duplicate chunks are dropped and near duplicates are
+    flagged as records stream out of the chunker (see
+    `dedup.deduplicate_records`); back-references are written to
+    `dedup_report` when given. With `cache_dir`, chunk outputs of unchanged
+    records are served from the stage cache. With `checkpoint_every` or
+    `resume`, output is written incrementally and the run can be resumed
+    (see `_chunk_with_checkpoints`). With
+    `regex_threads > 1`, records are chunked on that many threads (see
+    `_chunk_stream`); output is unchanged. Outputs named `*.ref.jsonl` store
+    chunk children as offsets into their parent (see `reference_chunks`).
+    """
+    cache = None
+    if cache_dir:
+        from .stage_cache import StageCache
+        
+        cache = StageCache(cache_dir, "chunk", _stage_params(max_tokens))
+    
+    deduplicator = report = None
+    if dedup:
+        from .dedup import ChunkDeduplicator
+        
+        deduplicator = ChunkDeduplicator()
+        if dedup_report and resume:
+            if detect_compression(dedup_report):
+                raise ValueError("A resumed run appends to the dedup report; use an uncompressed report file")
+            report = open(dedup_report, 'a', encoding='utf-8')
+        elif dedup_report:
+            report = open_text(dedup_report, 'w')
+    
+    try:
+        if checkpoint_every or resume:
+            _chunk_with_checkpoints(input_file, output_file, max_tokens, cache, checkpoint_every or 1000, resume,
+                                    regex_threads, deduplicator, report)
+        else:
+            _chunk_to_output(input_file, output_file, max_tokens, cache, regex_threads,
+                             deduplicator, report)
+    finally:
+        if report:
+            report.close()
+    
+    if deduplicator is not None:
+        dropped = deduplicator.stats['dropped']
+        print(f"Deduplication: {dropped} exact duplicate chunks dropped, "
+              f"{deduplicator.stats['exact'] - dropped + deduplicator.stats['near']} duplicates flagged")
+
+
+def _chunk_to_output(input_file: str, output_file: str, max_tokens: int, cache,
+                     regex_threads: int = 1, deduplicator=None, dedup_report=None) -> None:
+    """
+    Chunk every record and write the output. Plain JSONL is written as
+    records stream out; normalized and reference forms collect the records
+    first.
     """
+    # Plain JSONL or a shard manifest (shards are read in parallel)
+    stream = _chunk_stream(read_records(input_file), max_tokens, cache, regex_threads)
+    if deduplicator is not None:
+        stream = _deduplicated(stream, deduplicator, dedup_report)
+    
+    if not (is_normalized(output_file) or is_reference(output_file)):
+        written = 0
+        with open_text(output_file, 'w') as f:
+            for outputs in stream:
+                for record in outputs:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                written += len(outputs)
+        _close_stage_cache(cache)
+        print(f"Processed {written} records (including chunks)")
+        print(f"Output written to: {output_file}")
+        return
+    
     chunked_records = []
+    for outputs in stream:
+        chunked_records.extend(outputs)
+    _close_stage_cache(cache)
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            try:
-                record = json.loads(line.strip())
-                
-                # Check if content needs chunking
-                content = record.get('content', '')
-                if content and tokenize_len(content) > max_tokens:
-                    # Apply chunking
-                    chunks = chunk_content(content, max_len=max_tokens)
-                    chunked = make_chunk_records(record, chunks)
-                    chunked_records.extend(chunked)
-                else:
-                    # No chunking needed, just update token count
-                    record['tokens'] = tokenize_len(content) if content else 0
-                    chunked_records.append(record)
-                    
-            except json.JSONDecodeError as e:
-                print(f"Error parsing line {line_num}: {e}")
-                continue
-    
-    # Write chunked records
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for record in chunked_records:
-            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    # Write chunked records (normalized form for *.norm.jsonl, reference form for *.ref.jsonl)
+    if is_normalized(output_file):
+        writer = NormalizedWriter(output_file)
+        writer.write(chunked_records)
+        writer.close()
+        print(f"Dictionary tables written to: {writer.tables_file}")
+    else:
+        writer = ReferenceWriter(output_file)
+        writer.write(chunked_records)
+        writer.close()
+        print(f"Chunk children stored as parent offsets: {writer.references}")
     
     print(f"Processed {len(chunked_records)} records (including chunks)")
     print(f"Output written to: {output_file}")
 
 
+def _close_stage_cache(cache) -> None:
+    if cache:
+        cache.close()
+        print(f"Stage cache: {cache.stats['hits']} reused, {cache.stats['misses']} recomputed")
+
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) != 3:
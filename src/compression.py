@@ -0,0 +1,161 @@
+"""
+Transparent compressed input/output for JSONL stages.
+
+`open_text` picks the codec from the file extension:
+
+- `.gz`  -> gzip
+- `.zst` -> zstandard (requires the `zstandard` package)
+- anything else -> plain text
+
+Compressed writers hand buffered text to a background thread that encodes,
+compresses and writes it, so compression overlaps record generation (zlib
+and zstd release the GIL while compressing). zstd additionally uses its own
+multithreaded compressor.
+"""
+
+import gzip
+import io
+import queue
+import threading
+from typing import Optional, TextIO
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Return "gzip", "zstd" or None based on the file extension."""
+    path = str(path)
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def with_compression(path: str, compression: Optional[str]) -> str:
+    """Append the extension for `compression` ("gzip"/"zstd") to `path`."""
+    if not compression:
+        return path
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    return path + COMPRESSION_EXTENSIONS[compression]
+
+
+def strip_compression(path: str) -> str:
+    """Remove a trailing .gz/.zst extension from `path`."""
+    for extension in COMPRESSION_EXTENSIONS.values():
+        if str(path).endswith(extension):
+            return str(path)[:-len(extension)]
+    return str(path)
+
+
+def _require_zstd() -> None:
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError("zstandard is not installed; cannot read or write .zst files")
+
+
+class BackgroundCompressedWriter(io.TextIOBase):
+    """Text writer that compresses and writes on a background thread."""
+
+    def __init__(self, path: str, compression: str, buffer_size: int = 1 << 20,
+                 max_pending: int = 8, level: Optional[int] = None):
+        """
+        Args:
+            path: Output file
+            compression: "gzip" or "zstd"
+            buffer_size: Characters buffered before handing off to the thread
+            max_pending: Buffers queued before writers block (backpressure)
+            level: Compression level (codec default when None)
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self._parts = []
+        self._buffered = 0
+        self._error: Optional[BaseException] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+
+        self._raw = open(path, 'wb')
+        if compression == "gzip":
+            self._sink = gzip.GzipFile(fileobj=self._raw, mode='wb',
+                                       compresslevel=level if level is not None else 6)
+        elif compression == "zstd":
+            _require_zstd()
+            compressor = zstandard.ZstdCompressor(level=level if level is not None else 3, threads=-1)
+            self._sink = compressor.stream_writer(self._raw, closefd=False)
+        else:
+            raise ValueError(f"Unknown compression: {compression}")
+
+        self._thread = threading.Thread(target=self._drain, name=f"compress:{path}", daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self._error is None:
+                try:
+                    self._sink.write(data)
+                except BaseException as e:
+                    self._error = e
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if self._error is not None:
+            raise self._error
+        self._parts.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self._parts:
+            self._queue.put(''.join(self._parts).encode('utf-8'))
+            self._parts = []
+            self._buffered = 0
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._sink.close()
+        self._raw.close()
+        super().close()
+        if self._error is not None:
+            raise self._error
+
+
+def open_text(path: str, mode: str = 'r') -> TextIO:
+    """
+    Open a text file for reading ('r') or writing ('w'), compressing or
+    decompressing according to its extension.
+    """
+    compression = detect_compression(path)
+
+    if mode == 'r':
+        if compression == "gzip":
+            return gzip.open(path, 'rt', encoding='utf-8')
+        if compression == "zstd":
+            _require_zstd()
+            reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            return io.TextIOWrapper(reader, encoding='utf-8')
+        return open(path, 'r', encoding='utf-8')
+
+    if mode == 'w':
+        if compression is not None:
+            return BackgroundCompressedWriter(path, compression)
+        return open(path, 'w', encoding='utf-8')
+
+    raise ValueError(f"Unsupported mode: {mode}")
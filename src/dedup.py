@@ -0,0 +1,304 @@
+"""
+Exact and near-duplicate elimination for chunked records.
+
+Runs as a streaming stage after `make_chunk_records`:
+
+- Exact duplicates (same normalized text digest as an earlier record) are
+  dropped from the output. The parent records the back-reference to the
+  canonical record in `dedup_dropped`, and its `child_count` and the
+  surviving siblings' `chunk_meta.chunk_count` are reduced to match.
+  `chunk_no` keeps its original value, since a chunk's anchor, `order`
+  and hash derive from it.
+- Near duplicates are detected with MinHash signatures over word shingles and
+  banded LSH. They are kept but flagged with `duplicate_of` so downstream
+  consumers can skip embedding them.
+
+Only chunks are compared: chunk children (`chunk_meta`) and unsplit records
+with `semantic_content` that have no chunk children. Every other record
+passes through untouched. Only chunk children are ever dropped, since no
+record names one as its `parent_anchor`. An unsplit record that is an exact
+duplicate may be another section's parent, so it is kept and flagged like a
+near duplicate.
+
+Memory is bounded: digests, LSH buckets and canonical signatures live in
+LRU-evicted maps with fixed capacities, so the stage scales to collections of
+many manuals at the cost of missing duplicates that are very far apart.
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable
+
+import numpy as np
+
+from .compression import open_text
+from .sharding import read_records
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class _BoundedMap:
+    """Dict with least-recently-used eviction once `capacity` is reached."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def is_chunk(record: Dict[str, Any]) -> bool:
+    """True for records deduplication compares (chunk children and unsplit leaves)."""
+    return 'chunk_meta' in record or ('semantic_content' in record and not record.get('has_children'))
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so formatting differences do not matter."""
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def text_digest(text: str) -> bytes:
+    """Return a 16-byte digest of the normalized text."""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).digest()
+
+
+def shingles(text: str, size: int = 5) -> List[str]:
+    """Return word shingles of `size` words from the normalized text."""
+    words = normalize_text(text).split()
+    if len(words) < size:
+        return []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class MinHasher:
+    """MinHash signatures using universal hashing modulo a Mersenne prime."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        """Return the MinHash signature (uint32 array) for a set of shingles."""
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=4).digest(), 'little')
+                for t in set(tokens)
+            ),
+            dtype=np.uint64,
+        ) % np.uint64(MERSENNE_PRIME)
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class ChunkDeduplicator:
+    """Streaming exact/near duplicate detector."""
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 5, field: str = "content",
+                 max_digests: int = 1_000_000, max_signatures: int = 100_000):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at which records are near duplicates
+            num_perm: Number of MinHash permutations (must be divisible by `bands`)
+            bands: Number of LSH bands
+            shingle_size: Words per shingle
+            field: Record field holding the text to compare
+            max_digests: Capacity of the exact-digest map
+            max_signatures: Capacity of the LSH bucket and signature maps
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.field = field
+        self.hasher = MinHasher(num_perm)
+
+        self._digests = _BoundedMap(max_digests)
+        self._buckets = _BoundedMap(max_signatures * bands)
+        self._signatures = _BoundedMap(max_signatures)
+
+        self.stats = {"records": 0, "skipped": 0, "exact": 0, "near": 0, "dropped": 0}
+
+    def check(self, record: Dict[str, Any]) -> Tuple[str, Optional[str], float]:
+        """
+        Classify a record as "unique", "exact" or "near".
+
+        Returns (kind, canonical_anchor, similarity). Unique records are
+        registered as canonical candidates for later records; records that
+        are not chunks (see `is_chunk`) are always "unique" and never registered.
+        """
+        self.stats["records"] += 1
+        if not is_chunk(record):
+            self.stats["skipped"] += 1
+            return "unique", None, 0.0
+        text = record.get(self.field)
+        if not text:
+            return "unique", None, 0.0
+
+        digest = text_digest(text)
+        canonical = self._digests.get(digest)
+        if canonical is not None:
+            self.stats["exact"] += 1
+            return "exact", canonical, 1.0
+        self._digests.put(digest, record['anchor'])
+
+        tokens = shingles(text, self.shingle_size)
+        if not tokens:
+            return "unique", None, 0.0
+
+        signature = self.hasher.signature(tokens)
+        band_keys = [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+        best_anchor, best_similarity = None, 0.0
+        for key in band_keys:
+            candidate = self._buckets.get(key)
+            if candidate is None or candidate == best_anchor:
+                continue
+            candidate_signature = self._signatures.get(candidate)
+            if candidate_signature is None:
+                continue
+            similarity = float(np.mean(candidate_signature == signature))
+            if similarity > best_similarity:
+                best_anchor, best_similarity = candidate, similarity
+
+        if best_anchor is not None and best_similarity >= self.threshold:
+            self.stats["near"] += 1
+            return "near", best_anchor, best_similarity
+
+        for key in band_keys:
+            if self._buckets.get(key) is None:
+                self._buckets.put(key, record['anchor'])
+        self._signatures.put(record['anchor'], signature)
+        return "unique", None, 0.0
+
+
+def _chunk_groups(records: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """Group each parent with `has_children` and the chunk children that follow it."""
+    group: List[Dict[str, Any]] = []
+    for record in records:
+        if group and 'chunk_meta' in record and record.get('parent_anchor') == group[0]['anchor']:
+            group.append(record)
+            continue
+        if group:
+            yield group
+            group = []
+        if record.get('has_children'):
+            group = [record]
+        else:
+            yield [record]
+    if group:
+        yield group
+
+
+def _account_for_dropped(group: List[Dict[str, Any]], dropped: List[Dict[str, Any]]) -> None:
+    """Record dropped chunks on their parent and fix the counts of the survivors."""
+    children = [record for record in group if 'chunk_meta' in record]
+    for child in children:
+        child['chunk_meta']['chunk_count'] = len(children)
+    parent = group[0] if group and group[0].get('has_children') else None
+    if parent is not None:
+        parent['child_count'] = len(children)
+        parent['has_children'] = bool(children)
+        parent.setdefault('dedup_dropped', []).extend(
+            {"anchor": entry['anchor'], "duplicate_of": entry['duplicate_of']} for entry in dropped
+        )
+
+
+def deduplicate_records(records: Iterable[Dict[str, Any]],
+                        deduplicator: Optional[ChunkDeduplicator] = None,
+                        on_duplicate: Optional[Callable[[Dict[str, Any]], None]] = None
+                        ) -> Iterator[Dict[str, Any]]:
+    """
+    Drop exact duplicate chunk children and flag other duplicates in a record stream.
+
+    Near duplicates, and exact duplicates that are not chunk children, get
+    `duplicate_of` and a `dedup` block with the kind and estimated
+    similarity. Dropped chunks are listed in their parent's `dedup_dropped`
+    and the parent's and siblings' counts are updated (see
+    `_account_for_dropped`); a parent is held back until its chunks have been
+    checked. Every dropped or flagged record is also passed to `on_duplicate`
+    (if given) as a back-reference entry pointing at its canonical record.
+    """
+    deduplicator = deduplicator or ChunkDeduplicator()
+
+    for group in _chunk_groups(records):
+        kept: List[Dict[str, Any]] = []
+        dropped: List[Dict[str, Any]] = []
+        for record in group:
+            kind, canonical, similarity = deduplicator.check(record)
+            if kind == "unique":
+                kept.append(record)
+                continue
+
+            entry = {
+                "anchor": record['anchor'],
+                "order": record.get('order'),
+                "duplicate_of": canonical,
+                "kind": kind,
+                "similarity": round(similarity, 4),
+            }
+            if on_duplicate is not None:
+                on_duplicate(entry)
+
+            if kind == "near" or 'chunk_meta' not in record:
+                record['duplicate_of'] = canonical
+                record['dedup'] = {"kind": kind, "similarity": round(similarity, 4)}
+                kept.append(record)
+            else:
+                deduplicator.stats["dropped"] += 1
+                dropped.append(entry)
+
+        if dropped:
+            _account_for_dropped(kept, dropped)
+        yield from kept
+
+
+def dedup_jsonl(input_file: str, output_file: str, report_file: Optional[str] = None,
+                threshold: float = 0.85) -> Dict[str, int]:
+    """
+    Deduplicate (chunked) records from any output form (JSONL, shard
+    manifest, normalized or reference form; see `sharding.read_records`).
+
+    Returns the deduplicator statistics.
+    """
+    deduplicator = ChunkDeduplicator(threshold=threshold)
+    report = open_text(report_file, 'w') if report_file else None
+
+    def write_report(entry: Dict[str, Any]) -> None:
+        report.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    try:
+        with open_text(output_file, 'w') as f:
+            records = deduplicate_records(
+                read_records(input_file), deduplicator, write_report if report else None
+            )
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if report:
+            report.close()
+
+    return deduplicator.stats
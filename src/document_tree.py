@@ -0,0 +1,206 @@
+"""
+Array-backed document tree built from ingested records.
+
+Nodes are identified by integer ids (their position in the input). The tree is
+stored as flat arrays: a parent array, a pre-order sequence and, for every
+node, the [start, end) interval it covers in that sequence. Subtree queries are
+range slices over the pre-order array and ancestors are found by walking the
+parent array, so no query has to rescan the records.
+"""
+
+from typing import List, Dict, Any, Optional, Iterable
+
+import numpy as np
+
+from .sharding import read_records
+
+
+class DocumentTree:
+    """Hierarchy of records keyed by integer node ids."""
+
+    def __init__(self, anchors: List[str], parent: np.ndarray, preorder: np.ndarray,
+                 tin: np.ndarray, tout: np.ndarray, depth: np.ndarray):
+        """Initialize the tree from prebuilt arrays (see `from_records`)."""
+        self.anchors = anchors
+        self.parent = parent
+        self.preorder = preorder
+        self.tin = tin
+        self.tout = tout
+        self.depth = depth
+
+        # First occurrence wins when an anchor is repeated in the export
+        self.anchor_index: Dict[str, int] = {}
+        for node_id, anchor in enumerate(anchors):
+            self.anchor_index.setdefault(anchor, node_id)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "DocumentTree":
+        """
+        Build the tree from records carrying `anchor`, `parent_anchor` and `order`.
+
+        Records whose parent anchor is unknown become roots. Siblings are
+        visited in `order` order so the pre-order sequence matches reading order.
+        """
+        anchors: List[str] = []
+        parent_anchors: List[Optional[str]] = []
+        orders: List[int] = []
+        for record in records:
+            anchors.append(record['anchor'])
+            parent_anchors.append(record.get('parent_anchor'))
+            orders.append(record.get('order', 0))
+
+        n = len(anchors)
+        anchor_index: Dict[str, int] = {}
+        for node_id, anchor in enumerate(anchors):
+            anchor_index.setdefault(anchor, node_id)
+
+        parent = np.full(n, -1, dtype=np.int32)
+        for node_id, parent_anchor in enumerate(parent_anchors):
+            if parent_anchor is not None:
+                parent_id = anchor_index.get(parent_anchor, -1)
+                if parent_id != node_id:
+                    parent[node_id] = parent_id
+
+        # Children lists sorted by order (stable on input position)
+        by_order = sorted(range(n), key=lambda i: (orders[i], i))
+        children: List[List[int]] = [[] for _ in range(n)]
+        roots: List[int] = []
+        for node_id in by_order:
+            parent_id = parent[node_id]
+            if parent_id < 0:
+                roots.append(node_id)
+            else:
+                children[parent_id].append(node_id)
+
+        # Iterative pre-order walk recording entry/exit positions
+        preorder = np.empty(n, dtype=np.int32)
+        tin = np.full(n, -1, dtype=np.int32)
+        tout = np.full(n, -1, dtype=np.int32)
+        depth = np.zeros(n, dtype=np.int32)
+        position = 0
+        for root in roots:
+            stack = [(root, False)]
+            while stack:
+                node_id, done = stack.pop()
+                if done:
+                    tout[node_id] = position
+                    continue
+                tin[node_id] = position
+                preorder[position] = node_id
+                position += 1
+                stack.append((node_id, True))
+                for child in reversed(children[node_id]):
+                    depth[child] = depth[node_id] + 1
+                    stack.append((child, False))
+
+        # Parent cycles leave nodes unvisited; attach them as roots
+        for node_id in np.flatnonzero(tin < 0):
+            parent[node_id] = -1
+            tin[node_id] = position
+            preorder[position] = node_id
+            position += 1
+            tout[node_id] = position
+
+        return cls(anchors, parent, preorder, tin, tout, depth)
+
+    @classmethod
+    def from_jsonl(cls, input_file: str) -> "DocumentTree":
+        """Build the tree from any record output (JSONL, shard manifest, normalized or reference form)."""
+        return cls.from_records(read_records(input_file))
+
+    def __len__(self) -> int:
+        return len(self.anchors)
+
+    def node_id(self, anchor: str) -> int:
+        """Return the node id for an anchor, raising KeyError if unknown."""
+        return self.anchor_index[anchor]
+
+    def subtree(self, node_id: int, include_self: bool = True) -> np.ndarray:
+        """Return node ids in the subtree rooted at `node_id`, in pre-order."""
+        start = self.tin[node_id] if include_self else self.tin[node_id] + 1
+        return self.preorder[start:self.tout[node_id]]
+
+    def descendants(self, node_id: int) -> np.ndarray:
+        """Return all strict descendants of `node_id`."""
+        return self.subtree(node_id, include_self=False)
+
+    def is_ancestor(self, ancestor_id: int, node_id: int) -> bool:
+        """Check whether `ancestor_id` is an ancestor of (or equal to) `node_id`."""
+        return bool(self.tin[ancestor_id] <= self.tin[node_id] < self.tout[ancestor_id])
+
+    def ancestors(self, node_id: int) -> List[int]:
+        """Return ancestors of `node_id`, nearest first."""
+        result = []
+        parent_id = int(self.parent[node_id])
+        while parent_id >= 0:
+            result.append(parent_id)
+            parent_id = int(self.parent[parent_id])
+        return result
+
+    def children(self, node_id: int) -> List[int]:
+        """Return direct children of `node_id` in reading order."""
+        result = []
+        position = self.tin[node_id] + 1
+        end = self.tout[node_id]
+        while position < end:
+            child = int(self.preorder[position])
+            result.append(child)
+            position = self.tout[child]
+        return result
+
+    def roots(self) -> List[int]:
+        """Return root node ids in reading order."""
+        result = []
+        position = 0
+        while position < len(self.preorder):
+            root = int(self.preorder[position])
+            result.append(root)
+            position = self.tout[root]
+        return result
+
+    def siblings(self, node_id: int, include_self: bool = False) -> List[int]:
+        """Return nodes sharing the parent of `node_id` (roots are siblings of roots)."""
+        parent_id = int(self.parent[node_id])
+        peers = self.children(parent_id) if parent_id >= 0 else self.roots()
+        if include_self:
+            return peers
+        return [peer for peer in peers if peer != node_id]
+
+    def to_anchors(self, node_ids: Iterable[int]) -> List[str]:
+        """Map node ids back to anchors."""
+        return [self.anchors[int(node_id)] for node_id in node_ids]
+
+    def save(self, output_file: str) -> None:
+        """Persist the tree to a compressed NumPy archive (.npz)."""
+        encoded = [anchor.encode('utf-8') for anchor in self.anchors]
+        anchor_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        anchor_offsets[1:] = np.cumsum([len(a) for a in encoded])
+        np.savez_compressed(
+            output_file,
+            anchor_bytes=np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            anchor_offsets=anchor_offsets,
+            parent=self.parent,
+            preorder=self.preorder,
+            tin=self.tin,
+            tout=self.tout,
+            depth=self.depth,
+        )
+
+    @classmethod
+    def load(cls, input_file: str) -> "DocumentTree":
+        """Load a tree previously written with `save`."""
+        with np.load(input_file) as data:
+            anchor_bytes = data['anchor_bytes'].tobytes()
+            offsets = data['anchor_offsets']
+            anchors = [
+                anchor_bytes[offsets[i]:offsets[i + 1]].decode('utf-8')
+                for i in range(len(offsets) - 1)
+            ]
+            return cls(
+                anchors,
+                data['parent'],
+                data['preorder'],
+                data['tin'],
+                data['tout'],
+                data['depth'],
+            )
@@ -3,16 +3,24 @@ Excel parser for ingesting structured Excel files and converting to JSON/Parquet
 """
 
 import re
+import os
+import json
 import hashlib
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Mapping
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 import pandas as pd
 import regex as re
 from loguru import logger
 
 from .models import ExcelRow, Reference, Source, SectionLabels, ExcelIngestionConfig
+from .compression import open_text, with_compression
+from .sharding import ShardedWriter
+from .checkpoint import Checkpointer, checkpoint_path, commit_output, open_for_resume
+from .excel_readers import open_sheet
 
 
 class ExcelParser:
@@ -56,26 +64,7 @@ class ExcelParser:
         logger.info(f"Parsing Excel file: {file_path}")
         
         try:
-            # Read Excel file - use second row as headers (first row is empty)
-            df = pd.read_excel(file_path, sheet_name=0, header=1)  # Use second row as headers
-            
-            # Validate required columns
-            required_columns = ['NodeId']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {missing_columns}")
-            
-            # Process each row
-            rows = []
-            for index, row_data in df.iterrows():
-                try:
-                    excel_row = self._process_row(row_data, index)
-                    if excel_row:
-                        rows.append(excel_row)
-                except Exception as e:
-                    logger.warning(f"Error processing row {index}: {e}")
-                    continue
-            
+            rows = list(self.iter_rows(file_path))
             logger.info(f"Successfully processed {len(rows)} rows")
             return rows
             
@@ -83,14 +72,95 @@ class ExcelParser:
             logger.error(f"Error parsing Excel file: {e}")
             raise
     
-    def _process_row(self, row_data: pd.Series, index: int) -> Optional[ExcelRow]:
-        """Process a single row and convert to ExcelRow."""
+    def iter_rows(self, file_path: str) -> Iterator[ExcelRow]:
+        """
+        Parse an Excel file and yield structured records one at a time.
+        
+        Rows are yielded in sheet order, so parents precede their children.
+        
+        Args:
+            file_path: Path to the Excel file
+            
+        Yields:
+            ExcelRow objects
+        """
+        for _, excel_row in self.iter_indexed_rows(file_path):
+            if excel_row:
+                yield excel_row
+    
+    def iter_indexed_rows(self, file_path: str, start_row: int = 0) -> Iterator[Tuple[int, Optional[ExcelRow]]]:
+        """
+        Yield (sheet row index, ExcelRow or None) for every sheet row.
+        
+        Skipped and failed rows yield None so callers can track how far
+        parsing got. Rows before `start_row` are not processed; restore
+        `current_context` first when resuming mid-sheet. The sheet is read
+        with `config.reader` (see `excel_readers`).
+        """
+        # Second sheet row holds the headers (first row is empty)
+        sheet = open_sheet(file_path, self.config.reader)
+        logger.debug(f"Reading {file_path} with the {sheet.reader} reader")
+        
+        # Validate required columns
+        required_columns = ['NodeId']
+        missing_columns = [col for col in required_columns if col not in sheet.columns]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        # Process each row
+        rows = ((index, row_data) for index, row_data in sheet if index >= start_row)
+        if self.config.regex_threads > 1:
+            yield from self._iter_rows_threaded(rows)
+            return
+        for index, row_data in rows:
+            try:
+                yield index, self._process_row(row_data, index)
+            except Exception as e:
+                logger.warning(f"Error processing row {index}: {e}")
+                yield index, None
+    
+    def _iter_rows_threaded(self, rows: Iterator[Tuple[int, Mapping[str, Any]]],
+                            window: int = 512) -> Iterator[Tuple[int, Optional[ExcelRow]]]:
+        """
+        Process rows like `iter_indexed_rows`, extracting references on a thread pool.
+        
+        Hierarchy tracking stays sequential; only the reference matching of
+        each window of rows is fanned out to `config.regex_threads` threads.
+        """
+        with ThreadPoolExecutor(max_workers=self.config.regex_threads) as pool:
+            while True:
+                block = list(islice(rows, window))
+                if not block:
+                    break
+                pending = []
+                for _, row_data in block:
+                    content = self._cell_text(row_data, 'Content')
+                    pending.append(pool.submit(self._extract_references, content) if content else None)
+                for (index, row_data), refs in zip(block, pending):
+                    try:
+                        yield index, self._process_row(row_data, index, refs.result() if refs else [])
+                    except Exception as e:
+                        logger.warning(f"Error processing row {index}: {e}")
+                        yield index, None
+    
+    @staticmethod
+    def _cell_text(row_data: Mapping[str, Any], column: str) -> Optional[str]:
+        value = row_data.get(column)
+        return str(value).strip() if pd.notna(value) else None
+    
+    def _process_row(self, row_data: Mapping[str, Any], index: int,
+                     refs: Optional[List[Reference]] = None) -> Optional[ExcelRow]:
+        """
+        Process a single row and convert to ExcelRow.
+        
+        `refs` may be passed in when references were extracted ahead of time.
+        """
         # Extract basic fields
         original_node_id = str(row_data.get('NodeId', '')).strip()
-        title = str(row_data.get('Title', '')).strip() if pd.notna(row_data.get('Title')) else None
-        subtitle = str(row_data.get('Subtitle', '')).strip() if pd.notna(row_data.get('Subtitle')) else None
-        content = str(row_data.get('Content', '')).strip() if pd.notna(row_data.get('Content')) else None
-        url = str(row_data.get('Url', '')).strip() if pd.notna(row_data.get('Url')) else None
+        title = self._cell_text(row_data, 'Title')
+        subtitle = self._cell_text(row_data, 'Subtitle')
+        content = self._cell_text(row_data, 'Content')
+        url = self._cell_text(row_data, 'Url')
         
         # Skip rows without title
         if not title:
@@ -116,7 +186,8 @@ class ExcelParser:
         confidence = self._calculate_confidence(title, content)
         
         # Extract references
-        refs = self._extract_references(content) if content else []
+        if refs is None:
+            refs = self._extract_references(content) if content else []
         
         # Generate hash
         content_hash = self._generate_hash(node_id, title, subtitle, content)
@@ -383,8 +454,11 @@ class ExcelParser:
         """Convert NodeId to sortable integer order."""
         # Handle text-based NodeIds by using hash for ordering
         if not node_id.replace('.', '').replace('_', '').isdigit():
-            # For text NodeIds, use a hash-based approach
-            return hash(node_id) % 1000000  # Use modulo to keep it reasonable
+            # For text NodeIds, use a stable digest (built-in hash() is salted
+            # per process, which would change `order` and every cache key on
+            # each ingest); modulo keeps it reasonable
+            digest = hashlib.sha256(node_id.encode('utf-8')).digest()
+            return int.from_bytes(digest[:8], 'big') % 1000000
         
         # Original logic for numeric NodeIds
         parts = node_id.split('.')
@@ -421,11 +495,11 @@ class ExcelParser:
         return max(0.0, min(1.0, confidence))
     
     def _extract_references(self, content: str) -> List[Reference]:
-        """Extract code references from content."""
+        """Extract code references from content (matching runs with the GIL released)."""
         refs = []
         
         for ref_type, pattern in self.ref_patterns.items():
-            for match in pattern.finditer(content):
+            for match in pattern.finditer(content, concurrent=True):
                 ref = Reference(
                     text=match.group(0),
                     span=[match.start(), match.end()],
@@ -453,17 +527,93 @@ class ExcelParser:
     
     def write_output(self, rows: List[ExcelRow], output_prefix: str):
         """Write output in specified format."""
+        if self.config.sharded:
+            self._write_sharded(rows, output_prefix)
+            return
+
         if self.config.output_format in ["jsonl", "both"]:
-            self._write_jsonl(rows, f"{output_prefix}.jsonl")
+            self._write_jsonl(rows, with_compression(f"{output_prefix}.jsonl", self.config.compression))
+        
+        if self.config.output_format in ["parquet", "both"]:
+            self._write_parquet(rows, f"{output_prefix}.parquet")
+    
+    def ingest_resumable(self, file_path: str, output_prefix: str, checkpoint_every: int = 1000,
+                         resume: bool = False) -> int:
+        """
+        Parse and write JSONL incrementally, checkpointing every `checkpoint_every` sheet rows.
+        
+        With `resume`, a run that stopped partway continues from its last
+        checkpoint: the JSONL output is truncated to the checkpointed length,
+        the hierarchy context is restored and parsing restarts at the next
+        sheet row. Parquet output (if requested) is written from the JSONL
+        once the sheet is complete, and the checkpoint is removed.
+        
+        Returns:
+            Number of rows in the JSONL output
+        """
+        if self.config.compression or self.config.sharded:
+            raise ValueError("Checkpointed ingestion writes plain JSONL; drop --compress/--shard-* options")
+        
+        jsonl_file = f"{output_prefix}.jsonl"
+        checkpointer = Checkpointer(checkpoint_path(jsonl_file), "ingest", file_path, {
+            "doc_id": self.config.doc_id,
+            "normalize_anchors": self.config.normalize_anchors,
+        })
+        
+        state = checkpointer.load() if resume else None
+        start_row, written, offset = 0, 0, None
+        if state:
+            start_row = state["position"]
+            written = state["context"]["rows_written"]
+            offset = state["outputs"][jsonl_file]
+            self.current_context = state["context"]["hierarchy"]
+            logger.info(f"Resuming {file_path} at sheet row {start_row} ({written} rows already written)")
+        
+        with open_for_resume(jsonl_file, offset) as f:
+            for index, excel_row in self.iter_indexed_rows(file_path, start_row):
+                if excel_row:
+                    f.write(excel_row.json() + '\n')
+                    written += 1
+                if (index + 1) % checkpoint_every == 0:
+                    checkpointer.save(index + 1, {jsonl_file: commit_output(f)}, {
+                        "rows_written": written,
+                        "hierarchy": dict(self.current_context),
+                    })
         
         if self.config.output_format in ["parquet", "both"]:
+            with open(jsonl_file, 'r', encoding='utf-8') as f:
+                rows = [ExcelRow(**json.loads(line)) for line in f]
             self._write_parquet(rows, f"{output_prefix}.parquet")
+        if self.config.output_format == "parquet":
+            os.remove(jsonl_file)
+        
+        checkpointer.clear()
+        logger.info(f"Successfully wrote {written} rows to JSONL")
+        return written
+    
+    def _write_sharded(self, rows: List[ExcelRow], output_prefix: str):
+        """Write rows to size-limited shards plus a manifest per format."""
+        formats = ["jsonl", "parquet"] if self.config.output_format == "both" else [self.config.output_format]
+        records = [json.loads(row.json()) for row in rows]
+        
+        for output_format in formats:
+            writer = ShardedWriter(
+                output_prefix,
+                output_format=output_format,
+                max_bytes=self.config.shard_max_bytes,
+                max_records=self.config.shard_max_records,
+                compression=self.config.compression,
+            )
+            writer.write(records)
+            manifest = writer.close()
+            logger.info(f"Wrote {manifest['records']} rows to {len(manifest['shards'])} "
+                        f"{output_format} shards: {writer.output_file}")
     
     def _write_jsonl(self, rows: List[ExcelRow], output_file: str):
         """Write rows to JSONL format."""
         logger.info(f"Writing JSONL output to: {output_file}")
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with open_text(output_file, 'w') as f:
             for row in rows:
                 f.write(row.json() + '\n')
         
@@ -485,6 +635,6 @@ class ExcelParser:
             data.append(row_dict)
         
         df = pd.DataFrame(data)
-        df.to_parquet(output_file, index=False)
+        df.to_parquet(output_file, index=False, compression=self.config.compression or "snappy")
         
         logger.info(f"Successfully wrote {len(rows)} rows to Parquet") 
\ No newline at end of file
@@ -0,0 +1,446 @@
+"""
+Interchangeable readers for the worksheet rows.
+
+Every reader yields the same row stream for the first worksheet: the header
+is sheet row `HEADER_ROW` (0-based; the ECM export leaves the first row
+empty), and each later row is yielded as `(index, {column: value})` with
+`index` counted from the first row under the header. Blank rows between data
+rows are yielded (all values None) so indexes match the sheet; trailing
+blank rows are not. Empty cells are None.
+
+Readers:
+
+- `xml`: streams the worksheet XML straight out of the .xlsx zip (stdlib only)
+- `openpyxl`: openpyxl's read-only streaming mode
+- `pandas`: `pd.read_excel` (the openpyxl engine), the slowest; also reads .xls
+- `csv` / `parquet`: a sheet already exported with `export_sheet`
+  (header in the first row)
+
+`reader="auto"` picks by extension, and for workbooks the first available
+reader in `XLSX_READERS`, which is ordered by `benchmark_readers` on the ECM
+export. Numeric cells are ints or floats in the `xml` and `openpyxl`
+readers; pandas may widen a column of ints to floats.
+"""
+
+import csv
+import os
+import posixpath
+import re
+import time
+import zipfile
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple
+from xml.etree.ElementTree import iterparse, fromstring
+
+
+HEADER_ROW = 1
+
+# Workbook readers, fastest first
+XLSX_READERS = ("xml", "openpyxl", "pandas")
+READERS = XLSX_READERS + ("csv", "parquet")
+
+Row = Tuple[int, Dict[str, Any]]
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# Built-in number formats that display dates/times
+_DATE_FORMAT_IDS = set(range(14, 23)) | {45, 46, 47}
+_ESCAPED_CHAR = re.compile(r'_x([0-9A-Fa-f]{4})_')
+_CELL_COLUMN = re.compile(r'[A-Z]+')
+
+
+class SheetRows:
+    """Column names and row stream of the first worksheet, as read by `reader`."""
+
+    def __init__(self, reader: str, columns: List[str], rows: Iterator[Row]):
+        self.reader = reader
+        self.columns = columns
+        self.rows = rows
+
+    def __iter__(self) -> Iterator[Row]:
+        return self.rows
+
+
+def available_readers() -> List[str]:
+    """Readers whose dependencies are installed."""
+    readers = ["xml", "csv"]
+    for name, module in (("openpyxl", "openpyxl"), ("pandas", "pandas"), ("parquet", "pyarrow")):
+        try:
+            __import__(module)
+            readers.append(name)
+        except ImportError:
+            pass
+    return [name for name in READERS if name in readers]
+
+
+def select_reader(path: str, reader: str = "auto") -> str:
+    """Resolve "auto" to a concrete reader for `path`."""
+    if reader != "auto":
+        if reader not in READERS:
+            raise ValueError(f"Unknown reader: {reader} (choose from auto, {', '.join(READERS)})")
+        return reader
+    extension = _extension(path)
+    if extension in (".csv", ".parquet"):
+        return extension[1:]
+    if extension == ".xls":
+        return "pandas"
+    available = available_readers()
+    return next(name for name in XLSX_READERS if name in available)
+
+
+def open_sheet(path: str, reader: str = "auto") -> SheetRows:
+    """Open the first worksheet of `path` with the given (or the fastest) reader."""
+    reader = select_reader(path, reader)
+    columns, rows = _OPENERS[reader](str(path))
+    return SheetRows(reader, columns, rows)
+
+
+def _extension(path: str) -> str:
+    """Lower-case extension, ignoring a .gz/.zst suffix."""
+    from .compression import strip_compression
+
+    return os.path.splitext(strip_compression(str(path)))[1].lower()
+
+
+def _column_names(header: Iterable[Any]) -> List[str]:
+    """Header cells to unique column names (as pandas names them)."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for position, value in enumerate(header):
+        name = f"Unnamed: {position}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _cell(value: Any) -> Any:
+    return None if value == "" else value
+
+
+def _sheet_rows(rows: Iterable[Tuple[int, Iterable[Any]]], header_row: int = HEADER_ROW) -> Tuple[List[str], Iterator[Row]]:
+    """
+    Split positioned rows `(sheet row, values)` into columns and the row stream.
+
+    Rows may skip positions (sparse sheets); the gaps are yielded as blank rows
+    when a non-blank row follows.
+    """
+    rows = iter(rows)
+    header: List[Any] = []
+    for position, values in rows:
+        if position == header_row:
+            header = list(values)
+            break
+        if position > header_row:
+            raise ValueError(f"Sheet has no header in row {header_row + 1}")
+    columns = _column_names(header)
+    width = len(columns)
+
+    def stream() -> Iterator[Row]:
+        blank = dict.fromkeys(columns)
+        next_index = 0
+        for position, values in rows:
+            values = [_cell(value) for value in list(values)[:width]]
+            if all(value is None for value in values):
+                continue
+            index = position - header_row - 1
+            while next_index < index:
+                yield next_index, dict(blank)
+                next_index += 1
+            values += [None] * (width - len(values))
+            yield index, dict(zip(columns, values))
+            next_index = index + 1
+
+    return columns, stream()
+
+
+def _read_pandas(path: str) -> Tuple[List[str], Iterator[Row]]:
+    import pandas as pd
+
+    # Only empty cells are missing; text such as "NA" is kept
+    df = pd.read_excel(path, sheet_name=0, header=HEADER_ROW, keep_default_na=False, na_values=[""])
+    columns = [str(column) for column in df.columns]
+
+    def stream() -> Iterator[Row]:
+        for index, values in zip(df.index, df.itertuples(index=False, name=None)):
+            yield int(index), {column: (None if pd.isna(value) else value) for column, value in zip(columns, values)}
+
+    return columns, stream()
+
+
+def _read_openpyxl(path: str) -> Tuple[List[str], Iterator[Row]]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+
+    def positioned() -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        try:
+            for position, values in enumerate(sheet.iter_rows(values_only=True)):
+                yield position, values
+        finally:
+            workbook.close()
+
+    return _sheet_rows(positioned())
+
+
+def _unescape(text: str) -> str:
+    """Decode Excel's `_xHHHH_` escapes (e.g. `_x000D_` for a carriage return)."""
+    return _ESCAPED_CHAR.sub(lambda m: chr(int(m.group(1), 16)), text) if '_x' in text else text
+
+
+def _string_item(element) -> str:
+    """Text of a shared/inline string: plain `<t>` or rich-text runs, without phonetic runs."""
+    parts = []
+    for child in element:
+        if child.tag == _MAIN_NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == _MAIN_NS + "r":
+            text = child.find(_MAIN_NS + "t")
+            parts.append(text.text or "" if text is not None else "")
+    return _unescape("".join(parts))
+
+
+def _column_index(reference: str) -> int:
+    index = 0
+    for letter in _CELL_COLUMN.match(reference).group(0):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _is_date_format(code: str) -> bool:
+    code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', '', code).lower()
+    return any(char in code for char in "dmyhs")
+
+
+class _Workbook:
+    """Parts of an .xlsx package needed to stream its first worksheet."""
+
+    def __init__(self, path: str):
+        self.archive = zipfile.ZipFile(path)
+        workbook = fromstring(self.archive.read("xl/workbook.xml"))
+        relations = {
+            rel.get("Id"): (rel.get("Type").rsplit("/", 1)[-1], self._part(rel.get("Target")))
+            for rel in fromstring(self.archive.read("xl/_rels/workbook.xml.rels")).iter(_REL_NS + "Relationship")
+        }
+        first = workbook.find(f"{_MAIN_NS}sheets/{_MAIN_NS}sheet")
+        self.sheet_part = relations[first.get(_DOC_REL_NS + "id")][1]
+        parts = {kind: part for kind, part in relations.values()}
+
+        properties = workbook.find(_MAIN_NS + "workbookPr")
+        date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+        self.epoch = datetime(1904, 1, 1) if date1904 else datetime(1899, 12, 30)
+        self.shared_strings = self._shared_strings(parts.get("sharedStrings"))
+        self.date_styles = self._date_styles(parts.get("styles"))
+
+    @staticmethod
+    def _part(target: str) -> str:
+        return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+
+    def _shared_strings(self, part: Optional[str]) -> List[str]:
+        strings: List[str] = []
+        if part is None:
+            return strings
+        with self.archive.open(part) as f:
+            for _, element in iterparse(f):
+                if element.tag == _MAIN_NS + "si":
+                    strings.append(_string_item(element))
+                    element.clear()
+        return strings
+
+    def _date_styles(self, part: Optional[str]) -> set:
+        """Indexes of cell styles whose number format shows a date."""
+        if part is None:
+            return set()
+        styles = fromstring(self.archive.read(part))
+        date_formats = set(_DATE_FORMAT_IDS)
+        for number_format in styles.iter(_MAIN_NS + "numFmt"):
+            if _is_date_format(number_format.get("formatCode", "")):
+                date_formats.add(int(number_format.get("numFmtId")))
+        cell_formats = styles.find(_MAIN_NS + "cellXfs")
+        if cell_formats is None:
+            return set()
+        return {index for index, xf in enumerate(cell_formats)
+                if int(xf.get("numFmtId", 0)) in date_formats}
+
+    def _value(self, cell) -> Any:
+        kind = cell.get("t", "n")
+        if kind == "inlineStr":
+            inline = cell.find(_MAIN_NS + "is")
+            return _string_item(inline) if inline is not None else None
+        value = cell.find(_MAIN_NS + "v")
+        if value is None or value.text is None:
+            return None
+        text = value.text
+        if kind == "s":
+            return self.shared_strings[int(text)]
+        if kind == "b":
+            return text == "1"
+        if kind in ("str", "e"):
+            return _unescape(text)
+        number = float(text)
+        if int(cell.get("s", 0)) in self.date_styles:
+            return self.epoch + timedelta(days=number)
+        return int(number) if number.is_integer() and '.' not in text and 'E' not in text.upper() else number
+
+    def positioned_rows(self) -> Iterator[Tuple[int, List[Any]]]:
+        """Yield (0-based sheet row, cell values) for every stored row."""
+        with self.archive.open(self.sheet_part) as f:
+            position = -1
+            for _, element in iterparse(f):
+                if element.tag != _MAIN_NS + "row":
+                    continue
+                position = int(element.get("r", position + 2)) - 1
+                values: List[Any] = []
+                for cell in element.iter(_MAIN_NS + "c"):
+                    reference = cell.get("r")
+                    column = _column_index(reference) if reference else len(values)
+                    values += [None] * (column - len(values))
+                    values.append(self._value(cell))
+                element.clear()
+                yield position, values
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+def _read_xml(path: str) -> Tuple[List[str], Iterator[Row]]:
+    workbook = _Workbook(path)
+
+    def positioned() -> Iterator[Tuple[int, List[Any]]]:
+        try:
+            yield from workbook.positioned_rows()
+        finally:
+            workbook.close()
+
+    return _sheet_rows(positioned())
+
+
+def _read_csv(path: str) -> Tuple[List[str], Iterator[Row]]:
+    from .compression import open_text
+
+    f = open_text(path)
+    reader = csv.reader(f)
+
+    def positioned() -> Iterator[Tuple[int, List[str]]]:
+        try:
+            yield from enumerate(reader)
+        finally:
+            f.close()
+
+    return _sheet_rows(positioned(), header_row=0)
+
+
+def _read_parquet(path: str) -> Tuple[List[str], Iterator[Row]]:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    columns = list(parquet_file.schema_arrow.names)
+
+    def stream() -> Iterator[Row]:
+        index = 0
+        for batch in parquet_file.iter_batches():
+            for record in batch.to_pylist():
+                yield index, {column: _cell(record[column]) for column in columns}
+                index += 1
+
+    return columns, stream()
+
+
+_OPENERS = {
+    "xml": _read_xml,
+    "openpyxl": _read_openpyxl,
+    "pandas": _read_pandas,
+    "csv": _read_csv,
+    "parquet": _read_parquet,
+}
+
+
+def export_sheet(path: str, output_file: str, reader: str = "auto") -> int:
+    """
+    Export the first worksheet to CSV or Parquet (by extension) for fast re-reads.
+
+    The header becomes the first row; blank rows are kept so row indexes (and
+    checkpoints) stay the same. Returns the number of rows written.
+    """
+    sheet = open_sheet(path, reader)
+    if _extension(output_file) == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = [{column: (None if value is None else str(value)) for column, value in row.items()}
+                for _, row in sheet]
+        table = pa.Table.from_pylist(rows, schema=pa.schema([(column, pa.string()) for column in sheet.columns]))
+        pq.write_table(table, output_file)
+        return len(rows)
+
+    from .compression import open_text
+
+    count = 0
+    with open_text(output_file, 'w') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(sheet.columns)
+        for _, row in sheet:
+            writer.writerow(["" if value is None else value for value in row.values()])
+            count += 1
+    return count
+
+
+def benchmark_readers(path: str, readers: Optional[Iterable[str]] = None, repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Time each reader over the whole row stream of `path`.
+
+    Returns one entry per reader with the median seconds, row count and
+    whether its rows equal those of the first reader (None if it failed).
+    """
+    if readers is None:
+        extension = _extension(path)
+        candidates = (extension[1:],) if extension in (".csv", ".parquet") else XLSX_READERS
+        readers = [name for name in candidates if name in available_readers()]
+
+    results: List[Dict[str, Any]] = []
+    reference = None
+    for reader in readers:
+        timings = []
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = list(open_sheet(path, reader))
+                timings.append(time.perf_counter() - started)
+        except Exception as e:
+            results.append({"reader": reader, "error": str(e), "seconds": None, "rows": None, "matches": None})
+            continue
+        if reference is None:
+            reference = rows
+        timings.sort()
+        results.append({
+            "reader": reader,
+            "seconds": timings[len(timings) // 2],
+            "rows": len(rows),
+            "matches": _same_rows(rows, reference),
+        })
+    return results
+
+
+def _same_rows(rows: List[Row], reference: List[Row]) -> bool:
+    """Rows equal up to int/float widening and stringified values."""
+    if len(rows) != len(reference):
+        return False
+    for (index, row), (reference_index, reference_row) in zip(rows, reference):
+        if index != reference_index or list(row) != list(reference_row):
+            return False
+        for value, expected in zip(row.values(), reference_row.values()):
+            if value != expected and _text(value) != _text(expected):
+                return False
+    return True
+
+
+def _text(value: Any) -> Optional[str]:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return None if value is None else str(value)
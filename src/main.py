@@ -4,18 +4,18 @@ Main CLI entry point for the Austin City Excel Ingestion Tool.
 
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List
 
 import typer
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.table import Table
-from loguru import logger
 
-from .excel_parser import ExcelParser
-from .models import ExcelIngestionConfig
-from .chunker import process_jsonl_with_chunking
-from .semantic_path_builder import enhance_records_with_semantic_paths
+# Only lightweight modules are imported here; each command imports the heavy
+# ones it needs (pandas, pydantic, loguru, numpy, regex, tiktoken) so that
+# `--help` and commands that never touch them start quickly.
+# `bench_imports.py` guards the startup time.
+from .compression import with_compression, strip_compression
+from .sharding import manifest_path, manifest_base
+from .reference_chunks import is_reference
 
 # Initialize Typer app
 app = typer.Typer(
@@ -35,12 +35,24 @@ def ingest(
     doc_id: str = typer.Option("ecm", "--doc-id", "-d", help="Document ID"),
     output_format: str = typer.Option("both", "--format", "-f", help="Output format: jsonl, parquet, or both"),
     normalize_anchors: bool = typer.Option(True, "--normalize-anchors", help="Remove trailing .0 from anchors"),
+    compress: str = typer.Option(None, "--compress", "-z", help="Compress outputs: gzip or zstd"),
+    shard_mb: float = typer.Option(None, "--shard-mb", help="Write shards of about this many MB plus a manifest"),
+    shard_records: int = typer.Option(None, "--shard-records", help="Write shards of at most this many records plus a manifest"),
+    checkpoint_every: int = typer.Option(None, "--checkpoint-every", help="Write JSONL incrementally and checkpoint every N sheet rows"),
+    resume: bool = typer.Option(False, "--resume", help="Resume from the last checkpoint of an interrupted run"),
+    regex_threads: int = typer.Option(1, "--regex-threads", help="Threads for reference extraction"),
+    reader: str = typer.Option("auto", "--reader", help="Sheet reader: auto, xml, openpyxl, pandas, csv, parquet"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging")
 ):
     """
     Ingest an Excel file and convert to structured JSON/Parquet format.
     """
     try:
+        from loguru import logger
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+        from .excel_parser import ExcelParser
+        from .models import ExcelIngestionConfig
+        
         # Configure logging
         log_level = "DEBUG" if verbose else "INFO"
         logger.remove()
@@ -59,13 +71,29 @@ def ingest(
         config = ExcelIngestionConfig(
             doc_id=doc_id,
             output_format=output_format,
-            normalize_anchors=normalize_anchors
+            normalize_anchors=normalize_anchors,
+            compression=compress,
+            shard_max_bytes=int(shard_mb * 1024 * 1024) if shard_mb else None,
+            shard_max_records=shard_records,
+            regex_threads=regex_threads,
+            reader=reader
         )
         
         console.print(f"[green]Starting ingestion of Excel file: {file_path}[/green]")
         console.print(f"Document ID: {doc_id}")
         console.print(f"Output format: {output_format}")
         
+        if checkpoint_every or resume:
+            parser = ExcelParser(config)
+            written = parser.ingest_resumable(file_path, output_prefix,
+                                              checkpoint_every=checkpoint_every or 1000, resume=resume)
+            console.print(f"\n[green]Successfully processed {written} rows[/green]")
+            if output_format in ["jsonl", "both"]:
+                console.print(f"JSONL output: {output_prefix}.jsonl")
+            if output_format in ["parquet", "both"]:
+                console.print(f"Parquet output: {output_prefix}.parquet")
+            return
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -90,12 +118,16 @@ def ingest(
         console.print(f"\n[green]Successfully processed {len(rows)} rows[/green]")
         
         # Show output files
-        if output_format in ["jsonl", "both"]:
-            jsonl_file = f"{output_prefix}.jsonl"
+        if config.sharded:
+            for fmt in ["jsonl", "parquet"]:
+                if output_format in [fmt, "both"]:
+                    console.print(f"{fmt.upper()} manifest: {manifest_path(output_prefix, fmt)}")
+        elif output_format in ["jsonl", "both"]:
+            jsonl_file = with_compression(f"{output_prefix}.jsonl", compress)
             if Path(jsonl_file).exists():
                 console.print(f"JSONL output: {jsonl_file}")
         
-        if output_format in ["parquet", "both"]:
+        if output_format in ["parquet", "both"] and not config.sharded:
             parquet_file = f"{output_prefix}.parquet"
             if Path(parquet_file).exists():
                 console.print(f"Parquet output: {parquet_file}")
@@ -110,21 +142,97 @@ def ingest(
         raise typer.Exit(1)
 
 
+@app.command()
+def run(
+    file_path: str = typer.Argument(..., help="Path to Excel file"),
+    output_prefix: str = typer.Option(None, "--output", "-o", help="Output file prefix"),
+    doc_id: str = typer.Option("ecm", "--doc-id", "-d", help="Document ID"),
+    output_format: str = typer.Option("both", "--format", "-f", help="Output format: jsonl, parquet, or both"),
+    max_tokens: int = typer.Option(300, "--max-tokens", "-t", help="Maximum tokens per chunk"),
+    batch_size: int = typer.Option(64, "--batch-size", help="Records per batch passed between stages"),
+    queue_size: int = typer.Option(8, "--queue-size", help="Maximum batches buffered between stages"),
+    chunk_workers: int = typer.Option(1, "--chunk-workers", help="Worker processes for chunking"),
+    bpe_path: str = typer.Option(None, "--bpe-path", envvar="AUSTIN_EXCEL_BPE_PATH", help="Local cl100k_base.tiktoken file (no download)"),
+    compress: str = typer.Option(None, "--compress", "-z", help="Compress outputs: gzip or zstd"),
+    shard_mb: float = typer.Option(None, "--shard-mb", help="Write shards of about this many MB plus a manifest"),
+    shard_records: int = typer.Option(None, "--shard-records", help="Write shards of at most this many records plus a manifest"),
+    reader: str = typer.Option("auto", "--reader", help="Sheet reader: auto, xml, openpyxl, pandas, csv, parquet"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging")
+):
+    """
+    Run ingest, semantic paths and chunking as one overlapping pipeline.
+    """
+    try:
+        from loguru import logger
+        from .models import ExcelIngestionConfig
+        from .pipeline_runner import run_pipeline
+        
+        _load_tokenizer(bpe_path)
+        
+        # Configure logging
+        log_level = "DEBUG" if verbose else "INFO"
+        logger.remove()
+        logger.add(sys.stderr, level=log_level)
+        
+        # Validate input file
+        if not Path(file_path).exists():
+            console.print(f"[red]Error: File {file_path} does not exist.[/red]")
+            raise typer.Exit(1)
+        
+        # Set output prefix if not provided
+        if not output_prefix:
+            output_prefix = f"{Path(file_path).stem}_semantic_chunked"
+        
+        config = ExcelIngestionConfig(
+            doc_id=doc_id,
+            output_format=output_format,
+            compression=compress,
+            shard_max_bytes=int(shard_mb * 1024 * 1024) if shard_mb else None,
+            shard_max_records=shard_records,
+            reader=reader
+        )
+        
+        console.print(f"[green]Running pipeline on: {file_path}[/green]")
+        stats = run_pipeline(
+            file_path, output_prefix, config,
+            max_tokens=max_tokens, batch_size=batch_size,
+            queue_size=queue_size, chunk_workers=chunk_workers
+        )
+        
+        console.print(f"\n[green]Processed {stats['rows']} rows into {stats['records']} records "
+                      f"in {stats['wall_seconds']:.2f}s[/green]")
+        console.print(f"  Stage busy time:")
+        for stage, seconds in stats['stage_seconds'].items():
+            console.print(f"    {stage}: {seconds:.2f}s")
+        for output in stats['outputs']:
+            console.print(f"Output: {output}")
+        
+    except typer.Exit:
+        raise
+    except Exception as e:
+        logger.error(f"Error during pipeline run: {e}")
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1)
+
+
 @app.command()
 def validate(
     file_path: str = typer.Argument(..., help="Path to Excel file"),
-    detailed: bool = typer.Option(False, "--detailed", "-d", help="Show detailed validation")
+    detailed: bool = typer.Option(False, "--detailed", "-d", help="Show detailed validation"),
+    reader: str = typer.Option("auto", "--reader", help="Sheet reader: auto, xml, openpyxl, pandas, csv, parquet"),
 ):
     """
     Validate an Excel file structure without processing.
     """
     try:
         import pandas as pd
+        from .excel_readers import open_sheet
         
         console.print(f"[cyan]Validating Excel file: {file_path}[/cyan]")
         
-        # Read Excel file
-        df = pd.read_excel(file_path, sheet_name=0)
+        # Read the sheet the way ingestion does (headers in the second row)
+        sheet = open_sheet(file_path, reader)
+        df = pd.DataFrame.from_records([row for _, row in sheet], columns=sheet.columns)
         
         # Check required columns
         required_columns = ['NodeId']
@@ -180,18 +288,22 @@ def validate(
 @app.command()
 def preview(
     file_path: str = typer.Argument(..., help="Path to Excel file"),
-    rows: int = typer.Option(5, "--rows", "-r", help="Number of rows to preview")
+    rows: int = typer.Option(5, "--rows", "-r", help="Number of rows to preview"),
+    reader: str = typer.Option("auto", "--reader", help="Sheet reader: auto, xml, openpyxl, pandas, csv, parquet"),
 ):
     """
     Preview Excel file structure and sample data.
     """
     try:
         import pandas as pd
+        from rich.table import Table
+        from .excel_readers import open_sheet
         
         console.print(f"[cyan]Previewing Excel file: {file_path}[/cyan]")
         
-        # Read Excel file - use second row as headers (first row is empty)
-        df = pd.read_excel(file_path, sheet_name=0, header=1)
+        # Read the sheet - second row holds the headers (first row is empty)
+        sheet = open_sheet(file_path, reader)
+        df = pd.DataFrame.from_records([row for _, row in sheet], columns=sheet.columns)
         
         # Show basic info
         console.print(f"\n[cyan]File Information:[/cyan]")
@@ -217,54 +329,428 @@ def preview(
         raise typer.Exit(1)
 
 
+@app.command()
+def bench_readers(
+    file_path: str = typer.Argument(..., help="Excel workbook (or exported CSV/Parquet sheet)"),
+    repeat: int = typer.Option(3, "--repeat", help="Reads per reader (median is reported)")
+):
+    """
+    Time every available sheet reader on a file and check they read the same rows.
+    """
+    try:
+        from rich.table import Table
+        from .excel_readers import benchmark_readers, select_reader
+        
+        console.print(f"[cyan]Benchmarking sheet readers on: {file_path}[/cyan]")
+        results = benchmark_readers(file_path, repeat=repeat)
+        
+        table = Table(title="Sheet readers")
+        table.add_column("Reader", style="cyan")
+        table.add_column("Median", justify="right")
+        table.add_column("Rows", justify="right")
+        table.add_column("Same rows", justify="center")
+        for result in results:
+            if result['seconds'] is None:
+                table.add_row(result['reader'], "failed", "", f"[red]{result['error']}[/red]")
+                continue
+            table.add_row(result['reader'], f"{result['seconds'] * 1000:.1f} ms", str(result['rows']),
+                          "[green]yes[/green]" if result['matches'] else "[red]no[/red]")
+        console.print(table)
+        
+        timed = [result for result in results if result['seconds'] is not None and result['matches']]
+        if timed:
+            fastest = min(timed, key=lambda result: result['seconds'])
+            console.print(f"Fastest: {fastest['reader']} (--reader auto uses {select_reader(file_path)})")
+        
+    except Exception as e:
+        console.print(f"[red]Benchmark failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def export_sheet(
+    file_path: str = typer.Argument(..., help="Path to Excel file"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Output .csv[.gz|.zst] or .parquet file"),
+    reader: str = typer.Option("auto", "--reader", help="Sheet reader: auto, xml, openpyxl, pandas, csv, parquet"),
+):
+    """
+    Export the worksheet to CSV or Parquet so later runs skip Excel decoding.
+    """
+    try:
+        from .excel_readers import export_sheet as export_worksheet
+        
+        if not output_file:
+            output_file = f"{Path(file_path).stem}.parquet"
+        
+        console.print(f"[cyan]Exporting sheet: {file_path}[/cyan]")
+        count = export_worksheet(file_path, output_file, reader)
+        console.print(f"\n[green]✓ Exported {count} rows to {output_file}[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Export failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
 @app.command()
 def chunk(
-    input_file: str = typer.Argument(..., help="Path to input JSONL file"),
+    input_file: str = typer.Argument(..., help="Path to input JSONL file or shard manifest"),
     output_file: str = typer.Option(None, "--output", "-o", help="Output file path"),
     max_tokens: int = typer.Option(300, "--max-tokens", "-t", help="Maximum tokens per chunk"),
+    dedup: bool = typer.Option(False, "--dedup", help="Drop exact and flag near-duplicate chunks"),
+    dedup_report: str = typer.Option(None, "--dedup-report", help="Write duplicate back-references to this JSONL file"),
+    token_cache: str = typer.Option(None, "--token-cache", help="Persistent token cache database (SQLite)"),
+    token_cache_mb: int = typer.Option(256, "--token-cache-mb", help="Token cache size budget in MB"),
+    cache_token_ids: bool = typer.Option(False, "--cache-token-ids", help="Also keep token ids in the token cache (reused by export-batches)"),
+    cache_dir: str = typer.Option(None, "--cache-dir", help="Reuse chunk outputs of unchanged records from this stage cache"),
+    checkpoint_every: int = typer.Option(None, "--checkpoint-every", help="Write output incrementally and checkpoint every N input records"),
+    resume: bool = typer.Option(False, "--resume", help="Resume from the last checkpoint of an interrupted run"),
+    regex_threads: int = typer.Option(1, "--regex-threads", help="Threads for chunking (regex matching releases the GIL)"),
+    reference: bool = typer.Option(False, "--reference", help="Store chunk children as offsets into their parent (.ref.jsonl)"),
+    bpe_path: str = typer.Option(None, "--bpe-path", envvar="AUSTIN_EXCEL_BPE_PATH", help="Local cl100k_base.tiktoken file (no download)"),
+    token_estimator: str = typer.Option(None, "--token-estimator", help="Calibrated estimator (from calibrate-tokens) for token-limit checks"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging")
 ):
     """
     Apply hierarchical chunking to long content in JSONL file.
     """
+    cache = _open_token_cache(token_cache, token_cache_mb, store_ids=cache_token_ids)
     try:
+        from .chunker import process_jsonl_with_chunking, configure_token_estimator
+        
+        _load_tokenizer(bpe_path)
+        estimator = None
+        if token_estimator:
+            from .token_estimator import TokenEstimator
+            from .tokenizer import get_encoding
+            
+            # The estimator approximates BPE counts, not the fallback estimate
+            if get_encoding() is None:
+                console.print("[yellow]No BPE encoder; ignoring --token-estimator[/yellow]")
+            else:
+                estimator = TokenEstimator.load(token_estimator)
+                configure_token_estimator(estimator)
+        
         # Set output file if not provided
         if not output_file:
-            output_file = input_file.replace('.jsonl', '_chunked.jsonl')
+            suffix = '_chunked.ref.jsonl' if reference else '_chunked.jsonl'
+            output_file = _jsonl_base(input_file).replace('.jsonl', suffix)
+        if reference and not is_reference(output_file):
+            raise ValueError(f"Reference outputs must end in .ref.jsonl: {output_file}")
         
         console.print(f"[cyan]Applying hierarchical chunking to: {input_file}[/cyan]")
         console.print(f"Output file: {output_file}")
         console.print(f"Max tokens per chunk: {max_tokens}")
         
         # Process the file
-        process_jsonl_with_chunking(input_file, output_file, max_tokens)
+        process_jsonl_with_chunking(input_file, output_file, max_tokens,
+                                    dedup=dedup, dedup_report=dedup_report, cache_dir=cache_dir,
+                                    checkpoint_every=checkpoint_every, resume=resume,
+                                    regex_threads=regex_threads)
+        
+        if estimator:
+            checks = estimator.stats['estimated'] + estimator.stats['exact']
+            console.print(f"Token estimator: {estimator.stats['estimated']} of {checks} limit checks settled without BPE")
         
         console.print(f"\n[green]✓ Chunking completed successfully[/green]")
         
     except Exception as e:
         console.print(f"[red]Chunking failed: {e}[/red]")
         raise typer.Exit(1)
+    finally:
+        _close_token_cache(cache)
+
+
+@app.command()
+def check_output(
+    input_file: str = typer.Argument(..., help="Output to check: JSONL, Parquet, shard manifest or dataset directory"),
+    workers: int = typer.Option(None, "--workers", "-w", help="Processes for per-record checks (default: CPU count)"),
+    batch_size: int = typer.Option(65536, "--batch-size", help="Records per checked batch"),
+    hashes: bool = typer.Option(True, "--hashes/--no-hashes", help="Recompute every record hash")
+):
+    """
+    Validate an output: schema, value ranges, hashes, anchor uniqueness and parent_anchor integrity.
+    """
+    try:
+        from rich.table import Table
+        from .output_checks import check_output as run_checks
+        
+        console.print(f"[cyan]Checking output: {input_file}[/cyan]")
+        report = run_checks(input_file, workers=workers, batch_size=batch_size, recompute_hashes=hashes)
+        
+        table = Table(title=f"{report['records']} records checked in {report['seconds']:.2f}s")
+        table.add_column("Check", style="cyan")
+        table.add_column("Failed", justify="right")
+        table.add_column("Examples")
+        for name, result in report['checks'].items():
+            failed = f"[red]{result['failed']}[/red]" if result['failed'] else "[green]0[/green]"
+            table.add_row(name, failed, ", ".join(str(example) for example in result['examples']))
+        console.print(table)
+        
+        failed_checks = [name for name, result in report['checks'].items() if result['failed']]
+        if failed_checks:
+            console.print(f"[red]✗ {len(failed_checks)} check(s) failed: {', '.join(failed_checks)}[/red]")
+            raise typer.Exit(1)
+        console.print(f"\n[green]✓ All checks passed[/green]")
+        
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Output check failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def verify_shards(
+    manifest_file: str = typer.Argument(..., help="Shard manifest (*.jsonl.manifest.json or *.parquet.manifest.json)")
+):
+    """
+    Check every shard of a manifest against its recorded size and SHA-256 checksum.
+    """
+    try:
+        from .sharding import is_manifest, read_manifest, verify_manifest
+        
+        if not is_manifest(manifest_file):
+            raise ValueError(f"Not a shard manifest: {manifest_file}")
+        
+        console.print(f"[cyan]Verifying shards of: {manifest_file}[/cyan]")
+        shards = len(read_manifest(manifest_file)["shards"])
+        bad = verify_manifest(manifest_file)
+        for shard_file in bad:
+            console.print(f"  [red]✗ {shard_file}[/red]")
+        if bad:
+            console.print(f"[red]✗ {len(bad)} of {shards} shard(s) are missing, truncated or corrupt; regenerate them[/red]")
+            raise typer.Exit(1)
+        console.print(f"\n[green]✓ All {shards} shards match the manifest[/green]")
+        
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Shard verification failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def diff(
+    old_file: str = typer.Argument(..., help="Output of the previous release (any output form)"),
+    new_file: str = typer.Argument(..., help="Output of the new release"),
+    report_file: str = typer.Option(None, "--report", "-o", help="Write every change as JSONL"),
+    run_size: int = typer.Option(200000, "--run-size", help="Sort entries held in memory before spilling a run to disk"),
+    tmp_dir: str = typer.Option(None, "--tmp-dir", help="Directory for sorted runs (default: system temp)"),
+    show: int = typer.Option(20, "--show", help="Changes to print")
+):
+    """
+    Diff two releases section by section: added, removed, modified and moved sections.
+    """
+    try:
+        from rich.table import Table
+        from .release_diff import diff_releases
+
+        console.print(f"[cyan]Diffing {old_file} -> {new_file}[/cyan]")
+        result = diff_releases(old_file, new_file, report_file=report_file, run_size=run_size, tmp_dir=tmp_dir)
+        counts = result['counts']
+
+        console.print(f"Sections: {result['old_sections']} -> {result['new_sections']} "
+                      f"({result['skipped_subtrees']} unchanged subtrees skipped, {result['seconds']:.2f}s)")
+        console.print(f"[green]+{counts['added']} added[/green]  [red]-{counts['removed']} removed[/red]  "
+                      f"[yellow]~{counts['modified']} modified[/yellow]  [blue]>{counts['moved']} moved[/blue]  "
+                      f"{counts['unchanged']} unchanged")
+
+        if result['changes'] and show:
+            table = Table(title=f"Changes (first {min(show, len(result['changes']))})")
+            table.add_column("Change", style="cyan")
+            table.add_column("Anchor")
+            table.add_column("Title")
+            table.add_column("Detail")
+            for change in result['changes'][:show]:
+                detail = ""
+                if change['change'] == "moved":
+                    detail = f"from {' > '.join(change['old_path'][:-1]) or '(root)'}"
+                    if change['modified']:
+                        detail += ", content changed"
+                table.add_row(change['change'], change['anchor'], (change['title'] or "")[:50], detail)
+            console.print(table)
+
+        if report_file:
+            console.print(f"\n[green]✓ Wrote {len(result['changes'])} changes to {report_file}[/green]")
+
+    except Exception as e:
+        console.print(f"[red]Diff failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def calibrate_tokens(
+    input_file: str = typer.Argument(..., help="JSONL file or shard manifest whose content is representative"),
+    output_file: str = typer.Option("token_estimator.json", "--output", "-o", help="Estimator file to write"),
+    coverage: float = typer.Option(1.0, "--coverage", help="Fraction of calibration texts the error bounds must contain"),
+    max_samples: int = typer.Option(200000, "--max-samples", help="Calibrate on at most this many texts"),
+    bpe_path: str = typer.Option(None, "--bpe-path", envvar="AUSTIN_EXCEL_BPE_PATH", help="Local cl100k_base.tiktoken file (no download)")
+):
+    """
+    Fit the fast token estimator used by chunk --token-estimator against exact BPE counts.
+    """
+    try:
+        from .sharding import read_records
+        from .token_estimator import calibrate, calibration_texts
+        from .tokenizer import get_encoding
+        
+        _load_tokenizer(bpe_path)
+        encoding = get_encoding()
+        if encoding is None:
+            raise ValueError("Calibration needs exact BPE counts; pass --bpe-path")
+        
+        console.print(f"[cyan]Calibrating token estimator on: {input_file}[/cyan]")
+        contents = [record.get('content') for record in read_records(input_file)
+                    if isinstance(record.get('content'), str)]
+        texts = calibration_texts(contents, max_samples)
+        exact = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+        
+        estimator = calibrate(texts, exact, coverage)
+        estimator.save(output_file)
+        
+        report = estimator.report
+        console.print(f"  Samples: {report['samples']} texts, {report['tokens']} tokens")
+        console.print(f"  Mean absolute error: {report['mean_abs_error']} tokens")
+        console.print(f"  Relative error p50/p95/p99: {report['relative_error']['p50']:.1%} / "
+                      f"{report['relative_error']['p95']:.1%} / {report['relative_error']['p99']:.1%}")
+        console.print(f"  Within bounds: {report['bounds']['within_bounds']:.1%}")
+        for limit, entry in report['thresholds'].items():
+            console.print(f"  Limit {limit}: {entry['settled_by_estimate']:.1%} settled by estimate "
+                          f"({entry['exact_calls_saved']} exact counts saved, {entry['wrong_decisions']} wrong)")
+        console.print(f"\n[green]✓ Estimator written to {output_file}[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Calibration failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def dedup(
+    input_file: str = typer.Argument(..., help="Chunked output: JSONL, shard manifest, .ref or .norm form"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Output file path"),
+    report_file: str = typer.Option(None, "--report", "-r", help="Write duplicate back-references to this JSONL file"),
+    threshold: float = typer.Option(0.85, "--threshold", help="Near-duplicate similarity threshold")
+):
+    """
+    Drop exact duplicate chunks and flag near duplicates.
+    """
+    try:
+        from .dedup import dedup_jsonl
+        
+        # Set output file if not provided
+        if not output_file:
+            output_file = _jsonl_base(input_file).replace('.jsonl', '_dedup.jsonl')
+        
+        console.print(f"[cyan]Deduplicating: {input_file}[/cyan]")
+        console.print(f"Output file: {output_file}")
+        
+        stats = dedup_jsonl(input_file, output_file, report_file, threshold)
+        
+        console.print(f"  Records scanned: {stats['records']}")
+        console.print(f"  Not chunks (passed through): {stats['skipped']}")
+        console.print(f"  Exact duplicate chunks dropped: {stats['dropped']}")
+        console.print(f"  Duplicates flagged: {stats['exact'] - stats['dropped'] + stats['near']}")
+        console.print(f"\n[green]✓ Deduplication completed successfully[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Deduplication failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def normalize(
+    input_file: str = typer.Argument(..., help="Path to input JSONL file or shard manifest"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Output file path (must end in .norm.jsonl[.gz|.zst])")
+):
+    """
+    Write records in normalized form: shared values in dictionary tables, records refer to them by id.
+    """
+    try:
+        import os
+        import time
+        from .normalized import normalize_jsonl, tables_path, NormalizedRecords
+        
+        # Set output file if not provided
+        if not output_file:
+            output_file = _jsonl_base(input_file).replace('.jsonl', '.norm.jsonl')
+        
+        console.print(f"[cyan]Normalizing: {input_file}[/cyan]")
+        stats = normalize_jsonl(input_file, output_file)
+        
+        normalized_bytes = os.path.getsize(output_file) + os.path.getsize(tables_path(output_file))
+        console.print(f"  Records: {stats['records']}")
+        console.print(f"  Records file: {output_file}")
+        console.print(f"  Tables file: {tables_path(output_file)}")
+        if os.path.isfile(input_file):
+            input_bytes = os.path.getsize(input_file)
+            console.print(f"  Size: {input_bytes / 1e6:.2f} MB -> {normalized_bytes / 1e6:.2f} MB "
+                          f"({normalized_bytes / max(input_bytes, 1):.0%})")
+        
+        started = time.perf_counter()
+        count = sum(1 for _ in NormalizedRecords(output_file))
+        console.print(f"  Rehydrated {count} records in {time.perf_counter() - started:.3f}s")
+        console.print(f"\n[green]✓ Normalization completed successfully[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Normalization failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def materialize(
+    input_file: str = typer.Argument(..., help="Path to reference-form chunk output (.ref.jsonl)"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Output file path")
+):
+    """
+    Rebuild full chunk records from reference-form output.
+    """
+    try:
+        import os
+        from .reference_chunks import materialize_jsonl
+        
+        # Set output file if not provided
+        if not output_file:
+            output_file = input_file.replace('.ref.jsonl', '.jsonl')
+        if output_file == input_file:
+            raise ValueError("Input is not a .ref.jsonl file; pass --output")
+        
+        console.print(f"[cyan]Materializing: {input_file}[/cyan]")
+        stats = materialize_jsonl(input_file, output_file)
+        
+        console.print(f"  Records: {stats['records']}")
+        console.print(f"  Output file: {output_file}")
+        console.print(f"  Size: {os.path.getsize(input_file) / 1e6:.2f} MB -> "
+                      f"{os.path.getsize(output_file) / 1e6:.2f} MB")
+        console.print(f"\n[green]✓ Materialization completed successfully[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Materialization failed: {e}[/red]")
+        raise typer.Exit(1)
 
 
 @app.command()
 def semantic_path(
-    input_file: str = typer.Argument(..., help="Path to input JSONL file"),
+    input_file: str = typer.Argument(..., help="Path to input JSONL file or shard manifest"),
     output_file: str = typer.Option(None, "--output", "-o", help="Output file path"),
+    cache_dir: str = typer.Option(None, "--cache-dir", help="Reuse semantic paths of unchanged records from this stage cache"),
+    columnar: bool = typer.Option(False, "--columnar", help="Build paths on a columnar in-memory store"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging")
 ):
     """
     Add semantic paths based on subtitles to JSONL file.
     """
     try:
+        from .semantic_path_builder import enhance_records_with_semantic_paths
+        
         # Set output file if not provided
         if not output_file:
-            output_file = input_file.replace('.jsonl', '_semantic.jsonl')
+            output_file = _jsonl_base(input_file).replace('.jsonl', '_semantic.jsonl')
         
         console.print(f"[cyan]Adding semantic paths to: {input_file}[/cyan]")
         console.print(f"Output file: {output_file}")
         
         # Process the file
-        enhance_records_with_semantic_paths(input_file, output_file)
+        enhance_records_with_semantic_paths(input_file, output_file, cache_dir=cache_dir, columnar=columnar)
         
         console.print(f"\n[green]✓ Semantic paths added successfully[/green]")
         
@@ -273,6 +759,366 @@ def semantic_path(
         raise typer.Exit(1)
 
 
+@app.command()
+def export_batches(
+    input_file: str = typer.Argument(..., help="Chunked output: JSONL, shard manifest, .ref or .norm form"),
+    output_dir: str = typer.Option(None, "--output", "-o", help="Output directory for batch arrays"),
+    token_budget: int = typer.Option(8192, "--token-budget", "-b", help="Maximum padded tokens per batch"),
+    max_batch_size: int = typer.Option(None, "--max-batch-size", help="Maximum chunks per batch"),
+    token_cache: str = typer.Option(None, "--token-cache", help="Persistent token cache database (SQLite)"),
+    token_cache_mb: int = typer.Option(256, "--token-cache-mb", help="Token cache size budget in MB"),
+    bpe_path: str = typer.Option(None, "--bpe-path", envvar="AUSTIN_EXCEL_BPE_PATH", help="Local cl100k_base.tiktoken file (no download)")
+):
+    """
+    Export pre-tokenized, token-budgeted batches as NumPy arrays.
+    """
+    cache = _open_token_cache(token_cache, token_cache_mb, store_ids=True)
+    try:
+        from .batch_packer import export_batches as run_export
+        
+        _load_tokenizer(bpe_path)
+        
+        # Set output directory if not provided
+        if not output_dir:
+            output_dir = strip_compression(_jsonl_base(input_file)).replace('.jsonl', '_batches')
+        
+        console.print(f"[cyan]Exporting token batches from: {input_file}[/cyan]")
+        console.print(f"Output directory: {output_dir}")
+        console.print(f"Token budget: {token_budget}")
+        
+        manifest = run_export(input_file, output_dir, token_budget, max_batch_size)
+        
+        console.print(f"  Chunks: {manifest['chunks']}")
+        console.print(f"  Parents skipped (covered by their chunks): {manifest['skipped_parents']}")
+        console.print(f"  Batches: {manifest['batches']}")
+        console.print(f"  Tokens: {manifest['tokens']} ({manifest['padding_ratio'] * 100:.1f}% padding)")
+        console.print(f"\n[green]✓ Batch export completed successfully[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Batch export failed: {e}[/red]")
+        raise typer.Exit(1)
+    finally:
+        _close_token_cache(cache)
+
+
+@app.command()
+def tree_build(
+    input_file: str = typer.Argument(..., help="Records: JSONL, shard manifest, .ref or .norm form"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Output tree file (.npz)")
+):
+    """
+    Build a persistent document tree index from a JSONL file.
+    """
+    try:
+        from .document_tree import DocumentTree
+        
+        # Set output file if not provided
+        if not output_file:
+            output_file = strip_compression(_jsonl_base(input_file)).replace('.jsonl', '.tree.npz')
+
+        console.print(f"[cyan]Building document tree from: {input_file}[/cyan]")
+
+        tree = DocumentTree.from_jsonl(input_file)
+        tree.save(output_file)
+
+        console.print(f"  Nodes: {len(tree)}")
+        console.print(f"  Roots: {len(tree.roots())}")
+        console.print(f"  Maximum depth: {int(tree.depth.max()) if len(tree) else 0}")
+        console.print(f"\n[green]✓ Tree written to {output_file}[/green]")
+
+    except Exception as e:
+        console.print(f"[red]Tree build failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def tree_query(
+    tree_file: str = typer.Argument(..., help="Path to tree file (.npz)"),
+    anchor: str = typer.Argument(..., help="Anchor to query"),
+    relation: str = typer.Option("descendants", "--relation", "-r", help="descendants, children, ancestors, or siblings")
+):
+    """
+    Query a document tree index for related anchors.
+    """
+    try:
+        from .document_tree import DocumentTree
+        
+        tree = DocumentTree.load(tree_file)
+        node_id = tree.node_id(anchor)
+
+        if relation == "descendants":
+            node_ids = tree.descendants(node_id)
+        elif relation == "children":
+            node_ids = tree.children(node_id)
+        elif relation == "ancestors":
+            node_ids = tree.ancestors(node_id)
+        elif relation == "siblings":
+            node_ids = tree.siblings(node_id)
+        else:
+            console.print(f"[red]Unknown relation: {relation}[/red]")
+            raise typer.Exit(1)
+
+        console.print(f"[cyan]{relation.capitalize()} of {anchor}: {len(node_ids)}[/cyan]")
+        for related in tree.to_anchors(node_ids):
+            console.print(f"  {related}")
+
+    except typer.Exit:
+        raise
+    except KeyError:
+        console.print(f"[red]Anchor not found: {anchor}[/red]")
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"[red]Tree query failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def xref_build(
+    input_file: str = typer.Argument(..., help="Records: JSONL, shard manifest, .ref or .norm form"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Output graph file (.npz)")
+):
+    """
+    Build a cross-reference graph from the refs in a JSONL file.
+    """
+    try:
+        from .reference_graph import ReferenceGraph
+        
+        # Set output file if not provided
+        if not output_file:
+            output_file = strip_compression(_jsonl_base(input_file)).replace('.jsonl', '.xref.npz')
+
+        console.print(f"[cyan]Building cross-reference graph from: {input_file}[/cyan]")
+
+        graph = ReferenceGraph.from_jsonl(input_file)
+        graph.save(output_file)
+
+        external = len([node for node in graph.nodes if ':' in node])
+        console.print(f"  Nodes: {len(graph.nodes)} ({external} external codes)")
+        console.print(f"  Edges: {graph.num_edges}")
+        console.print(f"\n[green]✓ Graph written to {output_file}[/green]")
+
+    except Exception as e:
+        console.print(f"[red]Cross-reference build failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def xref_query(
+    graph_file: str = typer.Argument(..., help="Path to graph file (.npz)"),
+    target: str = typer.Argument(..., help="Anchor or citation (e.g. 'LDC 25-8-186')"),
+    cited_by: bool = typer.Option(False, "--cited-by", help="Show what cites the target instead of what it cites"),
+    depth: int = typer.Option(1, "--depth", "-k", help="Maximum number of hops to follow")
+):
+    """
+    Query a cross-reference graph for citing or cited anchors.
+    """
+    try:
+        from .reference_graph import ReferenceGraph
+        
+        graph = ReferenceGraph.load(graph_file)
+        node_id = graph.resolve(target)
+
+        results = graph.traverse(node_id, depth=depth, reverse=cited_by)
+        label = "Cited by" if cited_by else "Cites"
+        console.print(f"[cyan]{label} {graph.nodes[node_id]} (depth {depth}): {len(results)}[/cyan]")
+        for related, hops in results:
+            console.print(f"  {'  ' * (hops - 1)}{graph.nodes[related]}")
+
+    except KeyError:
+        console.print(f"[red]Target not found: {target}[/red]")
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"[red]Cross-reference query failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def partition(
+    input_file: str = typer.Argument(..., help="Path to input JSONL file or shard manifest"),
+    output_dir: str = typer.Option(None, "--output", "-o", help="Dataset directory"),
+    compress: str = typer.Option(None, "--compress", "-z", help="Parquet codec (default snappy)")
+):
+    """
+    Write records as a Parquet dataset partitioned by section and block_type.
+    """
+    try:
+        from .partitioned import write_partitioned_dataset
+        from .sharding import read_records
+        
+        # Set output directory if not provided
+        if not output_dir:
+            output_dir = strip_compression(_jsonl_base(input_file)).replace('.jsonl', '_dataset')
+        
+        console.print(f"[cyan]Partitioning: {input_file}[/cyan]")
+        stats = write_partitioned_dataset(read_records(input_file), output_dir, compression=compress)
+        
+        console.print(f"  Rows: {stats['rows']}")
+        console.print(f"  Partition files: {len(stats['files'])}")
+        console.print(f"  Dataset: {output_dir}")
+        console.print(f"\n[green]✓ Dataset written successfully[/green]")
+        
+    except Exception as e:
+        console.print(f"[red]Partitioning failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def partition_query(
+    dataset_dir: str = typer.Argument(..., help="Dataset directory written by 'partition'"),
+    sections: List[str] = typer.Option(None, "--section", "-s", help="Section(s) to read"),
+    block_types: List[str] = typer.Option(None, "--block-type", "-b", help="Block type(s) to read"),
+    output_file: str = typer.Option(None, "--output", "-o", help="Write matching records to this JSONL file"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Matching anchors to print")
+):
+    """
+    Read a partitioned dataset, pruning partitions that do not match the filters.
+    """
+    try:
+        import json
+        from .partitioned import iter_partitioned_records, scanned_files
+        from .compression import open_text
+        
+        files = scanned_files(dataset_dir, sections, block_types)
+        records = list(iter_partitioned_records(dataset_dir, sections, block_types))
+        
+        console.print(f"[cyan]Matched {len(records)} records from "
+                      f"{files['selected']}/{files['total']} partition files[/cyan]")
+        for record in records[:limit]:
+            console.print(f"  {record['anchor']}  [{record['block_type']}]  {record.get('title') or ''}")
+        
+        if output_file:
+            with open_text(output_file, 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            console.print(f"Output written to: {output_file}")
+        
+    except Exception as e:
+        console.print(f"[red]Dataset query failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def watch(
+    input_dir: str = typer.Argument(..., help="Directory to watch for new or modified workbooks"),
+    output_dir: str = typer.Option(None, "--output-dir", "-o", help="Directory for outputs (default: the input directory)"),
+    doc_id: str = typer.Option("ecm", "--doc-id", "-d", help="Document ID"),
+    max_tokens: int = typer.Option(300, "--max-tokens", "-t", help="Maximum tokens per chunk"),
+    interval: float = typer.Option(1.0, "--interval", help="Seconds between directory polls"),
+    compress: str = typer.Option(None, "--compress", "-z", help="Compress outputs: gzip or zstd"),
+    reader: str = typer.Option("auto", "--reader", help="Sheet reader: auto, xml, openpyxl, pandas, csv, parquet"),
+    bpe_path: str = typer.Option(None, "--bpe-path", envvar="AUSTIN_EXCEL_BPE_PATH", help="Local cl100k_base.tiktoken file (no download)"),
+    once: bool = typer.Option(False, "--once", help="Bring outputs up to date and exit instead of watching")
+):
+    """
+    Keep a warm process that re-runs ingest, semantic paths and chunking on changed workbooks.
+    """
+    try:
+        from loguru import logger
+        from .models import ExcelIngestionConfig
+        from .watcher import Watcher
+        
+        if not Path(input_dir).is_dir():
+            console.print(f"[red]Error: {input_dir} is not a directory.[/red]")
+            raise typer.Exit(1)
+        
+        _load_tokenizer(bpe_path)
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+        
+        config = ExcelIngestionConfig(doc_id=doc_id, compression=compress, reader=reader)
+        watcher = Watcher(input_dir, output_dir, config, max_tokens=max_tokens, interval=interval)
+        
+        def report(stats):
+            name = Path(stats['file']).name
+            if stats['status'] == "unchanged":
+                console.print(f"{name}: content unchanged, output kept")
+            elif stats['status'] == "removed":
+                console.print(f"{name}: removed, state dropped (output kept)")
+            elif stats['status'] == "warmed":
+                console.print(f"{name}: output up to date; state loaded in {stats['seconds']:.2f}s")
+            else:
+                console.print(f"[green]{name}[/green]: {stats['rows']} rows -> {stats['records']} records "
+                              f"in {stats['seconds']:.2f}s ({stats['rechunked']} rechunked, {stats['reused']} reused; "
+                              f"+{stats['added']}/-{stats['removed']} sections) -> {stats['output']}")
+        
+        console.print(f"[cyan]Watching {input_dir} (every {interval:g}s); outputs in {watcher.output_dir}[/cyan]")
+        watcher.run(report, once=once)
+        
+    except KeyboardInterrupt:
+        console.print("\nStopped watching")
+    except typer.Exit:
+        raise
+    except Exception as e:
+        console.print(f"[red]Watch failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def serve(
+    input_file: str = typer.Argument(..., help="Path to JSONL output, shard manifest or normalized output"),
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind (localhost by default)"),
+    port: int = typer.Option(8765, "--port", "-p", help="Port to listen on"),
+    cache_size: int = typer.Option(1024, "--cache-size", help="Responses kept in the LRU cache")
+):
+    """
+    Serve anchor, children, subtree, path-prefix and search queries over HTTP.
+    """
+    try:
+        from .server import serve as run_server
+        
+        console.print(f"[cyan]Loading {input_file}...[/cyan]")
+        console.print(f"Listening on http://{host}:{port} (Ctrl+C to stop)")
+        run_server(input_file, host=host, port=port, cache_size=cache_size)
+        
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Server stopped[/yellow]")
+    except Exception as e:
+        console.print(f"[red]Server failed: {e}[/red]")
+        raise typer.Exit(1)
+
+
+def _jsonl_base(input_file: str) -> str:
+    """Single-file JSONL name for an input, so default outputs never overwrite a manifest."""
+    base = manifest_base(input_file)
+    if base.endswith('.parquet'):
+        base = base[:-len('.parquet')] + '.jsonl'
+    return base
+
+
+def _load_tokenizer(bpe_path: Optional[str]) -> None:
+    """Load the BPE encoder once, before any work, and report its source and load time."""
+    from .tokenizer import configure_encoding
+    
+    info = configure_encoding(bpe_path)
+    if info["encoding"] is not None:
+        console.print(f"Tokenizer: {info['source']} (loaded in {info['seconds']:.2f}s)")
+
+
+def _open_token_cache(path: Optional[str], size_mb: int, store_ids: bool = False):
+    """Open the persistent token cache and install it in the chunker."""
+    if not path:
+        return None
+    from .chunker import configure_token_cache
+    from .token_cache import TokenCache
+    
+    cache = TokenCache(path, max_bytes=size_mb * 1024 * 1024, store_ids=store_ids)
+    configure_token_cache(cache)
+    return cache
+
+
+def _close_token_cache(cache) -> None:
+    """Flush and detach the token cache, reporting its hit rate."""
+    if cache is None:
+        return
+    from .chunker import configure_token_cache
+    
+    configure_token_cache(None)
+    cache.close()
+    lookups = cache.stats['hits'] + cache.stats['misses']
+    if lookups:
+        console.print(f"Token cache: {cache.stats['hits']}/{lookups} hits, {cache.stats['evicted']} evicted")
+
+
 def _show_statistics(rows):
     """Show processing statistics."""
     console.print(f"\n[cyan]Processing Statistics:[/cyan]")
@@ -80,4 +80,13 @@ class ExcelIngestionConfig(BaseModel):
         description="Known heading vocabulary for confidence scoring"
     )
     output_format: str = Field("both", description="Output format: jsonl, parquet, or both")
-    normalize_anchors: bool = Field(True, description="Remove trailing .0 from anchors") 
\ No newline at end of file
+    normalize_anchors: bool = Field(True, description="Remove trailing .0 from anchors")
+    compression: Optional[str] = Field(None, description="Output compression: gzip, zstd, or None")
+    shard_max_bytes: Optional[int] = Field(None, description="Roll over to a new output shard after this many bytes")
+    shard_max_records: Optional[int] = Field(None, description="Roll over to a new output shard after this many records")
+    regex_threads: int = Field(1, description="Threads for reference extraction (regex matching releases the GIL)")
+    reader: str = Field("auto", description="Sheet reader: auto, xml, openpyxl, pandas, csv or parquet")
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_max_bytes is not None or self.shard_max_records is not None 
\ No newline at end of file
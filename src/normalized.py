@@ -0,0 +1,241 @@
+"""
+Normalized (dictionary-table) record output.
+
+Shared values are written once into dictionary tables and records refer to
+them by small integer ids:
+
+- `doc_id`, `source`, `section_labels`, `ingested_at` and `semantic_path`
+  become `@doc_id`, `@source`, ... ids into their tables
+- `url` becomes `@url: [prefix_id, suffix]`, sharing the municode prefix
+- chunk children drop fields they inherit unchanged from their parent
+  (title, subtitle, url, node_id, section_labels, source, ...), which are
+  stored once per parent in the `parents` table and referenced by `@parent`
+- derivable fields are dropped: `semantic_path_string` (joined
+  `semantic_path`), `semantic_content` ("<path string> | <content>") and a
+  child's `path` (parent path + own anchor)
+- `@keys` refers to the record's key order, so rehydrated records are
+  identical to the originals
+
+Files:
+
+    <name>.norm.jsonl         one normalized record per line (.gz/.zst allowed)
+    <name>.norm.tables.json   dictionary tables, written on close
+
+`NormalizedRecords` loads the tables and rehydrates records lazily, one line
+at a time, on iteration or indexed access.
+"""
+
+import json
+from typing import List, Dict, Any, Optional, Iterator
+
+from .compression import open_text, strip_compression
+
+
+NORMALIZED_SUFFIX = ".norm.jsonl"
+
+# Fields stored in dictionary tables (table name -> record field)
+TABLE_FIELDS = {
+    "doc_ids": "doc_id",
+    "sources": "source",
+    "section_labels": "section_labels",
+    "ingested_at": "ingested_at",
+    "semantic_paths": "semantic_path",
+}
+
+# Fields chunk children usually copy from their parent
+INHERITED_FIELDS = ('doc_id', 'node_id', 'title', 'subtitle', 'url',
+                    'section_labels', 'ingested_at', 'source')
+
+_MISSING = object()
+
+
+def is_normalized(path: str) -> bool:
+    return strip_compression(path).endswith(NORMALIZED_SUFFIX)
+
+
+def tables_path(path: str) -> str:
+    """Tables file of a normalized output ("x.norm.jsonl.gz" -> "x.norm.tables.json")."""
+    return strip_compression(path)[:-len(".jsonl")] + ".tables.json"
+
+
+def _semantic_content(record: Dict[str, Any], path_string: str) -> str:
+    """`semantic_content` as the chunker derives it."""
+    content = record.get('content')
+    return f"{path_string} | {content}" if content else path_string
+
+
+class _Table:
+    """Append-only dictionary table of JSON values."""
+
+    def __init__(self, values: Optional[List[Any]] = None):
+        self.values: List[Any] = values or []
+        self._index: Dict[str, int] = {}
+
+    def encode(self, value: Any) -> int:
+        key = json.dumps(value, ensure_ascii=False)
+        code = self._index.get(key)
+        if code is None:
+            code = len(self.values)
+            self._index[key] = code
+            self.values.append(value)
+        return code
+
+
+class NormalizedWriter:
+    """Write records in normalized form (same write/close interface as JsonlWriter)."""
+
+    def __init__(self, output_file: str):
+        if not is_normalized(output_file):
+            raise ValueError(f"Normalized outputs must end in {NORMALIZED_SUFFIX}: {output_file}")
+        self.output_file = output_file
+        self.tables_file = tables_path(output_file)
+        self.count = 0
+
+        self.tables = {name: _Table() for name in TABLE_FIELDS}
+        self.url_prefixes = _Table()
+        self.shapes = _Table()
+        self.parents = _Table()
+        self._parent_ids: Dict[str, int] = {}
+        self._file = open_text(output_file, 'w')
+
+    def _parent_for(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if 'chunk_meta' not in record:
+            return None
+        parent_id = self._parent_ids.get(record.get('parent_anchor'))
+        return None if parent_id is None else self.parents.values[parent_id]
+
+    def normalize(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the normalized form of one record."""
+        row: Dict[str, Any] = {'@keys': self.shapes.encode(list(record))}
+        parent = self._parent_for(record)
+        if parent is not None:
+            row['@parent'] = self._parent_ids[record['parent_anchor']]
+
+        semantic_path = record.get('semantic_path')
+        for key, value in record.items():
+            if parent is not None and key in INHERITED_FIELDS and parent.get(key, _MISSING) == value:
+                continue
+            if (key == 'path' and parent is not None and 'path' in parent
+                    and value == parent['path'] + [record.get('anchor')]):
+                continue
+            if (key == 'semantic_path_string' and isinstance(semantic_path, list)
+                    and all(isinstance(segment, str) for segment in semantic_path)
+                    and value == ' > '.join(semantic_path)):
+                continue
+            if (key == 'semantic_content' and isinstance(record.get('semantic_path_string'), str)
+                    and value == _semantic_content(record, record['semantic_path_string'])):
+                continue
+            if key == 'url' and isinstance(value, str):
+                split = max(value.rfind('/'), value.rfind('=')) + 1
+                row['@url'] = [self.url_prefixes.encode(value[:split]), value[split:]]
+                continue
+            table = next((name for name, field in TABLE_FIELDS.items() if field == key), None)
+            if table is not None:
+                row['@' + key] = self.tables[table].encode(value)
+                continue
+            row[key] = value
+
+        # Register parents so their chunk children can inherit from them
+        if record.get('has_children'):
+            entry = {key: record[key] for key in INHERITED_FIELDS + ('path',) if key in record}
+            self._parent_ids[record.get('anchor')] = self.parents.encode(entry)
+        return row
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._file.write(''.join(
+            json.dumps(self.normalize(r), ensure_ascii=False, separators=(',', ':')) + '\n'
+            for r in records
+        ))
+        self.count += len(records)
+
+    def close(self) -> None:
+        self._file.close()
+        tables = {name: table.values for name, table in self.tables.items()}
+        tables.update({
+            "version": 1,
+            "url_prefixes": self.url_prefixes.values,
+            "shapes": self.shapes.values,
+            "parents": self.parents.values,
+        })
+        with open(self.tables_file, 'w', encoding='utf-8') as f:
+            json.dump(tables, f, ensure_ascii=False)
+
+
+def rehydrate(row: Dict[str, Any], tables: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the original record from a normalized row."""
+    parent = tables["parents"][row['@parent']] if '@parent' in row else None
+    record: Dict[str, Any] = {}
+
+    def value_of(key: str) -> Any:
+        if key in record:
+            return record[key]
+        if key in row:
+            return row[key]
+        if key == 'url' and '@url' in row:
+            prefix_id, suffix = row['@url']
+            return tables["url_prefixes"][prefix_id] + suffix
+        if '@' + key in row:
+            table = next(name for name, field in TABLE_FIELDS.items() if field == key)
+            return tables[table][row['@' + key]]
+        if parent is not None and key in INHERITED_FIELDS:
+            return parent[key]
+        if key == 'path':
+            return parent['path'] + [value_of('anchor')]
+        if key == 'semantic_path_string':
+            return ' > '.join(value_of('semantic_path'))
+        if key == 'semantic_content':
+            return _semantic_content({'content': value_of('content')}, value_of('semantic_path_string'))
+        raise KeyError(key)
+
+    for key in tables["shapes"][row['@keys']]:
+        record[key] = value_of(key)
+    return record
+
+
+class NormalizedRecords:
+    """Lazily rehydrating reader for normalized output."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(tables_path(path), 'r', encoding='utf-8') as f:
+            self.tables = json.load(f)
+        self._lines: Optional[List[str]] = None
+
+    def _all_lines(self) -> List[str]:
+        # Raw lines are kept and only parsed when a record is requested
+        if self._lines is None:
+            with open_text(self.path) as f:
+                self._lines = f.readlines()
+        return self._lines
+
+    def __len__(self) -> int:
+        return len(self._all_lines())
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return rehydrate(json.loads(self._all_lines()[i]), self.tables)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._lines is not None:
+            return (rehydrate(json.loads(line), self.tables) for line in self._lines)
+        return self._stream()
+
+    def _stream(self) -> Iterator[Dict[str, Any]]:
+        with open_text(self.path) as f:
+            for line in f:
+                yield rehydrate(json.loads(line), self.tables)
+
+
+def normalize_jsonl(input_file: str, output_file: str) -> Dict[str, int]:
+    """Convert a JSONL file (or manifest) to normalized form; returns record count."""
+    from .sharding import read_records
+
+    writer = NormalizedWriter(output_file)
+    batch = []
+    for record in read_records(input_file):
+        batch.append(record)
+        if len(batch) >= 1000:
+            writer.write(batch)
+            batch = []
+    writer.write(batch)
+    writer.close()
+    return {"records": writer.count}
@@ -0,0 +1,291 @@
+"""
+Vectorized validation of pipeline outputs.
+
+`check_output` loads an output (JSONL, Parquet, shard manifest, partitioned
+dataset, normalized or reference form) as an Arrow table and runs:
+
+- `schema`: required columns are present with the expected Arrow types
+- `not_null`: identifying columns have no nulls
+- `hash_format`, `confidence_range`, `tokens_range`, `order_range`,
+  `block_type`: per-value format and range checks
+- `hash`: every hash is recomputed (ingested records from
+  node_id|title|subtitle|content, chunk records as in
+  `chunker.generate_record_hash`)
+- `anchor_unique` and `parent_anchor`: anchors are unique, and every
+  `parent_anchor` names an anchor in the output (and not itself)
+
+Checks are Arrow compute kernels over whole columns. Per-record checks run
+on batches; with `workers > 1` and more than one batch they run on a process
+pool (hash recomputation is the only per-value Python work). Each check
+reports how many records failed and a few example anchors.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .compression import detect_compression
+from .normalized import is_normalized
+from .reference_chunks import is_reference
+from .sharding import is_manifest, read_manifest, read_records
+
+
+BLOCK_TYPES = ("HEADING", "PARA", "TABLE", "APPENDIX", "GLOSSARY")
+HASH_PATTERN = r"^sha256:[0-9a-f]{64}$"
+
+CHECKS = ("schema", "not_null", "hash_format", "confidence_range", "tokens_range", "order_range",
+          "block_type", "hash", "anchor_unique", "parent_anchor")
+
+MAX_EXAMPLES = 5
+
+
+def _is_text(t: pa.DataType) -> bool:
+    return pa.types.is_string(t) or pa.types.is_large_string(t)
+
+
+def _is_number(t: pa.DataType) -> bool:
+    return pa.types.is_integer(t) or pa.types.is_floating(t)
+
+
+def _is_list(t: pa.DataType) -> bool:
+    return pa.types.is_list(t) or pa.types.is_large_list(t)
+
+
+# Column -> (type predicate, type name, required)
+COLUMN_TYPES: Dict[str, Any] = {
+    "doc_id": (_is_text, "string", True),
+    "anchor": (_is_text, "string", True),
+    "node_id": (_is_text, "string", True),
+    "path": (_is_list, "list", True),
+    "block_type": (_is_text, "string", True),
+    "order": (pa.types.is_integer, "integer", True),
+    "confidence": (_is_number, "number", True),
+    "hash": (_is_text, "string", True),
+    "ingested_at": (_is_text, "string", True),
+    "title": (_is_text, "string", False),
+    "subtitle": (_is_text, "string", False),
+    "content": (_is_text, "string", False),
+    "url": (_is_text, "string", False),
+    "parent_anchor": (_is_text, "string", False),
+    "tokens": (pa.types.is_integer, "integer", False),
+    "chunk_meta": (pa.types.is_struct, "struct", False),
+}
+
+NOT_NULL_COLUMNS = ("doc_id", "anchor", "node_id", "block_type", "order", "hash")
+
+
+def load_output_table(path: str, workers: int = 4) -> pa.Table:
+    """Read any pipeline output into one Arrow table (shards are read in parallel)."""
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    if is_manifest(path):
+        manifest = read_manifest(path)
+        files = [shard["file"] for shard in manifest["shards"]]
+        if manifest["format"] == "parquet":
+            return ds.dataset(files, format="parquet").to_table()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            tables = list(pool.map(_read_jsonl_table, files))
+        return pa.concat_tables(tables, promote_options="default") if tables else pa.table({})
+    if os.path.isdir(path):
+        if any(name.startswith("section=") for name in os.listdir(path)):
+            from .partitioned import open_partitioned
+
+            return open_partitioned(path).to_table()
+        return ds.dataset(path, format="parquet", ignore_prefixes=[".", "_"]).to_table()
+    if is_normalized(path) or is_reference(path):
+        # Rehydrate first; the JSON reader infers the schema over all records
+        import pyarrow.json as pj
+
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in read_records(path))
+        return pj.read_json(pa.BufferReader(lines.encode('utf-8')))
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    return _read_jsonl_table(path)
+
+
+def _read_jsonl_table(path: str) -> pa.Table:
+    import pyarrow.json as pj
+
+    compression = detect_compression(path)
+    with pa.input_stream(path, compression=compression) as stream:
+        return pj.read_json(stream)
+
+
+def _column(data, name: str, length: int) -> pa.Array:
+    """Column as text, all nulls when absent."""
+    if name not in data.schema.names:
+        return pa.nulls(length, pa.string())
+    column = data.column(name)
+    return column.cast(pa.string()) if pa.types.is_null(column.type) else column
+
+
+def _failures(mask, anchors, limit: int = MAX_EXAMPLES) -> Dict[str, Any]:
+    mask = pc.fill_null(mask, False)
+    failed = pc.sum(mask).as_py() or 0
+    examples = pc.filter(anchors, mask).slice(0, limit).to_pylist() if failed else []
+    return {"failed": failed, "examples": examples}
+
+
+def expected_hashes(batch: pa.RecordBatch) -> List[str]:
+    """Recompute the hash of every record in `batch`."""
+    length = batch.num_rows
+    is_chunk = (pc.is_valid(batch.column("chunk_meta")) if "chunk_meta" in batch.schema.names
+                else pa.array([False] * length))
+
+    # Join kernels need one string type; pandas-written Parquet has large_string columns
+    def text(name: str) -> pa.Array:
+        return _column(batch, name, length).cast(pa.large_string())
+
+    separator = pa.scalar("|", pa.large_string())
+
+    # Ingested records: node_id|title|subtitle|content, missing values as ""
+    ingested = pc.binary_join_element_wise(
+        *[text(name) for name in ("node_id", "title", "subtitle", "content")], separator,
+        null_handling="replace", null_replacement=""
+    )
+    if pc.any(is_chunk).as_py():
+        # Chunk records: doc_id|parent anchor|title|subtitle|chunk|chunk_no, None as "None"
+        chunk_no = pc.struct_field(batch.column("chunk_meta"), "chunk_no").cast(pa.large_string())
+        chunks = pc.binary_join_element_wise(
+            *[text(name) for name in ("doc_id", "parent_anchor", "title", "subtitle", "content")],
+            chunk_no, separator, null_handling="replace", null_replacement="None"
+        )
+        strings = pc.if_else(is_chunk, chunks, ingested)
+    else:
+        strings = ingested
+    return _sha256_each(strings)
+
+
+def _sha256_each(strings: pa.Array) -> List[str]:
+    """Hash each value straight from the Arrow buffers (no Python strings)."""
+    if isinstance(strings, pa.ChunkedArray):
+        strings = strings.combine_chunks()
+    _, offsets_buffer, data_buffer = strings.buffers()
+    offsets = memoryview(offsets_buffer).cast('q' if pa.types.is_large_string(strings.type) else 'i')
+    data = memoryview(data_buffer) if data_buffer is not None else memoryview(b'')
+    sha256 = hashlib.sha256
+    start = strings.offset
+    return [f"sha256:{sha256(data[offsets[i]:offsets[i + 1]]).hexdigest()}"
+            for i in range(start, start + len(strings))]
+
+
+def check_batch(batch: pa.RecordBatch, columns: List[str], recompute_hashes: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Per-record checks over one batch; `columns` are those that passed the schema check."""
+    length = batch.num_rows
+    anchors = _column(batch, "anchor", length)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    not_null = pa.array([False] * length)
+    for name in NOT_NULL_COLUMNS:
+        if name in columns:
+            not_null = pc.or_(not_null, pc.is_null(batch.column(name)))
+    results["not_null"] = _failures(not_null, anchors)
+
+    if "hash" in columns:
+        hashes = batch.column("hash")
+        results["hash_format"] = _failures(pc.invert(pc.match_substring_regex(hashes, HASH_PATTERN)), anchors)
+        if recompute_hashes:
+            expected = pa.array(expected_hashes(batch), pa.string())
+            results["hash"] = _failures(pc.not_equal(expected, hashes), anchors)
+    if "confidence" in columns:
+        confidence = batch.column("confidence")
+        results["confidence_range"] = _failures(pc.or_(pc.less(confidence, 0), pc.greater(confidence, 1)), anchors)
+    if "tokens" in columns:
+        results["tokens_range"] = _failures(pc.less(batch.column("tokens"), 0), anchors)
+    if "order" in columns:
+        results["order_range"] = _failures(pc.less(batch.column("order"), 0), anchors)
+    if "block_type" in columns:
+        allowed = pa.array(BLOCK_TYPES, pa.string())
+        results["block_type"] = _failures(pc.invert(pc.is_in(batch.column("block_type"), value_set=allowed)), anchors)
+    return results
+
+
+def _check_batch_job(args) -> Dict[str, Dict[str, Any]]:
+    return check_batch(*args)
+
+
+def _check_schema(schema: pa.Schema):
+    """Return (problems, columns usable by the other checks)."""
+    problems = []
+    usable = []
+    for name, (predicate, type_name, required) in COLUMN_TYPES.items():
+        if name not in schema.names:
+            if required:
+                problems.append(f"{name}: missing")
+            continue
+        column_type = schema.field(name).type
+        if pa.types.is_null(column_type):
+            if required:
+                problems.append(f"{name}: always null")
+            continue
+        if not predicate(column_type):
+            problems.append(f"{name}: {column_type}, expected {type_name}")
+            continue
+        usable.append(name)
+    return problems, usable
+
+
+def _merge(total: Dict[str, Dict[str, Any]], part: Dict[str, Dict[str, Any]]) -> None:
+    for name, result in part.items():
+        entry = total.setdefault(name, {"failed": 0, "examples": []})
+        entry["failed"] += result["failed"]
+        entry["examples"] = (entry["examples"] + result["examples"])[:MAX_EXAMPLES]
+
+
+def check_table(table: pa.Table, workers: int = 1, batch_size: int = 65536,
+                recompute_hashes: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Run every check on `table`; returns {check: {"failed", "examples"}} in CHECKS order."""
+    problems, columns = _check_schema(table.schema)
+    results: Dict[str, Dict[str, Any]] = {"schema": {"failed": len(problems), "examples": problems[:MAX_EXAMPLES]}}
+
+    # Workers only receive the columns the checks read
+    batches = table.select([name for name in table.column_names if name in COLUMN_TYPES]).to_batches(max_chunksize=batch_size)
+    jobs = [(batch, columns, recompute_hashes) for batch in batches]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_check_batch_job, jobs))
+    else:
+        parts = [_check_batch_job(job) for job in jobs]
+    for part in parts:
+        _merge(results, part)
+
+    if "anchor" in columns:
+        anchors = table.column("anchor")
+        counts = pc.value_counts(anchors)
+        duplicated = pc.filter(counts, pc.greater(counts.field("counts"), 1))
+        results["anchor_unique"] = {
+            "failed": int(pc.sum(duplicated.field("counts")).as_py() or 0),
+            "examples": duplicated.field("values").slice(0, MAX_EXAMPLES).to_pylist(),
+        }
+        if "parent_anchor" in columns:
+            parents = table.column("parent_anchor")
+            known = pc.unique(anchors)
+            dangling = pc.or_(pc.invert(pc.is_in(parents, value_set=known)), pc.equal(parents, anchors))
+            results["parent_anchor"] = _failures(pc.and_(pc.is_valid(parents), dangling), anchors)
+
+    return {name: results[name] for name in CHECKS if name in results}
+
+
+def check_output(path: str, workers: Optional[int] = None, batch_size: int = 65536,
+                 recompute_hashes: bool = True) -> Dict[str, Any]:
+    """
+    Validate an output file; returns {"records", "seconds", "checks"}.
+
+    Args:
+        path: Output file, shard manifest or dataset directory
+        workers: Processes for per-record checks (defaults to the CPU count)
+        batch_size: Records per batch
+        recompute_hashes: Recompute every hash (the slowest check)
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    table = load_output_table(path, workers)
+    checks = check_table(table, workers, batch_size, recompute_hashes)
+    return {"records": table.num_rows, "seconds": time.perf_counter() - started, "checks": checks}
@@ -0,0 +1,149 @@
+"""
+Hive-partitioned Parquet datasets.
+
+`write_partitioned_dataset` splits records by `section` (from
+`section_labels`) and `block_type`:
+
+    <dir>/section=appendix-q/block_type=HEADING/part-0.parquet
+    <dir>/section=1/block_type=PARA/part-0.parquet
+    <dir>/_metadata        footers (row-group statistics) of every file
+
+Rows are sorted by `order` before writing, so row-group min/max statistics
+on `order` are tight. `read_partitioned` pushes section/block_type filters
+down to directory pruning and any other filter down to row-group
+statistics, so section-scoped reads only open the matching files.
+"""
+
+import os
+from typing import List, Dict, Any, Optional, Iterable, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .writers import RECORD_SCHEMA, flatten_for_parquet, record_from_parquet_row
+
+
+PARTITION_COLUMNS = ("section", "block_type")
+
+
+def _partitioning(partition_cols: Sequence[str]) -> ds.Partitioning:
+    # Explicit string types: hive inference would turn section=1 into an integer
+    return ds.partitioning(
+        pa.schema([(name, pa.string()) for name in partition_cols]),
+        flavor="hive",
+    )
+
+
+def write_partitioned_dataset(records: Iterable[Dict[str, Any]], output_dir: str,
+                              partition_cols: Sequence[str] = PARTITION_COLUMNS,
+                              compression: Optional[str] = None,
+                              max_rows_per_group: int = 10_000) -> Dict[str, Any]:
+    """
+    Write records as a Hive-partitioned Parquet dataset.
+
+    Existing files in matching partitions are replaced. A `_metadata` file
+    with the footers (including column statistics) of every data file is
+    written alongside.
+
+    Returns:
+        Dataset statistics: rows, files, and rows per partition file
+    """
+    table = pa.Table.from_pylist([flatten_for_parquet(r) for r in records], schema=RECORD_SCHEMA)
+    table = table.sort_by("order")
+
+    metadata_collector: List[pq.FileMetaData] = []
+    files: Dict[str, int] = {}
+
+    def visit(written_file):
+        relative = os.path.relpath(written_file.path, output_dir)
+        written_file.metadata.set_file_path(relative)
+        metadata_collector.append(written_file.metadata)
+        files[relative] = written_file.metadata.num_rows
+
+    ds.write_dataset(
+        table,
+        output_dir,
+        format="parquet",
+        partitioning=_partitioning(partition_cols),
+        existing_data_behavior="delete_matching",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression or "snappy"),
+        max_rows_per_group=max_rows_per_group,
+        min_rows_per_group=0,
+        file_visitor=visit,
+    )
+
+    # Data files do not carry the partition columns, so neither does _metadata
+    data_schema = table.schema
+    for name in partition_cols:
+        data_schema = data_schema.remove(data_schema.get_field_index(name))
+    pq.write_metadata(data_schema, os.path.join(output_dir, "_metadata"),
+                      metadata_collector=metadata_collector)
+
+    return {"rows": table.num_rows, "files": files}
+
+
+def open_partitioned(dataset_dir: str, partition_cols: Sequence[str] = PARTITION_COLUMNS) -> ds.Dataset:
+    """Open a dataset written by `write_partitioned_dataset`."""
+    return ds.dataset(
+        dataset_dir,
+        format="parquet",
+        partitioning=_partitioning(partition_cols),
+        exclude_invalid_files=True,
+        ignore_prefixes=[".", "_"],
+    )
+
+
+def partition_filter(sections: Optional[Sequence[str]] = None,
+                     block_types: Optional[Sequence[str]] = None,
+                     expression: Optional[ds.Expression] = None) -> Optional[ds.Expression]:
+    """Combine section/block_type selections and an extra expression into one filter."""
+    filters = []
+    if sections:
+        filters.append(pc.field("section").isin(list(sections)))
+    if block_types:
+        filters.append(pc.field("block_type").isin(list(block_types)))
+    if expression is not None:
+        filters.append(expression)
+    if not filters:
+        return None
+    combined = filters[0]
+    for extra in filters[1:]:
+        combined = combined & extra
+    return combined
+
+
+def read_partitioned(dataset_dir: str, sections: Optional[Sequence[str]] = None,
+                     block_types: Optional[Sequence[str]] = None,
+                     expression: Optional[ds.Expression] = None,
+                     columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Read the rows matching the given sections/block types (and `expression`).
+
+    Partition filters prune whole directories; other predicates are checked
+    against row-group statistics before any data is decoded. Without
+    `columns`, columns come back in the standard record order.
+    """
+    dataset = open_partitioned(dataset_dir)
+    table = dataset.to_table(filter=partition_filter(sections, block_types, expression), columns=columns)
+    if columns is None:
+        table = table.select([name for name in RECORD_SCHEMA.names if name in table.column_names])
+    return table
+
+
+def scanned_files(dataset_dir: str, sections: Optional[Sequence[str]] = None,
+                  block_types: Optional[Sequence[str]] = None,
+                  expression: Optional[ds.Expression] = None) -> Dict[str, int]:
+    """Number of data files a filtered read opens versus the dataset total."""
+    dataset = open_partitioned(dataset_dir)
+    selected = dataset.get_fragments(filter=partition_filter(sections, block_types, expression))
+    return {"selected": sum(1 for _ in selected), "total": len(dataset.files)}
+
+
+def iter_partitioned_records(dataset_dir: str, sections: Optional[Sequence[str]] = None,
+                             block_types: Optional[Sequence[str]] = None,
+                             expression: Optional[ds.Expression] = None) -> Iterable[Dict[str, Any]]:
+    """Yield matching rows as record dicts (section labels re-nested)."""
+    for row in read_partitioned(dataset_dir, sections, block_types, expression).to_pylist():
+        yield record_from_parquet_row(row)
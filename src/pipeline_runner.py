@@ -0,0 +1,197 @@
+"""
+Asyncio pipeline runner connecting ingestion, semantic paths and chunking.
+
+Stages run concurrently and pass batches of records through bounded queues:
+
+    parse (ExcelParser.iter_rows) -> semantic paths -> chunking -> writers
+
+Bounded queues provide backpressure, so a slow writer throttles parsing
+instead of letting batches pile up in memory. Blocking work runs in
+executors: parsing, enrichment and writing on threads, chunking on a process
+pool when `chunk_workers > 1`. End-to-end time approaches that of the slowest
+stage rather than the sum of all of them.
+
+Unlike the batch `semantic-path` command, records are enriched in sheet order
+(parents always precede children in ExcelParser output) and written in that
+order.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator
+
+from loguru import logger
+
+from .chunker import chunk_record
+from .compression import with_compression
+from .excel_parser import ExcelParser
+from .models import ExcelIngestionConfig
+from .semantic_path_builder import add_semantic_path
+from .sharding import ShardedWriter
+from .writers import JsonlWriter, ParquetWriter
+
+
+# Queue sentinel marking the end of the stream
+_DONE = None
+
+
+def _next_batch(rows: Iterator, batch_size: int) -> List[Dict[str, Any]]:
+    """Pull up to `batch_size` parsed rows and convert them to plain records."""
+    batch = []
+    for row in rows:
+        batch.append(json.loads(row.json()))
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+def _enrich_batch(records: List[Dict[str, Any]], anchor_index: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add semantic paths to a batch (sequential: depends on earlier batches)."""
+    return [add_semantic_path(record, anchor_index) for record in records]
+
+
+def _chunk_batch(records: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+    """Chunk a batch of records (module-level so process pools can pickle it)."""
+    chunked = []
+    for record in records:
+        chunked.extend(chunk_record(record, max_tokens))
+    return chunked
+
+
+def _write_batch(writers: List[Any], records: List[Dict[str, Any]]) -> None:
+    for writer in writers:
+        writer.write(records)
+
+
+async def run_pipeline_async(file_path: str, output_prefix: str, config: ExcelIngestionConfig,
+                             max_tokens: int = 300, batch_size: int = 64, queue_size: int = 8,
+                             chunk_workers: int = 1) -> Dict[str, Any]:
+    """
+    Run parse -> semantic paths -> chunking -> write with overlapping stages.
+
+    Writes `<output_prefix>.jsonl` and/or `<output_prefix>.parquet` according
+    to `config.output_format` (JSONL gets a .gz/.zst suffix when
+    `config.compression` is set), or shards plus a manifest per format when
+    the config sets a shard size or record limit.
+
+    Returns run statistics: record counts, wall time and busy time per stage.
+    """
+    loop = asyncio.get_running_loop()
+    parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    enriched_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    chunked_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    busy = {"parse": 0.0, "semantic": 0.0, "chunk": 0.0, "write": 0.0}
+    counts = {"rows": 0, "records": 0}
+
+    io_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="pipeline")
+    chunk_pool: Executor = (
+        ProcessPoolExecutor(max_workers=chunk_workers) if chunk_workers > 1 else io_pool
+    )
+
+    writers = []
+    for output_format in ("jsonl", "parquet"):
+        if config.output_format not in [output_format, "both"]:
+            continue
+        if config.sharded:
+            writers.append(ShardedWriter(output_prefix, output_format,
+                                         max_bytes=config.shard_max_bytes,
+                                         max_records=config.shard_max_records,
+                                         compression=config.compression))
+        elif output_format == "jsonl":
+            writers.append(JsonlWriter(with_compression(f"{output_prefix}.jsonl", config.compression)))
+        else:
+            writers.append(ParquetWriter(f"{output_prefix}.parquet", compression=config.compression))
+
+    async def timed(stage: str, executor: Executor, fn, *args):
+        started = time.perf_counter()
+        result = await loop.run_in_executor(executor, fn, *args)
+        busy[stage] += time.perf_counter() - started
+        return result
+
+    async def parse_stage():
+        parser = ExcelParser(config)
+        rows = parser.iter_rows(file_path)
+        while True:
+            batch = await timed("parse", io_pool, _next_batch, rows, batch_size)
+            if not batch:
+                break
+            counts["rows"] += len(batch)
+            await parsed_queue.put(batch)
+        await parsed_queue.put(_DONE)
+
+    async def semantic_stage():
+        anchor_index: Dict[str, Dict[str, Any]] = {}
+        while True:
+            batch = await parsed_queue.get()
+            if batch is _DONE:
+                break
+            await enriched_queue.put(await timed("semantic", io_pool, _enrich_batch, batch, anchor_index))
+        await enriched_queue.put(_DONE)
+
+    async def chunk_stage():
+        # Keep up to `chunk_workers` batches in flight, emitting them in order
+        pending: deque = deque()
+        while True:
+            batch = await enriched_queue.get()
+            if batch is _DONE:
+                break
+            pending.append(asyncio.ensure_future(
+                timed("chunk", chunk_pool, _chunk_batch, batch, max_tokens)
+            ))
+            if len(pending) >= max(chunk_workers, 1):
+                await chunked_queue.put(await pending.popleft())
+        while pending:
+            await chunked_queue.put(await pending.popleft())
+        await chunked_queue.put(_DONE)
+
+    async def write_stage():
+        while True:
+            batch = await chunked_queue.get()
+            if batch is _DONE:
+                break
+            counts["records"] += len(batch)
+            await timed("write", io_pool, _write_batch, writers, batch)
+        await loop.run_in_executor(io_pool, lambda: [writer.close() for writer in writers])
+
+    started = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(stage())
+        for stage in (parse_stage, semantic_stage, chunk_stage, write_stage)
+    ]
+    try:
+        done, pending_tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending_tasks:
+            task.cancel()
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        io_pool.shutdown(wait=True)
+        if chunk_pool is not io_pool:
+            chunk_pool.shutdown(wait=True)
+
+    stats = {
+        "rows": counts["rows"],
+        "records": counts["records"],
+        "wall_seconds": time.perf_counter() - started,
+        "stage_seconds": busy,
+        "outputs": [writer.output_file for writer in writers],
+    }
+    logger.info(f"Pipeline finished: {stats['rows']} rows -> {stats['records']} records "
+                f"in {stats['wall_seconds']:.2f}s")
+    return stats
+
+
+def run_pipeline(file_path: str, output_prefix: str, config: ExcelIngestionConfig,
+                 max_tokens: int = 300, batch_size: int = 64, queue_size: int = 8,
+                 chunk_workers: int = 1) -> Dict[str, Any]:
+    """Synchronous wrapper around `run_pipeline_async`."""
+    return asyncio.run(run_pipeline_async(
+        file_path, output_prefix, config,
+        max_tokens=max_tokens, batch_size=batch_size,
+        queue_size=queue_size, chunk_workers=chunk_workers,
+    ))
@@ -0,0 +1,496 @@
+"""
+Columnar in-memory record store.
+
+Records are held as a struct of arrays instead of one dict per record:
+
+- repeated strings (doc_id, anchors, titles, ingested_at, ...) are
+  dictionary-encoded: one copy of each distinct value plus an int32 code
+  per record
+- `url` is split into a dictionary-encoded prefix and suffix, so the long
+  shared municode prefix is stored once
+- long text (`content`, `semantic_content`) lives in one UTF-8 buffer with
+  int64 offsets
+- list fields (`path`, `semantic_path`) are offsets into a flat array of
+  dictionary codes, so a child's copy of its parent's path costs a few ints
+- `source` and `section_labels` are stored as one dictionary column per key,
+  `refs` as offsets into flat text/span/type arrays
+
+Each record's key order is kept as a dictionary-encoded "shape", so
+`record(i)` rebuilds exactly the dict that was appended. Fields with other
+value types fall back to a plain object column.
+"""
+
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+
+from .sharding import read_records
+
+
+class _Dictionary:
+    """Distinct values and their codes; None is code -1."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._index: Dict[Tuple[type, Any], int] = {}
+
+    def encode(self, value: Any) -> int:
+        if value is None:
+            return -1
+        # Key by type too so True and 1 get different codes
+        key = (value.__class__, value)
+        code = self._index.get(key)
+        if code is None:
+            code = len(self.values)
+            self._index[key] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Any:
+        return self.values[code] if code >= 0 else None
+
+    def lookup(self, value: Any) -> int:
+        """Code of `value`, or -1 if it was never encoded."""
+        if value is None:
+            return -1
+        return self._index.get((value.__class__, value), -1)
+
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(value) for value in self.values)
+
+
+def _array_nbytes(values: array) -> int:
+    return values.buffer_info()[1] * values.itemsize
+
+
+class _Column(ABC):
+    """Base column: subclasses store non-None values, the null mask is shared."""
+
+    def __init__(self):
+        self.nulls = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.nulls)
+
+    def append(self, value: Any) -> None:
+        if value is None:
+            self.nulls.append(1)
+            self._append_placeholder()
+        else:
+            self._append_value(value)
+            self.nulls.append(0)
+
+    def get(self, i: int) -> Any:
+        return None if self.nulls[i] else self._get_value(i)
+
+    def values(self) -> Iterator[Any]:
+        return (self.get(i) for i in range(len(self)))
+
+    def nbytes(self) -> int:
+        return len(self.nulls)
+
+    @abstractmethod
+    def _append_value(self, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def _append_placeholder(self) -> None:
+        ...
+
+    @abstractmethod
+    def _get_value(self, i: int) -> Any:
+        ...
+
+
+class DictColumn(_Column):
+    """Dictionary-encoded scalars (strings, bools)."""
+
+    def __init__(self):
+        super().__init__()
+        self.dictionary = _Dictionary()
+        self.codes = array('i')
+
+    def _append_value(self, value: Any) -> None:
+        if isinstance(value, (list, dict)):
+            raise TypeError("DictColumn holds scalars")
+        self.codes.append(self.dictionary.encode(value))
+
+    def _append_placeholder(self) -> None:
+        self.codes.append(-1)
+
+    def _get_value(self, i: int) -> Any:
+        return self.dictionary.decode(self.codes[i])
+
+    def codes_array(self) -> np.ndarray:
+        """Zero-copy int32 view of the codes (-1 for None)."""
+        return np.frombuffer(self.codes, dtype=np.int32)
+
+    def nbytes(self) -> int:
+        return super().nbytes() + _array_nbytes(self.codes) + self.dictionary.nbytes()
+
+
+class UrlColumn(_Column):
+    """URLs split after the last '/' or '=' into dictionary-encoded prefix and suffix."""
+
+    def __init__(self):
+        super().__init__()
+        self.prefixes = DictColumn()
+        self.suffixes = DictColumn()
+
+    def _append_value(self, value: Any) -> None:
+        if not isinstance(value, str):
+            raise TypeError("UrlColumn holds strings")
+        split = max(value.rfind('/'), value.rfind('=')) + 1
+        self.prefixes.append(value[:split])
+        self.suffixes.append(value[split:])
+
+    def _append_placeholder(self) -> None:
+        self.prefixes.append(None)
+        self.suffixes.append(None)
+
+    def _get_value(self, i: int) -> Any:
+        return self.prefixes.get(i) + self.suffixes.get(i)
+
+    def nbytes(self) -> int:
+        return super().nbytes() + self.prefixes.nbytes() + self.suffixes.nbytes()
+
+
+class TextColumn(_Column):
+    """Long strings in one UTF-8 buffer with offsets."""
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+        self.offsets = array('q', [0])
+
+    def _append_value(self, value: Any) -> None:
+        if not isinstance(value, str):
+            raise TypeError("TextColumn holds strings")
+        self.buffer += value.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+
+    def _append_placeholder(self) -> None:
+        self.offsets.append(len(self.buffer))
+
+    def _get_value(self, i: int) -> Any:
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def nbytes(self) -> int:
+        return super().nbytes() + len(self.buffer) + _array_nbytes(self.offsets)
+
+
+class NumberColumn(_Column):
+    """Fixed-width numbers ('q' for int64, 'd' for float64)."""
+
+    def __init__(self, typecode: str):
+        super().__init__()
+        self.typecode = typecode
+        self.data = array(typecode)
+
+    def _append_value(self, value: Any) -> None:
+        # array('d') would silently accept ints and array('q') rejects floats;
+        # keep the Python type exact so records round-trip
+        expected = int if self.typecode == 'q' else float
+        if type(value) is not expected:
+            raise TypeError(f"NumberColumn('{self.typecode}') holds {expected.__name__}")
+        self.data.append(value)
+
+    def _append_placeholder(self) -> None:
+        self.data.append(0)
+
+    def _get_value(self, i: int) -> Any:
+        return self.data[i]
+
+    def to_numpy(self) -> np.ndarray:
+        """Zero-copy view of the values (0 where null)."""
+        return np.frombuffer(self.data, dtype=np.int64 if self.typecode == 'q' else np.float64)
+
+    def nbytes(self) -> int:
+        return super().nbytes() + _array_nbytes(self.data)
+
+
+class ListColumn(_Column):
+    """Lists of scalars as offsets into a flat array of dictionary codes."""
+
+    def __init__(self):
+        super().__init__()
+        self.dictionary = _Dictionary()
+        self.items = array('i')
+        self.offsets = array('q', [0])
+
+    def _append_value(self, value: Any) -> None:
+        if not isinstance(value, list) or any(isinstance(item, (list, dict)) for item in value):
+            raise TypeError("ListColumn holds lists of scalars")
+        self.items.extend(self.dictionary.encode(item) for item in value)
+        self.offsets.append(len(self.items))
+
+    def _append_placeholder(self) -> None:
+        self.offsets.append(len(self.items))
+
+    def _get_value(self, i: int) -> Any:
+        decode = self.dictionary.decode
+        return [decode(code) for code in self.items[self.offsets[i]:self.offsets[i + 1]]]
+
+    def nbytes(self) -> int:
+        return (super().nbytes() + _array_nbytes(self.items) + _array_nbytes(self.offsets)
+                + self.dictionary.nbytes())
+
+
+class StructColumn(_Column):
+    """Dicts with a fixed key set, one dictionary-encoded child column per key."""
+
+    def __init__(self, keys: Tuple[str, ...]):
+        super().__init__()
+        self.keys = keys
+        self.children = {key: DictColumn() for key in keys}
+
+    def _append_value(self, value: Any) -> None:
+        if not isinstance(value, dict) or tuple(value) != self.keys:
+            raise TypeError(f"StructColumn holds dicts with keys {self.keys}")
+        for key in self.keys:
+            if isinstance(value[key], (list, dict)):
+                raise TypeError("StructColumn holds scalar values")
+        for key in self.keys:
+            self.children[key].append(value[key])
+
+    def _append_placeholder(self) -> None:
+        for child in self.children.values():
+            child.append(None)
+
+    def _get_value(self, i: int) -> Any:
+        return {key: self.children[key].get(i) for key in self.keys}
+
+    def nbytes(self) -> int:
+        return super().nbytes() + sum(child.nbytes() for child in self.children.values())
+
+
+class RefsColumn(_Column):
+    """Reference lists ({text, span: [start, end], type}) as flat arrays with offsets."""
+
+    def __init__(self):
+        super().__init__()
+        self.texts = _Dictionary()
+        self.types = _Dictionary()
+        self.text_codes = array('i')
+        self.type_codes = array('i')
+        self.spans = array('q')
+        self.offsets = array('q', [0])
+
+    def _append_value(self, value: Any) -> None:
+        if not isinstance(value, list):
+            raise TypeError("RefsColumn holds lists of references")
+        for ref in value:
+            if (not isinstance(ref, dict) or tuple(ref) != ('text', 'span', 'type')
+                    or not isinstance(ref['span'], list) or len(ref['span']) != 2):
+                raise TypeError("RefsColumn holds {text, span, type} references")
+        for ref in value:
+            self.text_codes.append(self.texts.encode(ref['text']))
+            self.type_codes.append(self.types.encode(ref['type']))
+            self.spans.extend(ref['span'])
+        self.offsets.append(len(self.text_codes))
+
+    def _append_placeholder(self) -> None:
+        self.offsets.append(len(self.text_codes))
+
+    def _get_value(self, i: int) -> Any:
+        return [
+            {
+                'text': self.texts.decode(self.text_codes[j]),
+                'span': [self.spans[2 * j], self.spans[2 * j + 1]],
+                'type': self.types.decode(self.type_codes[j]),
+            }
+            for j in range(self.offsets[i], self.offsets[i + 1])
+        ]
+
+    def nbytes(self) -> int:
+        return (super().nbytes() + self.texts.nbytes() + self.types.nbytes()
+                + sum(_array_nbytes(a) for a in (self.text_codes, self.type_codes, self.spans, self.offsets)))
+
+
+class ObjectColumn(_Column):
+    """Fallback: plain Python objects."""
+
+    def __init__(self):
+        super().__init__()
+        self.data: List[Any] = []
+
+    def _append_value(self, value: Any) -> None:
+        self.data.append(value)
+
+    def _append_placeholder(self) -> None:
+        self.data.append(None)
+
+    def _get_value(self, i: int) -> Any:
+        return self.data[i]
+
+    def nbytes(self) -> int:
+        return super().nbytes() + sys.getsizeof(self.data) + sum(_deep_sizeof(v) for v in self.data)
+
+
+def _deep_sizeof(value: Any) -> int:
+    """Approximate memory of a JSON-like Python value."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in value.items())
+    elif isinstance(value, list):
+        size += sum(_deep_sizeof(v) for v in value)
+    return size
+
+
+# Column type for the fields of ingested, semantic and chunked records
+FIELD_COLUMNS = {
+    'url': UrlColumn,
+    'content': TextColumn,
+    'semantic_content': TextColumn,
+    'order': lambda: NumberColumn('q'),
+    'tokens': lambda: NumberColumn('q'),
+    'child_count': lambda: NumberColumn('q'),
+    'confidence': lambda: NumberColumn('d'),
+    'path': ListColumn,
+    'semantic_path': ListColumn,
+    'refs': RefsColumn,
+    'source': lambda: StructColumn(('type', 'file')),
+    'section_labels': lambda: StructColumn(('section', 'chapter', 'subsection')),
+    'chunk_meta': ObjectColumn,
+}
+
+
+def _new_column(field: str, value: Any) -> _Column:
+    if field in FIELD_COLUMNS:
+        return FIELD_COLUMNS[field]()
+    if isinstance(value, float):
+        return NumberColumn('d')
+    if isinstance(value, int) and not isinstance(value, bool):
+        return NumberColumn('q')
+    if isinstance(value, (str, bool)) or value is None:
+        return DictColumn()
+    return ObjectColumn()
+
+
+def _to_object_column(column: _Column) -> ObjectColumn:
+    converted = ObjectColumn()
+    for value in column.values():
+        converted.append(value)
+    return converted
+
+
+class RecordStore:
+    """Struct-of-arrays store for pipeline records."""
+
+    def __init__(self):
+        self.columns: Dict[str, _Column] = {}
+        self._shapes = _Dictionary()
+        self._shape_codes = array('i')
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "RecordStore":
+        store = cls()
+        store.extend(records)
+        return store
+
+    @classmethod
+    def from_jsonl(cls, input_file: str) -> "RecordStore":
+        """Load a JSONL file or shard manifest into a store."""
+        return cls.from_records(read_records(input_file))
+
+    def __len__(self) -> int:
+        return len(self._shape_codes)
+
+    def _column_for(self, field: str, value: Any) -> _Column:
+        column = self.columns.get(field)
+        if column is None:
+            column = _new_column(field, value)
+            for _ in range(len(self)):
+                column.append(None)
+            self.columns[field] = column
+        return column
+
+    def _append_field(self, field: str, value: Any) -> None:
+        column = self._column_for(field, value)
+        try:
+            column.append(value)
+        except (TypeError, OverflowError):
+            column = self.columns[field] = _to_object_column(column)
+            column.append(value)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record dict."""
+        for field, value in record.items():
+            self._append_field(field, value)
+        for field, column in self.columns.items():
+            if len(column) == len(self):
+                column.append(None)
+        self._shape_codes.append(self._shapes.encode(tuple(record)))
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def fields(self, i: int) -> Tuple[str, ...]:
+        """Keys of record `i`, in their original order."""
+        return self._shapes.decode(self._shape_codes[i])
+
+    def get(self, i: int, field: str) -> Any:
+        """Value of `field` for record `i` (None when absent)."""
+        column = self.columns.get(field)
+        return column.get(i) if column is not None else None
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """Rebuild record `i` as a dict."""
+        return {field: self.columns[field].get(i) for field in self.fields(i)}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.record(i) for i in range(len(self)))
+
+    def iter_records(self, indices: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Rebuild records one at a time, in `indices` order when given."""
+        return (self.record(int(i)) for i in (range(len(self)) if indices is None else indices))
+
+    def set_column(self, field: str, values: List[Any]) -> None:
+        """
+        Replace (or add) `field` for every record.
+
+        Records that did not have the field get it appended to their keys, as
+        assigning `record[field] = value` would.
+        """
+        if len(values) != len(self):
+            raise ValueError(f"Expected {len(self)} values for {field}, got {len(values)}")
+        column = _new_column(field, next((v for v in values if v is not None), None))
+        try:
+            for value in values:
+                column.append(value)
+        except (TypeError, OverflowError):
+            column = ObjectColumn()
+            for value in values:
+                column.append(value)
+        self.columns[field] = column
+
+        shape_map: Dict[int, int] = {}
+        for i, code in enumerate(self._shape_codes):
+            new_code = shape_map.get(code)
+            if new_code is None:
+                shape = self._shapes.decode(code)
+                new_code = shape_map[code] = (
+                    code if field in shape else self._shapes.encode(shape + (field,))
+                )
+            self._shape_codes[i] = new_code
+
+    def argsort(self, field: str) -> np.ndarray:
+        """Stable sort order of a numeric column (nulls sort as 0)."""
+        column = self.columns.get(field)
+        if not isinstance(column, NumberColumn):
+            return np.arange(len(self))
+        return np.argsort(column.to_numpy(), kind='stable')
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store."""
+        return (sum(column.nbytes() for column in self.columns.values())
+                + _array_nbytes(self._shape_codes) + self._shapes.nbytes())
+
+
+def records_nbytes(records: Iterable[Dict[str, Any]]) -> int:
+    """Approximate memory of the same records held as dicts, for comparison."""
+    return sum(_deep_sizeof(record) for record in records)
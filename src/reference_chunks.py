@@ -0,0 +1,177 @@
+"""
+Offset-referenced (zero-copy) chunk output.
+
+Chunk children normally repeat their text three times over: the parent's
+`content` and `semantic_content` hold it, and every child stores its own
+`content` plus a `semantic_content` of "<path string> | <chunk>". In
+reference form:
+
+- a child that `make_chunk_records` produced keeps only what is not
+  derivable from its parent: `anchor`, `parent_anchor`, `order`, `tokens`,
+  `confidence`, `refs`, `hash` and `chunk_meta`, whose `char_span` locates its
+  text in the parent `content`. The semantic path, inherited fields and
+  `path` come from the parent record.
+- `semantic_content` is written as null wherever it is the derived
+  "<semantic_path_string> | <content>"
+
+Files are named `<name>.ref.jsonl` (.gz/.zst allowed). Children always
+follow their parent, so `materialize` rebuilds the full records in one
+streaming pass, holding only the most recent parent.
+"""
+
+import json
+from typing import Dict, Any, Optional, Iterable, Iterator
+
+from .compression import open_text, strip_compression
+
+
+REFERENCE_SUFFIX = ".ref.jsonl"
+
+# Key order of a chunk child as written by `make_chunk_records`
+CHILD_FIELDS = ("doc_id", "anchor", "node_id", "title", "subtitle", "content", "url", "path",
+                "parent_anchor", "block_type", "section_labels", "order", "tokens", "confidence",
+                "refs", "hash", "ingested_at", "source", "chunk_meta", "semantic_content")
+
+# Child fields copied unchanged from the parent
+INHERITED_FIELDS = ("doc_id", "node_id", "title", "subtitle", "url", "section_labels",
+                    "ingested_at", "source")
+
+# Child fields kept in reference form
+REFERENCE_FIELDS = ("anchor", "parent_anchor", "order", "tokens", "confidence", "refs", "hash",
+                    "chunk_meta")
+
+
+def is_reference(path: str) -> bool:
+    return strip_compression(path).endswith(REFERENCE_SUFFIX)
+
+
+def _semantic_content(path_string: str, content: Optional[str]) -> str:
+    return f"{path_string} | {content}" if content else path_string
+
+
+def _child_text(child: Dict[str, Any], parent: Dict[str, Any]) -> Optional[str]:
+    span = child.get('chunk_meta', {}).get('char_span')
+    content = parent.get('content')
+    if not isinstance(content, str) or not isinstance(span, list) or len(span) != 2:
+        return None
+    return content[span[0]:span[1]]
+
+
+def _materialize_child(child: Dict[str, Any], parent: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a full chunk child from its reference form and its parent."""
+    content = _child_text(child, parent)
+    record = {
+        "doc_id": parent['doc_id'],
+        "anchor": child['anchor'],
+        "node_id": parent['node_id'],
+        "title": parent['title'],
+        "subtitle": parent['subtitle'],
+        "content": content,
+        "url": parent['url'],
+        "path": parent['path'] + [child['anchor']],
+        "parent_anchor": child['parent_anchor'],
+        "block_type": "PARA",
+        "section_labels": parent['section_labels'],
+        "order": child['order'],
+        "tokens": child['tokens'],
+        "confidence": child['confidence'],
+        "refs": child['refs'],
+        "hash": child['hash'],
+        "ingested_at": parent['ingested_at'],
+        "source": parent['source'],
+        "chunk_meta": child['chunk_meta'],
+    }
+    if parent.get('semantic_path_string'):
+        record['semantic_content'] = _semantic_content(parent['semantic_path_string'], content)
+    return record
+
+
+class ReferenceEncoder:
+    """Convert records to reference form, in output order."""
+
+    def __init__(self):
+        self._parent: Optional[Dict[str, Any]] = None
+
+    def _is_derivable(self, record: Dict[str, Any]) -> bool:
+        parent = self._parent
+        if parent is None or record.get('parent_anchor') != parent.get('anchor'):
+            return False
+        keys = CHILD_FIELDS if parent.get('semantic_path_string') else CHILD_FIELDS[:-1]
+        if tuple(record) != keys:
+            return False
+        if any(record[key] != parent.get(key) for key in INHERITED_FIELDS):
+            return False
+        if record['block_type'] != "PARA" or record['path'] != parent.get('path', []) + [record['anchor']]:
+            return False
+        # Materializing must give back exactly this record
+        return _materialize_child({key: record[key] for key in REFERENCE_FIELDS}, parent) == record
+
+    def encode(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if 'chunk_meta' in record and self._is_derivable(record):
+            return {key: record[key] for key in REFERENCE_FIELDS}
+
+        if record.get('has_children'):
+            self._parent = record
+        path_string = record.get('semantic_path_string')
+        if (isinstance(path_string, str) and record.get('semantic_content') is not None
+                and record['semantic_content'] == _semantic_content(path_string, record.get('content'))):
+            record = dict(record, semantic_content=None)
+        return record
+
+
+class ReferenceWriter:
+    """Write records in reference form (same write/close interface as JsonlWriter)."""
+
+    def __init__(self, output_file: str):
+        if not is_reference(output_file):
+            raise ValueError(f"Reference outputs must end in {REFERENCE_SUFFIX}: {output_file}")
+        self.output_file = output_file
+        self.count = 0
+        self.references = 0
+        self._encoder = ReferenceEncoder()
+        self._file = open_text(output_file, 'w')
+
+    def write(self, records: Iterable[Dict[str, Any]]) -> None:
+        lines = []
+        for record in records:
+            encoded = self._encoder.encode(record)
+            self.references += 'chunk_meta' in encoded and 'content' not in encoded
+            lines.append(json.dumps(encoded, ensure_ascii=False) + '\n')
+        self._file.write(''.join(lines))
+        self.count += len(lines)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def materialize(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yield full records from reference-form records, in order."""
+    parent: Optional[Dict[str, Any]] = None
+    for record in records:
+        if 'chunk_meta' in record and 'content' not in record:
+            if parent is None or parent.get('anchor') != record.get('parent_anchor'):
+                raise ValueError(f"Chunk {record.get('anchor')} does not follow its parent {record.get('parent_anchor')}")
+            yield _materialize_child(record, parent)
+            continue
+
+        if 'semantic_content' in record and record['semantic_content'] is None:
+            record['semantic_content'] = _semantic_content(record['semantic_path_string'], record.get('content'))
+        if record.get('has_children'):
+            parent = record
+        yield record
+
+
+def iter_reference_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream full records from a reference-form file."""
+    with open_text(path) as f:
+        yield from materialize(json.loads(line) for line in f if line.strip())
+
+
+def materialize_jsonl(input_file: str, output_file: str) -> Dict[str, int]:
+    """Write the full records of a reference-form file; returns record count."""
+    count = 0
+    with open_text(output_file, 'w') as f:
+        for record in iter_reference_records(input_file):
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return {"records": count}
@@ -0,0 +1,219 @@
+"""
+Cross-reference graph built from the `refs` extracted during ingestion.
+
+Every raw citation (e.g. "Section\\n 25-8-514(A)", "LDC 25-8-186") is normalized
+to a canonical target key and resolved against the anchors present in the
+corpus. Citations that do not name a record in the corpus are kept as external
+code nodes (e.g. "code:25-8-514") so "what cites X" still works for them.
+
+Edges are stored in CSR form (offsets + flat neighbour arrays) for both
+directions, so neighbour lookups are array slices.
+"""
+
+import re
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+import numpy as np
+
+from .sharding import read_records
+
+
+# Prefix words the parser's reference patterns may capture
+REFERENCE_PREFIX = re.compile(r'^(?:Section|Sec\.|§|LDC|Title)\s*', re.IGNORECASE)
+CODE_NUMBER = re.compile(r'(\d+(?:-\d+)+)((?:\([A-Za-z0-9]+\))*)')
+
+
+def normalize_reference(text: str) -> Optional[Tuple[str, str]]:
+    """
+    Normalize a raw citation into (namespace, code).
+
+    "Section\\n 25-8-514(A)" -> ("code", "25-8-514")
+    "Title 30-5"             -> ("title", "30-5")
+
+    Subsection qualifiers such as "(A)" are dropped so that citations of
+    different subsections resolve to the same target.
+    """
+    if not text:
+        return None
+
+    compact = re.sub(r'\s+', ' ', text).strip()
+    namespace = "title" if compact.lower().startswith("title") else "code"
+    match = CODE_NUMBER.search(REFERENCE_PREFIX.sub('', compact))
+    if not match:
+        return None
+
+    return namespace, match.group(1)
+
+
+def _resolve_target(namespace: str, code: str, anchors: Dict[str, str]) -> str:
+    """Resolve a normalized citation to a known anchor or an external node key."""
+    for candidate in (code, f"{namespace}-{code}", f"section-{code}"):
+        anchor = anchors.get(candidate.lower())
+        if anchor is not None:
+            return anchor
+    return f"{namespace}:{code}"
+
+
+def _build_csr(num_nodes: int, edges: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Build CSR offsets/neighbours from (source, target) pairs."""
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    if not edges:
+        return offsets, np.zeros(0, dtype=np.int32)
+
+    pairs = np.array(edges, dtype=np.int32)
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    np.add.at(offsets, pairs[:, 0] + 1, 1)
+    np.cumsum(offsets, out=offsets)
+    return offsets, pairs[:, 1].copy()
+
+
+class ReferenceGraph:
+    """Forward and reverse citation adjacency over anchors and external codes."""
+
+    def __init__(self, nodes: List[str], fwd_offsets: np.ndarray, fwd_targets: np.ndarray,
+                 rev_offsets: np.ndarray, rev_sources: np.ndarray):
+        """Initialize the graph from prebuilt CSR arrays (see `from_records`)."""
+        self.nodes = nodes
+        self.fwd_offsets = fwd_offsets
+        self.fwd_targets = fwd_targets
+        self.rev_offsets = rev_offsets
+        self.rev_sources = rev_sources
+        self.node_index: Dict[str, int] = {node: i for i, node in enumerate(nodes)}
+        self._lower_anchors: Dict[str, str] = {}
+        for node in nodes:
+            if ':' not in node:
+                self._lower_anchors.setdefault(node.lower(), node)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ReferenceGraph":
+        """Normalize and resolve every ref in `records` and build the CSR adjacency."""
+        records = list(records)
+
+        nodes: List[str] = []
+        node_index: Dict[str, int] = {}
+
+        def intern(key: str) -> int:
+            node_id = node_index.get(key)
+            if node_id is None:
+                node_id = len(nodes)
+                node_index[key] = node_id
+                nodes.append(key)
+            return node_id
+
+        lower_anchors: Dict[str, str] = {}
+        for record in records:
+            intern(record['anchor'])
+            lower_anchors.setdefault(record['anchor'].lower(), record['anchor'])
+
+        edges = set()
+        for record in records:
+            source_id = node_index[record['anchor']]
+            for ref in record.get('refs') or []:
+                normalized = normalize_reference(ref.get('text', ''))
+                if normalized is None:
+                    continue
+                target = _resolve_target(*normalized, lower_anchors)
+                target_id = intern(target)
+                if target_id != source_id:
+                    edges.add((source_id, target_id))
+
+        edge_list = list(edges)
+        fwd_offsets, fwd_targets = _build_csr(len(nodes), edge_list)
+        rev_offsets, rev_sources = _build_csr(len(nodes), [(t, s) for s, t in edge_list])
+        return cls(nodes, fwd_offsets, fwd_targets, rev_offsets, rev_sources)
+
+    @classmethod
+    def from_jsonl(cls, input_file: str) -> "ReferenceGraph":
+        """Build the graph from any record output (JSONL, shard manifest, normalized or reference form)."""
+        return cls.from_records(read_records(input_file))
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.fwd_targets.shape[0])
+
+    def resolve(self, key: str) -> int:
+        """
+        Resolve a user-supplied anchor or citation to a node id.
+
+        Accepts anchors ("appendix-q-4") as well as citations in any of the
+        forms the parser extracts ("LDC 25-8-186", "25-8-186").
+        """
+        if key in self.node_index:
+            return self.node_index[key]
+        anchor = self._lower_anchors.get(key.lower())
+        if anchor is not None:
+            return self.node_index[anchor]
+        normalized = normalize_reference(key)
+        if normalized is not None:
+            target = _resolve_target(*normalized, self._lower_anchors)
+            if target in self.node_index:
+                return self.node_index[target]
+        raise KeyError(key)
+
+    def cites(self, node_id: int) -> np.ndarray:
+        """Return node ids directly cited by `node_id`."""
+        return self.fwd_targets[self.fwd_offsets[node_id]:self.fwd_offsets[node_id + 1]]
+
+    def cited_by(self, node_id: int) -> np.ndarray:
+        """Return node ids that directly cite `node_id`."""
+        return self.rev_sources[self.rev_offsets[node_id]:self.rev_offsets[node_id + 1]]
+
+    def traverse(self, node_id: int, depth: int = 1, reverse: bool = False) -> List[Tuple[int, int]]:
+        """
+        Breadth-first walk up to `depth` hops.
+
+        Returns (node_id, hops) pairs, excluding the start node. With
+        `reverse=True` the walk follows "cited by" edges instead of "cites".
+        """
+        offsets, neighbours = (
+            (self.rev_offsets, self.rev_sources) if reverse
+            else (self.fwd_offsets, self.fwd_targets)
+        )
+        seen = {node_id}
+        result = []
+        queue = deque([(node_id, 0)])
+        while queue:
+            current, hops = queue.popleft()
+            if hops >= depth:
+                continue
+            for neighbour in neighbours[offsets[current]:offsets[current + 1]]:
+                neighbour = int(neighbour)
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    result.append((neighbour, hops + 1))
+                    queue.append((neighbour, hops + 1))
+        return result
+
+    def save(self, output_file: str) -> None:
+        """Persist the graph to a compressed NumPy archive (.npz)."""
+        encoded = [node.encode('utf-8') for node in self.nodes]
+        node_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        node_offsets[1:] = np.cumsum([len(n) for n in encoded])
+        np.savez_compressed(
+            output_file,
+            node_bytes=np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            node_offsets=node_offsets,
+            fwd_offsets=self.fwd_offsets,
+            fwd_targets=self.fwd_targets,
+            rev_offsets=self.rev_offsets,
+            rev_sources=self.rev_sources,
+        )
+
+    @classmethod
+    def load(cls, input_file: str) -> "ReferenceGraph":
+        """Load a graph previously written with `save`."""
+        with np.load(input_file) as data:
+            node_bytes = data['node_bytes'].tobytes()
+            offsets = data['node_offsets']
+            nodes = [
+                node_bytes[offsets[i]:offsets[i + 1]].decode('utf-8')
+                for i in range(len(offsets) - 1)
+            ]
+            return cls(
+                nodes,
+                data['fwd_offsets'],
+                data['fwd_targets'],
+                data['rev_offsets'],
+                data['rev_sources'],
+            )
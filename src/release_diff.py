@@ -0,0 +1,224 @@
+"""
+Streaming diff between two releases of the pipeline output.
+
+Sections are compared by their place in the `parent_anchor` tree. Every
+record's `path` is its ancestor chain plus its own anchor, so sorting
+records by `path` lists the tree in pre-order, with each subtree contiguous
+(sorting by `order` would not keep subtrees together).
+
+Each release is streamed once and turned into sorted entries, spilled to
+temporary run files every `run_size` entries and merged back with
+`heapq.merge`:
+
+- a node entry per section (chunk records are skipped; they derive from
+  their section): its path and a digest of `DIGEST_FIELDS`
+- a leaf-hash contribution to each prefix of its path
+
+After the merge, each path has a subtree hash: the sum mod 2**256 of the
+leaf hashes of every section under it, which is a Merkle-style set hash. It
+also has a subtree size. The two merged streams are then joined on path:
+
+- equal subtree hashes: the whole subtree is unchanged; its entries are
+  passed over without being compared
+- same path, different digest: `modified`
+- path on one side only: tentatively `removed` / `added`
+
+Anchors that were both removed and added are then resolved. A different
+`parent_anchor` means `moved` (also flagged when its content changed). A
+section whose ancestor moved is reported only if its own content changed.
+Memory is bounded by `run_size` plus the changed sections.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+import time
+from itertools import groupby
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from .compression import open_text
+from .sharding import read_records
+
+
+# Fields whose change makes a section "modified"
+DIGEST_FIELDS = ("title", "subtitle", "content", "url", "block_type")
+
+_MODULUS = 1 << 256
+
+
+def section_digest(record: Dict[str, Any]) -> str:
+    encoded = json.dumps([record.get(field) for field in DIGEST_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _leaf_hash(path: List[str], digest: str) -> int:
+    encoded = json.dumps([path, digest], ensure_ascii=False).encode('utf-8')
+    return int.from_bytes(hashlib.sha256(encoded).digest(), 'big')
+
+
+def _entries(record: Dict[str, Any]) -> Iterator[Tuple[List[str], int, Any]]:
+    """Sort entries for one section: (key, kind, payload); kind 0 = contribution, 1 = node."""
+    path = record.get('path') or [record.get('anchor')]
+    digest = section_digest(record)
+    leaf = format(_leaf_hash(path, digest), 'x')
+    for depth in range(1, len(path) + 1):
+        yield path[:depth], 0, leaf
+    yield path, 1, {"digest": digest, "title": record.get('title'), "parent_anchor": record.get('parent_anchor')}
+
+
+def _write_run(entries: List[Tuple[List[str], int, Any]], directory: str, index: int) -> str:
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+    run_file = os.path.join(directory, f"run-{index:05d}.jsonl")
+    with open(run_file, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return run_file
+
+
+def _read_run(run_file: str) -> Iterator[Tuple[List[str], int, Any]]:
+    with open(run_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield tuple(json.loads(line))
+
+
+class SortedSections:
+    """One release's sections as subtree groups in path (pre-)order."""
+
+    def __init__(self, input_file: str, directory: str, run_size: int = 200000):
+        self.records = 0
+        self.sections = 0
+        runs = []
+        buffer: List[Tuple[List[str], int, Any]] = []
+        for record in read_records(input_file):
+            self.records += 1
+            if 'chunk_meta' in record:
+                continue
+            self.sections += 1
+            buffer.extend(_entries(record))
+            if len(buffer) >= run_size:
+                runs.append(_write_run(buffer, directory, len(runs)))
+                buffer = []
+        if buffer or not runs:
+            runs.append(_write_run(buffer, directory, len(runs)))
+        self._runs = runs
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield {"path", "subtree", "size", "node"} per path, in pre-order."""
+        merged = heapq.merge(*(_read_run(run) for run in self._runs), key=lambda entry: (entry[0], entry[1]))
+        for path, entries in groupby(merged, key=lambda entry: entry[0]):
+            subtree, size, nodes = 0, 0, []
+            for _, kind, payload in entries:
+                if kind == 0:
+                    subtree = (subtree + int(payload, 16)) % _MODULUS
+                    size += 1
+                else:
+                    nodes.append(payload)
+            node = nodes[0] if nodes else None
+            if len(nodes) > 1:
+                # Duplicate anchors on one path compare as one section
+                node = dict(node, digest=hashlib.sha256(
+                    '|'.join(sorted(n['digest'] for n in nodes)).encode('utf-8')).hexdigest())
+            yield {"path": path, "subtree": subtree, "size": size, "node": node}
+
+
+def _is_within(path: List[str], prefix: List[str]) -> bool:
+    return len(path) > len(prefix) and path[:len(prefix)] == prefix
+
+
+def _skip_subtree(groups: Iterator[Dict[str, Any]], prefix: List[str]) -> Optional[Dict[str, Any]]:
+    """Advance past the descendants of `prefix`; return the first group after them."""
+    for group in groups:
+        if not _is_within(group["path"], prefix):
+            return group
+    return None
+
+
+def _change(kind: str, group: Dict[str, Any], **extra) -> Dict[str, Any]:
+    node = group["node"] or {}
+    change = {"change": kind, "anchor": group["path"][-1], "title": node.get("title"), "path": group["path"]}
+    change.update(extra)
+    return change
+
+
+def diff_releases(old_file: str, new_file: str, report_file: Optional[str] = None,
+                  run_size: int = 200000, tmp_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compare two outputs section by section.
+
+    Returns {"counts", "changes", "old_sections", "new_sections",
+    "skipped_subtrees", "seconds"}. `changes` lists added, removed, modified
+    and moved sections (also written as JSONL to `report_file` when given).
+    """
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="ecm-diff-", dir=tmp_dir) as directory:
+        os.makedirs(os.path.join(directory, "old"))
+        os.makedirs(os.path.join(directory, "new"))
+        old = SortedSections(old_file, os.path.join(directory, "old"), run_size)
+        new = SortedSections(new_file, os.path.join(directory, "new"), run_size)
+
+        changes: List[Dict[str, Any]] = []
+        removed: Dict[str, Dict[str, Any]] = {}
+        added: Dict[str, Dict[str, Any]] = {}
+        unchanged = skipped = 0
+
+        old_groups, new_groups = iter(old), iter(new)
+        a, b = next(old_groups, None), next(new_groups, None)
+        while a is not None or b is not None:
+            if b is None or (a is not None and a["path"] < b["path"]):
+                if a["node"]:
+                    removed[a["path"][-1]] = a
+                a = next(old_groups, None)
+            elif a is None or b["path"] < a["path"]:
+                if b["node"]:
+                    added[b["path"][-1]] = b
+                b = next(new_groups, None)
+            elif a["subtree"] == b["subtree"] and a["size"] == b["size"]:
+                # Identical subtree: one comparison covers all of it
+                unchanged += a["size"]
+                skipped += 1
+                a = _skip_subtree(old_groups, a["path"])
+                b = _skip_subtree(new_groups, b["path"])
+            else:
+                if a["node"] and b["node"]:
+                    if a["node"]["digest"] != b["node"]["digest"]:
+                        changes.append(_change("modified", b))
+                    else:
+                        unchanged += 1
+                elif a["node"]:
+                    removed[a["path"][-1]] = a
+                elif b["node"]:
+                    added[b["path"][-1]] = b
+                a, b = next(old_groups, None), next(new_groups, None)
+
+    # Same anchor on both sides under a different path: a move
+    for anchor in sorted(removed.keys() & added.keys()):
+        before, after = removed.pop(anchor), added.pop(anchor)
+        content_changed = before["node"]["digest"] != after["node"]["digest"]
+        if before["node"]["parent_anchor"] != after["node"]["parent_anchor"]:
+            changes.append(_change("moved", after, old_path=before["path"], modified=content_changed))
+        elif content_changed:
+            changes.append(_change("modified", after))
+        else:
+            unchanged += 1
+    changes.extend(_change("removed", group) for group in removed.values())
+    changes.extend(_change("added", group) for group in added.values())
+    changes.sort(key=lambda change: change["path"])
+
+    if report_file:
+        with open_text(report_file, 'w') as f:
+            for change in changes:
+                f.write(json.dumps(change, ensure_ascii=False) + '\n')
+
+    counts = {kind: sum(1 for change in changes if change["change"] == kind)
+              for kind in ("added", "removed", "modified", "moved")}
+    counts["unchanged"] = unchanged
+    return {
+        "counts": counts,
+        "changes": changes,
+        "old_sections": old.sections,
+        "new_sections": new.sections,
+        "skipped_subtrees": skipped,
+        "seconds": time.perf_counter() - started,
+    }
@@ -4,9 +4,19 @@ Semantic path builder that creates meaningful content hierarchies based on subti
 
 import json
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from pathlib import Path
 
+import numpy as np
+
+from .compression import open_text
+from .sharding import read_records
+from .record_store import RecordStore, DictColumn
+
+
+# Bump when path building changes so cached semantic paths are invalidated
+SEMANTIC_PATH_VERSION = 1
+
 
 def clean_subtitle_for_path(subtitle: str) -> str:
     """
@@ -27,14 +37,12 @@ def clean_subtitle_for_path(subtitle: str) -> str:
     return cleaned if cleaned else "untitled"
 
 
-def build_semantic_path(record: Dict[str, Any], all_records: List[Dict[str, Any]]) -> List[str]:
-    """
-    Build semantic path based on subtitle and hierarchical relationships without numerical prefixes.
+def _path_segment(title: Optional[str], subtitle: Optional[str]) -> Tuple[bool, Optional[str]]:
     """
-    title = record.get('title', '')
-    subtitle = record.get('subtitle', '')
-    parent_anchor = record.get('parent_anchor', '')
+    Return (is_top_level, own path segment) for a record's title and subtitle.
     
+    The segment is None for numeric titles without a descriptive subtitle.
+    """
     if not subtitle:
         # If no subtitle, try to create one from title
         if title and re.match(r'^\d+(\.\d+)*$', title):
@@ -43,36 +51,120 @@ def build_semantic_path(record: Dict[str, Any], all_records: List[Dict[str, Any]
         else:
             subtitle = title or "Untitled"
     
-    # Start building the semantic path
-    semantic_path = []
-    
     # Check if this is a top-level section
     if re.match(r'^SECTION\s+\d+', subtitle, re.IGNORECASE):
         # Top-level section - just use the cleaned subtitle without numerical prefix
-        semantic_path.append(clean_subtitle_for_path(subtitle))
-    else:
-        # Find the parent record to build the path
-        if parent_anchor:
-            parent_record = find_record_by_anchor(all_records, parent_anchor)
-            if parent_record:
-                # Recursively build parent's semantic path
-                parent_semantic_path = build_semantic_path(parent_record, all_records)
-                semantic_path.extend(parent_semantic_path)
-        
-        # Add current subtitle to the path, but exclude numeric titles
-        # Only add subtitle if it's not just a numeric title
-        if not (title and re.match(r'^\d+(\.\d+)*$', title)):
-            # This is a descriptive title, add it to the path
-            semantic_path.append(clean_subtitle_for_path(subtitle))
+        return True, clean_subtitle_for_path(subtitle)
+    
+    # Add current subtitle to the path, but exclude numeric titles
+    # Only add subtitle if it's not just a numeric title
+    if not (title and re.match(r'^\d+(\.\d+)*$', title)):
+        # This is a descriptive title, add it to the path
+        return False, clean_subtitle_for_path(subtitle)
+    
+    # This is a numeric title, skip adding it to semantic path
+    # But still process the subtitle if it exists
+    if subtitle and not re.match(r'^\d+(\.\d+)*$', subtitle):
+        return False, clean_subtitle_for_path(subtitle)
+    return False, None
+
+
+def build_semantic_path(record: Dict[str, Any], all_records: List[Dict[str, Any]],
+                        anchor_index: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """
+    Build semantic path based on subtitle and hierarchical relationships without numerical prefixes.
+    
+    Parents are looked up in `anchor_index` when given, otherwise by scanning `all_records`.
+    """
+    parent_anchor = record.get('parent_anchor', '')
+    top_level, segment = _path_segment(record.get('title', ''), record.get('subtitle', ''))
+    
+    if top_level:
+        return [segment]
+    
+    # Start building the semantic path
+    semantic_path = []
+    
+    # Find the parent record to build the path
+    if parent_anchor:
+        if anchor_index is not None:
+            parent_record = anchor_index.get(parent_anchor)
         else:
-            # This is a numeric title, skip adding it to semantic path
-            # But still process the subtitle if it exists
-            if subtitle and not re.match(r'^\d+(\.\d+)*$', subtitle):
-                semantic_path.append(clean_subtitle_for_path(subtitle))
+            parent_record = find_record_by_anchor(all_records, parent_anchor)
+        if parent_record:
+            # Recursively build parent's semantic path
+            parent_semantic_path = build_semantic_path(parent_record, all_records, anchor_index)
+            semantic_path.extend(parent_semantic_path)
+    
+    if segment is not None:
+        semantic_path.append(segment)
     
     return semantic_path
 
 
+def build_semantic_paths_columnar(store: RecordStore) -> List[List[str]]:
+    """
+    Build the semantic path of every record in a RecordStore from its columns.
+    
+    Segments are computed once per distinct (title, subtitle) pair and each
+    record's path is its parent's path plus its own segment, so every path
+    is built once. Parents resolve to the first record with that anchor in
+    `order` (as `build_semantic_path` does over sorted records). Returns the
+    paths in store order.
+    """
+    n = len(store)
+    anchors = store.columns['anchor']
+    titles = store.columns.get('title')
+    subtitles = store.columns.get('subtitle')
+    parents = store.columns.get('parent_anchor')
+    
+    # Row of the first record (in order) carrying each anchor code
+    order = store.argsort('order')
+    sorted_codes = anchors.codes_array()[order]
+    first_row = np.full(len(anchors.dictionary.values), -1, dtype=np.int64)
+    unique_codes, first_index = np.unique(sorted_codes, return_index=True)
+    valid = unique_codes >= 0
+    first_row[unique_codes[valid]] = order[first_index[valid]]
+    
+    # Parent row per record, via the parent_anchor dictionary
+    parent_row = np.full(n, -1, dtype=np.int64)
+    if parents is not None and isinstance(parents, DictColumn) and parents.dictionary.values:
+        parent_lut = np.array([
+            first_row[code] if code >= 0 else -1
+            for code in (anchors.dictionary.lookup(value) for value in parents.dictionary.values)
+        ], dtype=np.int64)
+        parent_codes = parents.codes_array()
+        has_parent = parent_codes >= 0
+        parent_row[has_parent] = parent_lut[parent_codes[has_parent]]
+    
+    # Own segment per distinct (title, subtitle)
+    segment_cache: Dict[Tuple[Any, Any], Tuple[bool, Optional[str]]] = {}
+    segments = []
+    for i in range(n):
+        key = (titles.get(i) if titles else None, subtitles.get(i) if subtitles else None)
+        if key not in segment_cache:
+            segment_cache[key] = _path_segment(*key)
+        segments.append(segment_cache[key])
+    
+    paths: List[Optional[List[str]]] = [None] * n
+    for row in range(n):
+        # Walk up to the nearest ancestor whose path is known, then fill back down
+        chain, on_chain, current = [], set(), row
+        while current >= 0 and paths[current] is None and current not in on_chain:
+            chain.append(current)
+            on_chain.add(current)
+            current = -1 if segments[current][0] else int(parent_row[current])
+        base = paths[current] if current >= 0 and paths[current] is not None else []
+        for current in reversed(chain):
+            top_level, segment = segments[current]
+            if top_level:
+                path = [segment]
+            else:
+                path = base + [segment] if segment is not None else list(base)
+            paths[current] = base = path
+    return paths
+
+
 def find_record_by_anchor(records: List[Dict[str, Any]], anchor: str) -> Optional[Dict[str, Any]]:
     """
     Find a record by its anchor.
@@ -83,33 +175,110 @@ def find_record_by_anchor(records: List[Dict[str, Any]], anchor: str) -> Optiona
     return None
 
 
-def enhance_records_with_semantic_paths(input_file: str, output_file: str) -> None:
+def add_semantic_path(record: Dict[str, Any], anchor_index: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Add semantic path fields to a single record in a stream.
+    
+    `anchor_index` accumulates the records seen so far; parents must be
+    passed before their children (as ExcelParser yields them).
+    """
+    anchor_index.setdefault(record.get('anchor'), record)
+    semantic_path = build_semantic_path(record, [], anchor_index)
+    record['semantic_path'] = semantic_path
+    record['semantic_path_string'] = ' > '.join(semantic_path)
+    return record
+
+
+def find_ancestors(record: Dict[str, Any], anchor_index: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Return the records on the parent_anchor chain of `record`, nearest first.
+    """
+    ancestors = []
+    seen = {record.get('anchor')}
+    parent_anchor = record.get('parent_anchor')
+    while parent_anchor and parent_anchor not in seen:
+        parent = anchor_index.get(parent_anchor)
+        if parent is None:
+            break
+        ancestors.append(parent)
+        seen.add(parent_anchor)
+        parent_anchor = parent.get('parent_anchor')
+    return ancestors
+
+
+def enhance_records_with_semantic_paths(input_file: str, output_file: str,
+                                        cache_dir: Optional[str] = None, columnar: bool = False) -> None:
     """
     Process JSONL file and add semantic paths based on subtitles.
+
+    With `cache_dir`, semantic paths are served from the stage cache and only
+    records whose content or ancestors changed are recomputed. With
+    `columnar`, records are held in a `RecordStore` and paths are built on
+    its columns (see `build_semantic_paths_columnar`).
     """
     print(f"Processing {input_file} to add semantic paths...")
     
-    # Read all records first to build relationships
-    records = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            try:
-                record = json.loads(line.strip())
-                records.append(record)
-            except json.JSONDecodeError as e:
-                print(f"Error parsing line {line_num}: {e}")
-                continue
+    if columnar:
+        if cache_dir:
+            raise ValueError("The columnar semantic stage does not use the stage cache")
+        enhanced_records = _enhance_columnar(input_file)
+    else:
+        enhanced_records = _enhance_records(input_file, cache_dir)
+    
+    # Write enhanced records
+    count = 0
+    examples = []
+    with open_text(output_file, 'w') as f:
+        for record in enhanced_records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            if len(examples) < 5:
+                examples.append(record)
+            count += 1
+    
+    print(f"Enhanced {count} records with semantic paths")
+    print(f"Output written to: {output_file}")
+    
+    # Show some examples
+    print("\n=== Semantic Path Examples ===")
+    for record in examples:
+        if record.get('semantic_path'):
+            print(f"Title: {record.get('title', 'N/A')}")
+            print(f"Subtitle: {record.get('subtitle', 'N/A')}")
+            print(f"Semantic Path: {' > '.join(record['semantic_path'])}")
+            print()
+
+
+def _enhance_records(input_file: str, cache_dir: Optional[str]) -> List[Dict[str, Any]]:
+    """Add semantic paths to records held as dicts."""
+    # Read all records first to build relationships (JSONL or shard manifest)
+    records = list(read_records(input_file))
     
     print(f"Loaded {len(records)} records")
     
     # Sort records by order to ensure proper hierarchy building
     records.sort(key=lambda x: x.get('order', 0))
     
+    # Compute cache keys before any record is modified
+    cache = None
+    cache_keys = []
+    if cache_dir:
+        from .stage_cache import StageCache
+        
+        cache = StageCache(cache_dir, "semantic_path", {"version": SEMANTIC_PATH_VERSION})
+        anchor_index = {}
+        for record in records:
+            anchor_index.setdefault(record.get('anchor'), record)
+        cache_keys = [cache.key(record, find_ancestors(record, anchor_index)) for record in records]
+    
     # Build semantic paths for each record
     enhanced_records = []
-    for record in records:
-        # Build semantic path
-        semantic_path = build_semantic_path(record, records)
+    for i, record in enumerate(records):
+        # Build semantic path (served from the stage cache when unchanged)
+        semantic_path = cache.get(cache_keys[i]) if cache else None
+        if semantic_path is None:
+            semantic_path = build_semantic_path(record, records)
+            if cache:
+                cache.put(cache_keys[i], semantic_path)
         
         # Add semantic path to record
         record['semantic_path'] = semantic_path
@@ -117,26 +286,24 @@ def enhance_records_with_semantic_paths(input_file: str, output_file: str) -> No
         # Create a human-readable semantic path string
         record['semantic_path_string'] = ' > '.join(semantic_path)
         
-
-        
         enhanced_records.append(record)
     
-    # Write enhanced records
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for record in enhanced_records:
-            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    if cache:
+        cache.close()
+        print(f"Stage cache: {cache.stats['hits']} reused, {cache.stats['misses']} recomputed")
     
-    print(f"Enhanced {len(enhanced_records)} records with semantic paths")
-    print(f"Output written to: {output_file}")
+    return enhanced_records
+
+
+def _enhance_columnar(input_file: str) -> Iterator[Dict[str, Any]]:
+    """Add semantic paths on a columnar store; records are rebuilt one at a time for writing."""
+    store = RecordStore.from_jsonl(input_file)
+    print(f"Loaded {len(store)} records into a columnar store ({store.nbytes() / 1e6:.1f} MB)")
     
-    # Show some examples
-    print("\n=== Semantic Path Examples ===")
-    for record in enhanced_records[:5]:
-        if record.get('semantic_path'):
-            print(f"Title: {record.get('title', 'N/A')}")
-            print(f"Subtitle: {record.get('subtitle', 'N/A')}")
-            print(f"Semantic Path: {' > '.join(record['semantic_path'])}")
-            print()
+    paths = build_semantic_paths_columnar(store)
+    store.set_column('semantic_path', paths)
+    store.set_column('semantic_path_string', [' > '.join(path) for path in paths])
+    return store.iter_records(store.argsort('order'))
 
 
 def create_semantic_path_index(records: List[Dict[str, Any]]) -> Dict[str, List[str]]:
@@ -0,0 +1,329 @@
+"""
+Local read-only query server over ingested outputs.
+
+`QueryService` loads records once and keeps them warm together with their
+indexes: an anchor index, the document tree (loaded from `<base>.tree.npz`
+when present, otherwise built), the cross-reference graph (`<base>.xref.npz`
+likewise) and an inverted index for lexical search. `serve` exposes it over
+a small asyncio HTTP/1.1 server bound to localhost; it has no dependencies
+beyond the standard library and never touches the network otherwise.
+
+Endpoints (all GET, JSON responses):
+
+    /anchor/<anchor>            records with that anchor
+    /children/<anchor>          direct children
+    /subtree/<anchor>           all descendants, in reading order
+    /prefix?path=a/b            records whose path starts with the segments
+    /search?q=...&limit=10      BM25-ranked lexical search
+    /cites/<anchor>             anchors cited by <anchor> (?depth=, ?reverse=1)
+    /stats                      record counts, cache hit rate, latency histograms
+    /health
+
+Responses for identical requests are served from an LRU cache.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import OrderedDict, Counter, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from loguru import logger
+
+from .compression import strip_compression
+from .document_tree import DocumentTree
+from .reference_graph import ReferenceGraph
+from .sharding import read_records, manifest_base
+
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Endpoints with their own latency histogram; any other path counts as "unknown"
+ENDPOINTS = ("root", "anchor", "children", "subtree", "prefix", "search", "cites", "stats", "health")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class LRUCache:
+    """Response cache with least-recently-used eviction and hit statistics."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing quantile `q`."""
+        total = sum(self.counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = sum(self.counts)
+        labels = [f"<={b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            "count": total,
+            "mean_ms": round(self.total_ms / total, 3) if total else None,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class QueryService:
+    """Warm, in-memory query layer over one output file."""
+
+    def __init__(self, records: List[Dict[str, Any]], tree: Optional[DocumentTree] = None,
+                 graph: Optional[ReferenceGraph] = None):
+        self.records = records
+        self.tree = tree if tree is not None and len(tree) == len(records) else DocumentTree.from_records(records)
+        self.graph = graph if graph is not None else ReferenceGraph.from_records(records)
+
+        self.by_anchor: Dict[str, List[int]] = defaultdict(list)
+        for i, record in enumerate(records):
+            self.by_anchor[record.get('anchor')].append(i)
+        self._build_search_index()
+
+    @classmethod
+    def from_output(cls, input_file: str) -> "QueryService":
+        """Load records plus any `.tree.npz`/`.xref.npz` index saved next to them."""
+        records = list(read_records(input_file))
+        base = strip_compression(manifest_base(input_file)).replace('.jsonl', '')
+
+        tree = graph = None
+        if os.path.exists(f"{base}.tree.npz"):
+            tree = DocumentTree.load(f"{base}.tree.npz")
+            logger.info(f"Loaded tree index {base}.tree.npz")
+        if os.path.exists(f"{base}.xref.npz"):
+            graph = ReferenceGraph.load(f"{base}.xref.npz")
+            logger.info(f"Loaded reference graph {base}.xref.npz")
+        return cls(records, tree, graph)
+
+    def _build_search_index(self) -> None:
+        """Inverted index over title, subtitle and content for BM25 ranking."""
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        for i, record in enumerate(self.records):
+            text = ' '.join(record.get(field) or '' for field in ('title', 'subtitle', 'content'))
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            self.doc_lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                self.postings[token].append((i, tf))
+        self.avg_length = sum(self.doc_lengths) / max(len(self.doc_lengths), 1)
+
+    def get(self, anchor: str) -> List[Dict[str, Any]]:
+        return [self.records[i] for i in self.by_anchor.get(anchor, [])]
+
+    def children(self, anchor: str) -> List[Dict[str, Any]]:
+        node_id = self.tree.node_id(anchor)
+        return [self.records[i] for i in self.tree.children(node_id)]
+
+    def subtree(self, anchor: str) -> List[Dict[str, Any]]:
+        node_id = self.tree.node_id(anchor)
+        return [self.records[int(i)] for i in self.tree.descendants(node_id)]
+
+    def prefix(self, segments: List[str], limit: int = 100) -> List[Dict[str, Any]]:
+        size = len(segments)
+        matches = [r for r in self.records if (r.get('path') or [])[:size] == segments]
+        return matches[:limit]
+
+    def search(self, query: str, limit: int = 10, k1: float = 1.2, b: float = 0.75) -> List[Dict[str, Any]]:
+        """BM25 search; returns anchors, titles and scores."""
+        scores: Dict[int, float] = defaultdict(float)
+        n = len(self.records)
+        for token in set(TOKEN_PATTERN.findall(query.lower())):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = k1 * (1 - b + b * self.doc_lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [
+            {"anchor": self.records[i].get('anchor'), "title": self.records[i].get('title'),
+             "subtitle": self.records[i].get('subtitle'), "score": round(score, 4)}
+            for i, score in ranked
+        ]
+
+    def cites(self, anchor: str, depth: int = 1, reverse: bool = False) -> List[Dict[str, Any]]:
+        node_id = self.graph.resolve(anchor)
+        return [{"target": self.graph.nodes[related], "hops": hops}
+                for related, hops in self.graph.traverse(node_id, depth=depth, reverse=reverse)]
+
+
+class QueryServer:
+    """Minimal asyncio HTTP/1.1 front end for a QueryService."""
+
+    def __init__(self, service: QueryService, cache_size: int = 1024):
+        self.service = service
+        self.cache = LRUCache(cache_size)
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.started_at = time.time()
+
+    def route(self, target: str) -> Tuple[int, Any]:
+        """Resolve a request target to (status, JSON-serializable body)."""
+        parts = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        segments = [unquote(s) for s in parts.path.strip('/').split('/') if s]
+        endpoint = segments[0] if segments else ''
+        argument = '/'.join(segments[1:])
+        service = self.service
+
+        try:
+            if endpoint == 'anchor' and argument:
+                records = service.get(argument)
+                return (200, records) if records else (404, {"error": f"Unknown anchor: {argument}"})
+            if endpoint == 'children' and argument:
+                return 200, service.children(argument)
+            if endpoint == 'subtree' and argument:
+                return 200, service.subtree(argument)
+            if endpoint == 'prefix':
+                path = params.get('path') or argument
+                return 200, service.prefix([s for s in path.split('/') if s], int(params.get('limit', 100)))
+            if endpoint == 'search':
+                return 200, service.search(params.get('q', ''), int(params.get('limit', 10)))
+            if endpoint == 'cites' and argument:
+                return 200, service.cites(argument, int(params.get('depth', 1)),
+                                          params.get('reverse', '0') in ('1', 'true'))
+        except KeyError:
+            return 404, {"error": f"Unknown anchor: {argument}"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"Error handling {target}")
+            return 500, {"error": str(e)}
+        return 404, {"error": f"Unknown endpoint: {parts.path}"}
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "records": len(self.service.records),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "cache": {"entries": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses,
+                      "hit_rate": round(self.cache.hits / lookups, 3) if lookups else None},
+            "latency": {endpoint: hist.to_dict() for endpoint, hist in sorted(self.latency.items())},
+        }
+
+    def handle(self, method: str, target: str) -> Tuple[int, bytes]:
+        """Answer one request, from the cache when possible, and record its latency."""
+        started = time.perf_counter()
+        endpoint = urlsplit(target).path.strip('/').split('/')[0] or 'root'
+        if endpoint not in ENDPOINTS:
+            # One histogram for all unknown paths, so /stats stays bounded
+            endpoint = 'unknown'
+
+        if method != 'GET':
+            status, body = 405, json.dumps({"error": "Only GET is supported"}).encode()
+        elif endpoint == 'stats':
+            status, body = 200, json.dumps(self.stats()).encode()
+        elif endpoint == 'health':
+            status, body = 200, b'{"status":"ok"}'
+        else:
+            body = self.cache.get(target)
+            status = 200
+            if body is None:
+                status, payload = self.route(target)
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                if status == 200:
+                    self.cache.put(target, body)
+
+        self.latency[endpoint].observe((time.perf_counter() - started) * 1000)
+        return status, body
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                status, body = self.handle(method, target)
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                          500: 'Internal Server Error'}[status]
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        logger.info(f"Serving {len(self.service.records)} records on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def serve(input_file: str, host: str = "127.0.0.1", port: int = 8765, cache_size: int = 1024) -> None:
+    """Load `input_file` and serve it until interrupted."""
+    server = QueryServer(QueryService.from_output(input_file), cache_size=cache_size)
+    asyncio.run(server.serve_forever(host, port))
@@ -0,0 +1,244 @@
+"""
+Size-based sharded outputs with a manifest.
+
+`ShardedWriter` rolls over to a new JSONL or Parquet shard once the current
+one reaches a target size (in uncompressed record bytes) or record count:
+
+    <prefix>-00000.jsonl, <prefix>-00001.jsonl, ...
+    <prefix>.jsonl.manifest.json
+
+The manifest lists every shard with its record count, order-key range, file
+size and SHA-256 checksum, so a corrupt or truncated shard can be detected
+and re-written on its own. `read_records` accepts either a plain JSONL file
+or a manifest and, for manifests, verifies and loads shards in parallel
+with a bounded prefetch window.
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
+
+from .compression import open_text, with_compression
+from .normalized import NormalizedRecords, is_normalized
+from .reference_chunks import iter_reference_records, is_reference
+
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def is_manifest(path: str) -> bool:
+    return str(path).endswith(MANIFEST_SUFFIX)
+
+
+def manifest_path(prefix: str, output_format: str = "jsonl") -> str:
+    return f"{prefix}.{output_format}{MANIFEST_SUFFIX}"
+
+
+def manifest_base(path: str) -> str:
+    """Map a manifest path back to its single-file name ("x.jsonl.manifest.json" -> "x.jsonl")."""
+    path = str(path)
+    return path[:-len(MANIFEST_SUFFIX)] if is_manifest(path) else path
+
+
+class ShardedWriter:
+    """Write record batches to rolling JSONL or Parquet shards."""
+
+    def __init__(self, prefix: str, output_format: str = "jsonl",
+                 max_bytes: Optional[int] = None, max_records: Optional[int] = None,
+                 compression: Optional[str] = None):
+        """
+        Args:
+            prefix: Output prefix; shards are `<prefix>-NNNNN.<ext>`
+            output_format: "jsonl" or "parquet"
+            max_bytes: Roll over once a shard holds this many uncompressed record bytes
+            max_records: Roll over once a shard holds this many records
+            compression: gzip/zstd for JSONL shards (Parquet codec for Parquet shards)
+        """
+        if output_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unsupported shard format: {output_format}")
+        self.prefix = prefix
+        self.output_format = output_format
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.compression = compression
+        self.output_file = manifest_path(prefix, output_format)
+        self.count = 0
+
+        self.shards: List[Dict[str, Any]] = []
+        self._writer = None
+        self._current: Dict[str, Any] = {}
+
+    def _shard_path(self, index: int) -> str:
+        path = f"{self.prefix}-{index:05d}.{self.output_format}"
+        if self.output_format == "jsonl":
+            path = with_compression(path, self.compression)
+        return path
+
+    def _open_shard(self) -> None:
+        from .writers import JsonlWriter, ParquetWriter
+
+        path = self._shard_path(len(self.shards))
+        if self.output_format == "jsonl":
+            self._writer = JsonlWriter(path)
+        else:
+            self._writer = ParquetWriter(path, compression=self.compression)
+        self._current = {"path": path, "records": 0, "record_bytes": 0,
+                         "order_min": None, "order_max": None}
+
+    def _close_shard(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        path = self._current["path"]
+        self.shards.append({
+            "path": os.path.basename(path),
+            "records": self._current["records"],
+            "bytes": os.path.getsize(path),
+            "sha256": file_sha256(path),
+            "order_min": self._current["order_min"],
+            "order_max": self._current["order_max"],
+        })
+        self._writer = None
+
+    def _full(self) -> bool:
+        if self.max_records is not None and self._current["records"] >= self.max_records:
+            return True
+        if self.max_bytes is not None and self._current["record_bytes"] >= self.max_bytes:
+            return True
+        return False
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        """Write a batch of records, rolling over shards as limits are reached."""
+        pending: List[Dict[str, Any]] = []
+        for record in records:
+            if self._writer is None:
+                self._open_shard()
+
+            pending.append(record)
+            self._current["records"] += 1
+            self._current["record_bytes"] += len(json.dumps(record, ensure_ascii=False).encode('utf-8')) + 1
+            order = record.get('order')
+            if order is not None:
+                if self._current["order_min"] is None or order < self._current["order_min"]:
+                    self._current["order_min"] = order
+                if self._current["order_max"] is None or order > self._current["order_max"]:
+                    self._current["order_max"] = order
+
+            if self._full():
+                self._writer.write(pending)
+                pending = []
+                self._close_shard()
+
+        if pending:
+            self._writer.write(pending)
+        self.count += len(records)
+
+    def close(self) -> Dict[str, Any]:
+        """Close the last shard and write the manifest."""
+        self._close_shard()
+        manifest = {
+            "version": 1,
+            "format": self.output_format,
+            "compression": self.compression,
+            "records": sum(shard["records"] for shard in self.shards),
+            "shards": self.shards,
+        }
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Load a manifest and resolve shard paths relative to it."""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = Path(path).parent
+    for shard in manifest["shards"]:
+        shard["file"] = str(base / shard["path"])
+    return manifest
+
+
+def shard_matches(shard: Dict[str, Any]) -> bool:
+    """True when a shard file exists with the size and checksum its manifest entry lists."""
+    return (os.path.exists(shard["file"])
+            and os.path.getsize(shard["file"]) == shard["bytes"]
+            and file_sha256(shard["file"]) == shard["sha256"])
+
+
+def verify_manifest(path: str) -> List[str]:
+    """Return the paths of shards whose size or checksum does not match the manifest."""
+    return [shard["file"] for shard in read_manifest(path)["shards"] if not shard_matches(shard)]
+
+
+def _load_shard(shard: Dict[str, Any], output_format: str, verify: bool = True) -> List[Dict[str, Any]]:
+    shard_file = shard["file"]
+    if verify and not shard_matches(shard):
+        raise ValueError(f"Shard {shard_file} does not match its manifest (missing, truncated or corrupt); "
+                         "regenerate it")
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        from .writers import record_from_parquet_row
+
+        return [record_from_parquet_row(row) for row in pq.read_table(shard_file).to_pylist()]
+
+    return list(_iter_jsonl(shard_file))
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open_text(path) as f:
+        for line_num, line in enumerate(f, 1):
+            try:
+                yield json.loads(line.strip())
+            except json.JSONDecodeError as e:
+                print(f"Error parsing {path} line {line_num}: {e}")
+                continue
+
+
+def read_records(path: str, workers: int = 4, verify: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate records from a JSONL file, a shard manifest, normalized output or
+    reference-form chunk output (materialized on the fly).
+
+    Manifest shards are loaded in parallel, at most `workers` ahead of the
+    consumer, and yielded in manifest order. With `verify`, each shard's size
+    and checksum are checked against the manifest before it is parsed, and a
+    mismatch raises ValueError.
+    """
+    if is_normalized(path):
+        yield from NormalizedRecords(path)
+        return
+    if is_reference(path):
+        yield from iter_reference_records(path)
+        return
+    if not is_manifest(path):
+        yield from _iter_jsonl(path)
+        return
+
+    manifest = read_manifest(path)
+    window = max(workers, 1)
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        shards = iter(manifest["shards"])
+        pending = deque(pool.submit(_load_shard, shard, manifest["format"], verify)
+                        for shard in islice(shards, window))
+        while pending:
+            records = pending.popleft().result()
+            # Keep the window full while the consumer works through this shard
+            shard = next(shards, None)
+            if shard is not None:
+                pending.append(pool.submit(_load_shard, shard, manifest["format"], verify))
+            yield from records
@@ -0,0 +1,174 @@
+"""
+Content-addressed cache for per-record stage outputs.
+
+A stage output is keyed by:
+
+- the stage name and a digest of its parameters (e.g. `max_tokens`),
+- a digest of the input record, ignoring volatile fields such as
+  `ingested_at` that change on every ingest without changing the content,
+- for stages that depend on the hierarchy, digests of the record's ancestors.
+
+Changing a record therefore only invalidates that record and, through the
+ancestor digests, its subtree. Outputs are stored as JSON in a SQLite
+database and served from disk on later runs. `MemoryStageCache` keeps the
+previous run's outputs in process instead (for the `watch` daemon).
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+
+# Fields that differ between ingests of identical content
+VOLATILE_FIELDS = ('ingested_at', 'source')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_outputs (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+
+def params_digest(stage: str, params: Dict[str, Any]) -> str:
+    """Digest of a stage name and its parameters."""
+    encoded = json.dumps({"stage": stage, "params": params}, sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def record_digest(record: Dict[str, Any], exclude: Iterable[str] = VOLATILE_FIELDS) -> str:
+    """Return a stable digest of a record, ignoring `exclude` fields."""
+    excluded = set(exclude)
+    stable = {k: v for k, v in record.items() if k not in excluded}
+    encoded = json.dumps(stable, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class StageCache:
+    """Disk-backed cache of stage outputs for one stage configuration."""
+
+    def __init__(self, cache_dir: str, stage: str, params: Optional[Dict[str, Any]] = None,
+                 flush_every: int = 500):
+        """
+        Args:
+            cache_dir: Directory holding the cache database
+            stage: Stage name (part of every key)
+            params: Stage parameters; any change invalidates all entries
+            flush_every: Number of buffered writes before committing
+        """
+        self.stage = stage
+        self.params = params or {}
+        self.flush_every = flush_every
+        self.params_digest = params_digest(stage, self.params)
+
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(Path(cache_dir) / "stages.sqlite"), timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+        self._pending: Dict[str, str] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def key(self, record: Dict[str, Any], ancestors: Iterable[Dict[str, Any]] = ()) -> str:
+        """Return the cache key for `record` given its ancestor records."""
+        parts = [self.params_digest, record_digest(record)]
+        parts.extend(record_digest(ancestor) for ancestor in ancestors)
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached output for `key`, or None."""
+        value = self._pending.get(key)
+        if value is None:
+            row = self._conn.execute(
+                "SELECT value FROM stage_outputs WHERE key = ?", (key,)
+            ).fetchone()
+            value = row[0] if row else None
+
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(value)
+
+    def put(self, key: str, output: Any) -> None:
+        """Store the output for `key`."""
+        self._pending[key] = json.dumps(output, ensure_ascii=False)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit buffered writes."""
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stage_outputs (key, value) VALUES (?, ?)",
+                list(self._pending.items())
+            )
+        self._pending.clear()
+
+    def close(self) -> None:
+        """Flush pending writes and close the database."""
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self) -> "StageCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class MemoryStageCache:
+    """
+    In-process stage cache holding the outputs of the previous run.
+
+    Same interface as `StageCache`. Outputs used or stored during a run are
+    kept for the next one when `next_run` is called; everything else is
+    dropped, so memory stays proportional to one run.
+    """
+
+    key = StageCache.key
+
+    def __init__(self, stage: str, params: Optional[Dict[str, Any]] = None):
+        self.stage = stage
+        self.params = params or {}
+        self.params_digest = params_digest(stage, self.params)
+        self._previous: Dict[str, str] = {}
+        self._current: Dict[str, str] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._current.get(key) or self._previous.get(key)
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self._current[key] = value
+        self.stats["hits"] += 1
+        return json.loads(value)
+
+    def put(self, key: str, output: Any) -> None:
+        self._current[key] = json.dumps(output, ensure_ascii=False)
+
+    def next_run(self) -> None:
+        """Keep this run's outputs for the next run and reset the stats."""
+        self._previous, self._current = self._current, {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def restore_volatile_fields(outputs: List[Dict[str, Any]], record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Copy the current record's volatile fields onto cached output records."""
+    for output in outputs:
+        for field in VOLATILE_FIELDS:
+            if field in output and field in record:
+                output[field] = record[field]
+    return outputs
@@ -0,0 +1,193 @@
+"""
+Lazy query API over ingested outputs.
+
+`ECMStore` opens any Parquet output of the pipeline as a pyarrow dataset:
+
+- a single Parquet file (`ingest`, `run`)
+- a Parquet shard manifest (`--shard-mb/--shard-records`)
+- a partitioned dataset directory (`partition`)
+- a JSONL file (read through pyarrow's JSON reader; no row-group pruning).
+  A `.jsonl.gz` / `.jsonl.zst` file is decompressed into memory first
+
+Queries are lazy: `store.query(...)` only builds a filter expression and a
+column projection. Nothing is read until `batches()`, `to_table()`,
+`records()` or `count()` is called, and then only the projected columns
+(plus those the filter needs) are decoded, and Parquet row groups whose
+statistics cannot match are skipped.
+
+    store = ECMStore("AustinTXEnvironmentalCriteriaManualEXPORT20250102.parquet")
+    store.get("appendix-q-4")
+    store.query(block_types=["TABLE"], confidence=(0.9, None), columns=["anchor", "title"]).records()
+"""
+
+import os
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from .compression import detect_compression, strip_compression
+from .sharding import is_manifest, read_manifest
+from .writers import record_from_parquet_row
+
+
+# Separator used to compare path prefixes as joined strings
+_PATH_SEPARATOR = "\x1f"
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+def _open_dataset(source: str) -> ds.Dataset:
+    """Open a Parquet file, shard manifest, dataset directory or JSONL file."""
+    if is_manifest(source):
+        manifest = read_manifest(source)
+        if manifest["format"] != "parquet":
+            raise ValueError(f"{source} lists {manifest['format']} shards; ECMStore reads Parquet shards")
+        return ds.dataset([shard["file"] for shard in manifest["shards"]], format="parquet")
+    if os.path.isdir(source):
+        if any(name.startswith("section=") for name in os.listdir(source)):
+            from .partitioned import open_partitioned
+
+            return open_partitioned(source)
+        return ds.dataset(source, format="parquet", ignore_prefixes=[".", "_"])
+    if strip_compression(source).endswith(".jsonl"):
+        compression = detect_compression(source)
+        if compression is None:
+            return ds.dataset(source, format="json")
+        import pyarrow.json as pj
+
+        with pa.input_stream(source, compression=compression) as stream:
+            return ds.dataset(pj.read_json(stream))
+    return ds.dataset(source, format="parquet")
+
+
+def _range_filter(column: str, bounds: Optional[Range]) -> Optional[ds.Expression]:
+    if bounds is None:
+        return None
+    low, high = bounds
+    expression = None
+    if low is not None:
+        expression = pc.field(column) >= low
+    if high is not None:
+        upper = pc.field(column) <= high
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def path_prefix_filter(prefix: Sequence[str]) -> ds.Expression:
+    """Match records whose `path` starts with the segments in `prefix`."""
+    prefix = list(prefix)
+    joined = pc.binary_join(pc.list_slice(pc.field("path"), 0, len(prefix)), _PATH_SEPARATOR)
+    return (pc.list_value_length(pc.field("path")) >= len(prefix)) & (joined == _PATH_SEPARATOR.join(prefix))
+
+
+class ECMQuery:
+    """A filtered, projected scan that runs only when its results are requested."""
+
+    def __init__(self, dataset: ds.Dataset, expression: Optional[ds.Expression],
+                 columns: Optional[List[str]], batch_size: int):
+        self.dataset = dataset
+        self.expression = expression
+        self.columns = columns
+        self.batch_size = batch_size
+
+    def scanner(self) -> ds.Scanner:
+        return self.dataset.scanner(filter=self.expression, columns=self.columns, batch_size=self.batch_size)
+
+    def batches(self) -> Iterator[pa.RecordBatch]:
+        """Stream matching rows as Arrow record batches."""
+        for batch in self.scanner().to_batches():
+            if batch.num_rows:
+                yield batch
+
+    def to_table(self) -> pa.Table:
+        return self.scanner().to_table()
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Matching rows as record dicts (section labels re-nested for full rows)."""
+        rows = self.to_table().to_pylist()
+        if self.columns is not None and 'section' not in self.columns:
+            return rows
+        return [record_from_parquet_row(row) for row in rows]
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for batch in self.batches():
+            for row in batch.to_pylist():
+                yield row if self.columns is not None and 'section' not in self.columns \
+                    else record_from_parquet_row(row)
+
+    def count(self) -> int:
+        return self.scanner().count_rows()
+
+    def first(self) -> Optional[Dict[str, Any]]:
+        for record in self.iter_records():
+            return record
+        return None
+
+
+class ECMStore:
+    """Query interface over a pyarrow dataset of ingested records."""
+
+    def __init__(self, source: str, batch_size: int = 4096):
+        """
+        Args:
+            source: Parquet file, Parquet shard manifest, partitioned dataset
+                directory or JSONL file
+            batch_size: Maximum rows per Arrow batch
+        """
+        self.source = source
+        self.batch_size = batch_size
+        self.dataset = _open_dataset(source)
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self.dataset.schema
+
+    def query(self, anchors: Optional[Sequence[str]] = None,
+              path_prefix: Optional[Sequence[str]] = None,
+              block_types: Optional[Sequence[str]] = None,
+              confidence: Optional[Range] = None,
+              order: Optional[Range] = None,
+              parent_anchor: Optional[str] = None,
+              expression: Optional[ds.Expression] = None,
+              columns: Optional[List[str]] = None) -> ECMQuery:
+        """
+        Build a lazy query.
+
+        Args:
+            anchors: Match any of these anchors
+            path_prefix: Match records whose path starts with these segments
+            block_types: Match any of these block types
+            confidence: (low, high) inclusive bounds; either may be None
+            order: (low, high) inclusive bounds on `order`
+            parent_anchor: Match direct children of this anchor
+            expression: Extra pyarrow dataset expression, ANDed with the rest
+            columns: Columns to return (all when None)
+        """
+        filters = [
+            pc.field("anchor").isin(list(anchors)) if anchors else None,
+            path_prefix_filter(path_prefix) if path_prefix else None,
+            pc.field("block_type").isin(list(block_types)) if block_types else None,
+            _range_filter("confidence", confidence),
+            _range_filter("order", order),
+            (pc.field("parent_anchor") == parent_anchor) if parent_anchor is not None else None,
+            expression,
+        ]
+        combined = None
+        for item in filters:
+            if item is not None:
+                combined = item if combined is None else combined & item
+        return ECMQuery(self.dataset, combined, columns, self.batch_size)
+
+    def get(self, anchor: str, columns: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """First record with `anchor`, or None."""
+        return self.query(anchors=[anchor], columns=columns).first()
+
+    def children(self, anchor: str, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Direct children of `anchor`, in `order`."""
+        records = self.query(parent_anchor=anchor, columns=columns).records()
+        return sorted(records, key=lambda r: r.get('order') or 0)
+
+    def count(self) -> int:
+        return self.dataset.count_rows()
@@ -0,0 +1,236 @@
+"""
+Persistent on-disk tokenization cache.
+
+Maps a digest of (encoding name, text) to its token count and, optionally,
+its token ids. Entries live in a SQLite database in WAL mode so several
+chunking processes can read concurrently while one writes; writes are
+buffered and committed in batches. Every hit, in memory or on disk, renews
+an entry's `last_used`. The cache keeps a running total of its size; when
+that passes `max_bytes`, the least recently used entries are evicted down to
+`EVICT_TO` of the budget. A cache may be shared by threads of one process
+(see `chunker._chunk_stream`).
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    digest BLOB PRIMARY KEY,
+    count INTEGER NOT NULL,
+    ids BLOB,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+)
+"""
+
+# Approximate per-row overhead (key, integers, page bookkeeping)
+ROW_OVERHEAD = 64
+
+# Eviction frees space down to this fraction of the budget, so a full cache
+# does not evict again on every flush
+EVICT_TO = 0.9
+
+
+class TokenCache:
+    """SQLite-backed cache of token counts (and optionally token ids)."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024,
+                 store_ids: bool = False, encoding_name: str = "cl100k_base",
+                 flush_every: int = 1000, memory_entries: int = 100_000):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            max_bytes: Size budget before least recently used entries are evicted
+            store_ids: Also persist token ids, not just counts
+            encoding_name: Encoding the cached values belong to (part of the key)
+            flush_every: Number of buffered writes before committing
+            memory_entries: Size of the in-process lookup layer
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.store_ids = store_ids
+        self.encoding_name = encoding_name
+        self.flush_every = flush_every
+        self.memory_entries = memory_entries
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tokens_last_used ON tokens (last_used)")
+        self._conn.commit()
+
+        self._memory: Dict[bytes, Tuple[int, Optional[List[int]]]] = {}
+        self._pending: Dict[bytes, Tuple[int, Optional[bytes], int]] = {}
+        self._touched: Set[bytes] = set()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tokens").fetchone()[0]
+
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def digest(self, text: str) -> bytes:
+        """Return the cache key for `text`."""
+        key = f"{self.encoding_name}\0{text}".encode('utf-8')
+        return hashlib.blake2b(key, digest_size=16).digest()
+
+    def _lookup(self, digest: bytes, need_ids: bool) -> Optional[Tuple[int, Optional[List[int]]]]:
+        """Find an entry in memory, pending writes or on disk."""
+        entry = self._memory.get(digest)
+        if entry is not None and (entry[1] is not None or not need_ids):
+            self._touch(digest)
+            return entry
+
+        row = self._conn.execute(
+            "SELECT count, ids FROM tokens WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        count, blob = row
+        ids = list(array('I', blob)) if blob is not None else None
+        if need_ids and ids is None:
+            return None
+
+        entry = (count, ids)
+        self._remember(digest, entry)
+        self._touch(digest)
+        return entry
+
+    def _touch(self, digest: bytes) -> None:
+        self._touched.add(digest)
+        if len(self._touched) >= self.flush_every:
+            self._flush()
+
+    def _remember(self, digest: bytes, entry: Tuple[int, Optional[List[int]]]) -> None:
+        if len(self._memory) >= self.memory_entries:
+            self._memory.clear()
+        self._memory[digest] = entry
+
+    def get_count(self, text: str) -> Optional[int]:
+        """Return the cached token count for `text`, or None."""
+        digest = self.digest(text)
+        with self._lock:
+            entry = self._lookup(digest, need_ids=False)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def get_ids(self, text: str) -> Optional[List[int]]:
+        """Return cached token ids for `text`, or None."""
+        digest = self.digest(text)
+        with self._lock:
+            entry = self._lookup(digest, need_ids=True)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, text: str, count: int, ids: Optional[List[int]] = None) -> None:
+        """Record the token count (and ids, if enabled) for `text`."""
+        digest = self.digest(text)
+        if not self.store_ids:
+            ids = None
+        blob = array('I', ids).tobytes() if ids is not None else None
+        size = ROW_OVERHEAD + (len(blob) if blob else 0)
+        with self._lock:
+            self._remember(digest, (count, ids))
+            self._pending[digest] = (count, blob, size)
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def flush(self) -> None:
+        """Commit buffered writes and recency updates, then enforce the size budget."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending and not self._touched:
+            return
+
+        now = time.time_ns()
+        with self._conn:
+            self._size += self._growth()
+            self._conn.executemany(
+                "INSERT INTO tokens (digest, count, ids, size, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET count = excluded.count, "
+                "ids = COALESCE(excluded.ids, tokens.ids), "
+                "size = MAX(excluded.size, tokens.size), last_used = excluded.last_used",
+                [(digest, count, blob, size, now) for digest, (count, blob, size) in self._pending.items()]
+            )
+            self._conn.executemany(
+                "UPDATE tokens SET last_used = ? WHERE digest = ?",
+                [(now, digest) for digest in self._touched]
+            )
+        self._pending.clear()
+        self._touched.clear()
+        self._evict()
+
+    def _growth(self) -> int:
+        """Bytes the pending writes add (an upsert keeps the larger size)."""
+        digests = list(self._pending)
+        existing: Dict[bytes, int] = {}
+        for start in range(0, len(digests), 500):
+            batch = digests[start:start + 500]
+            existing.update(self._conn.execute(
+                f"SELECT digest, size FROM tokens WHERE digest IN ({','.join('?' * len(batch))})", batch
+            ))
+        return sum(max(size - existing.get(digest, 0), 0)
+                   for digest, (_, _, size) in self._pending.items())
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits `max_bytes`."""
+        with self._lock:
+            return self._evict()
+
+    def _evict(self) -> int:
+        if self._size <= self.max_bytes:
+            return 0
+
+        # Other processes sharing the database also write and evict, so the
+        # running total is re-synced before acting on it
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tokens").fetchone()[0]
+        if self._size <= self.max_bytes:
+            return 0
+
+        excess = self._size - int(self.max_bytes * EVICT_TO)
+        removed = 0
+        freed = 0
+        with self._conn:
+            rows = self._conn.execute("SELECT digest, size FROM tokens ORDER BY last_used")
+            victims = []
+            for digest, size in rows:
+                victims.append((digest,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM tokens WHERE digest = ?", victims)
+            removed = len(victims)
+
+        self._size -= freed
+        for (digest,) in victims:
+            self._memory.pop(digest, None)
+            self._touched.discard(digest)
+        self.stats["evicted"] += removed
+        return removed
+
+    def close(self) -> None:
+        """Flush pending writes and close the database."""
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self) -> "TokenCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
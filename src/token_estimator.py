@@ -0,0 +1,220 @@
+"""
+Calibrated token-count estimator for threshold checks.
+
+Most token counts taken while chunking only decide whether a text fits under
+a limit (`max_tokens`, the window target). A linear model over cheap text
+features (characters, words, punctuation, digits, non-ASCII characters,
+lines) predicts the BPE count. It is fitted by least squares on exact
+counts for a corpus, together with error bounds:
+
+    lower = estimate * ratio_low - slack_low
+    upper = estimate * ratio_high + slack_high
+
+With `coverage=1.0` every calibration text lies inside its bounds. The
+chunker settles a check from the estimate when the whole band is on one side
+of the limit, and counts exactly only when the limit falls inside the band.
+The boundary units of a text are estimated in one batched `estimate` call
+and settled with `settle`; `stats` may be updated from several threads.
+
+    estimator = calibrate(texts, exact_counts)
+    estimator.save("token_estimator.json")
+    chunker.configure_token_estimator(TokenEstimator.load("token_estimator.json"))
+"""
+
+import json
+import string
+import threading
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+
+FEATURES = ("chars", "words", "punctuation", "digits", "non_ascii", "lines", "bias")
+
+# Ratio bounds are taken over texts at least this long (in exact tokens);
+# the slack terms cover shorter ones
+MIN_RATIO_TOKENS = 20
+
+_STRIP_PUNCTUATION = str.maketrans('', '', string.punctuation)
+_STRIP_DIGITS = str.maketrans('', '', string.digits)
+
+
+def _features(text: str) -> List[float]:
+    length = len(text)
+    return [
+        float(length),
+        float(len(text.split())),
+        float(length - len(text.translate(_STRIP_PUNCTUATION))),
+        float(length - len(text.translate(_STRIP_DIGITS))),
+        float(length - len(text.encode('ascii', 'ignore'))),
+        float(text.count('\n')),
+        1.0,
+    ]
+
+
+def text_features(texts: Sequence[str]) -> np.ndarray:
+    """Feature matrix (one row per text, columns as in FEATURES)."""
+    return np.array([_features(text) for text in texts], dtype=np.float64).reshape(-1, len(FEATURES))
+
+
+class TokenEstimator:
+    """Linear token-count model with calibrated error bounds."""
+
+    def __init__(self, coef: Sequence[float], ratio_low: float = 1.0, ratio_high: float = 1.0,
+                 slack_low: float = 0.0, slack_high: float = 0.0, report: Optional[Dict[str, Any]] = None):
+        self.coef = [float(c) for c in coef]
+        self.ratio_low = ratio_low
+        self.ratio_high = ratio_high
+        self.slack_low = slack_low
+        self.slack_high = slack_high
+        self.report = report or {}
+        self.stats = {"estimated": 0, "exact": 0}
+        self._lock = threading.Lock()
+
+    def estimate(self, texts: Sequence[str]) -> np.ndarray:
+        """Estimated token counts for many texts at once."""
+        return text_features(texts) @ np.array(self.coef)
+
+    def estimate_one(self, text: str) -> float:
+        return sum(c * f for c, f in zip(self.coef, _features(text)))
+
+    def bounds(self, estimate: float):
+        """(lower, upper) bounds on the exact count for an estimate."""
+        return estimate * self.ratio_low - self.slack_low, estimate * self.ratio_high + self.slack_high
+
+    def decide(self, text: str, limit: int) -> Optional[bool]:
+        """
+        True/False when `text` certainly has at most / more than `limit`
+        tokens, None when the limit is inside the error band.
+        """
+        return self.settle(self.estimate_one(text), limit)
+
+    def settle(self, estimate: float, limit: int) -> Optional[bool]:
+        """`decide` for an estimate already computed (e.g. by a batched `estimate`)."""
+        lower, upper = self.bounds(estimate)
+        decided = True if upper <= limit else False if lower > limit else None
+        with self._lock:
+            self.stats["exact" if decided is None else "estimated"] += 1
+        return decided
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "features": list(FEATURES),
+            "coef": self.coef,
+            "ratio_low": self.ratio_low,
+            "ratio_high": self.ratio_high,
+            "slack_low": self.slack_low,
+            "slack_high": self.slack_high,
+            "report": self.report,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TokenEstimator":
+        if data.get("features") != list(FEATURES):
+            raise ValueError("Token estimator was calibrated with different features; recalibrate it")
+        return cls(data["coef"], data["ratio_low"], data["ratio_high"],
+                   data["slack_low"], data["slack_high"], data.get("report"))
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "TokenEstimator":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def calibrate(texts: Sequence[str], exact: Sequence[int], coverage: float = 1.0,
+              thresholds: Sequence[int] = (250, 300)) -> TokenEstimator:
+    """
+    Fit an estimator to exact counts.
+
+    Args:
+        texts: Calibration texts
+        exact: Their exact BPE token counts
+        coverage: Fraction of calibration texts the bounds must contain
+        thresholds: Limits the report evaluates (the chunker's defaults)
+    """
+    features = text_features(texts)
+    exact = np.asarray(exact, dtype=np.float64)
+    coef, *_ = np.linalg.lstsq(features, exact, rcond=None)
+    predicted = features @ coef
+
+    # Multiplicative bounds over texts long enough for a stable ratio
+    long_enough = (exact >= MIN_RATIO_TOKENS) & (predicted > 0)
+    ratios = exact[long_enough] / predicted[long_enough] if long_enough.any() else np.ones(1)
+    ratio_low = float(np.quantile(ratios, 1.0 - coverage))
+    ratio_high = float(np.quantile(ratios, coverage))
+
+    # Additive slack for whatever the ratios do not cover (mostly short texts)
+    slack_low = float(max(np.quantile(predicted * ratio_low - exact, coverage), 0.0))
+    slack_high = float(max(np.quantile(exact - predicted * ratio_high, coverage), 0.0))
+
+    estimator = TokenEstimator(coef.tolist(), ratio_low, ratio_high, slack_low, slack_high)
+    estimator.report = calibration_report(estimator, texts, exact, thresholds)
+    return estimator
+
+
+def calibration_report(estimator: TokenEstimator, texts: Sequence[str], exact: Sequence[int],
+                       thresholds: Sequence[int] = (250, 300)) -> Dict[str, Any]:
+    """Accuracy of `estimator` on `texts` and the share of threshold checks it settles."""
+    exact = np.asarray(exact, dtype=np.float64)
+    predicted = estimator.estimate(texts)
+    lower, upper = estimator.bounds(predicted)
+    relative = np.abs(predicted - exact) / np.maximum(exact, 1.0)
+
+    report: Dict[str, Any] = {
+        "samples": int(len(exact)),
+        "tokens": int(exact.sum()),
+        "mean_abs_error": round(float(np.mean(np.abs(predicted - exact))), 3),
+        "relative_error": {
+            "p50": round(float(np.quantile(relative, 0.5)), 4),
+            "p95": round(float(np.quantile(relative, 0.95)), 4),
+            "p99": round(float(np.quantile(relative, 0.99)), 4),
+        },
+        "bounds": {
+            "ratio_low": round(estimator.ratio_low, 4),
+            "ratio_high": round(estimator.ratio_high, 4),
+            "slack_low": round(estimator.slack_low, 2),
+            "slack_high": round(estimator.slack_high, 2),
+            "within_bounds": round(float(np.mean((exact >= lower) & (exact <= upper))), 4),
+        },
+        "thresholds": {},
+    }
+    for limit in thresholds:
+        settled = (upper <= limit) | (lower > limit)
+        wrong = ((upper <= limit) & (exact > limit)) | ((lower > limit) & (exact <= limit))
+        report["thresholds"][str(limit)] = {
+            "settled_by_estimate": round(float(np.mean(settled)), 4),
+            "exact_calls_saved": int(settled.sum()),
+            "wrong_decisions": int(wrong.sum()),
+        }
+    return report
+
+
+def calibration_texts(contents: Sequence[str], max_samples: Optional[int] = None) -> List[str]:
+    """
+    Texts shaped like those the chunker checks: whole contents, their
+    boundary units (see `chunker.scan_boundaries`) and sentences.
+    """
+    from .chunker import SENTENCE_BREAK, scan_boundaries
+
+    texts: List[str] = []
+    for content in contents:
+        if not content:
+            continue
+        texts.append(content)
+        stack = list(scan_boundaries(content).children)
+        while stack:
+            node = stack.pop()
+            texts.append(content[node.start:node.end])
+            stack.extend(node.children)
+        texts.extend(sentence for sentence in SENTENCE_BREAK.split(content) if sentence.strip())
+
+    if max_samples and len(texts) > max_samples:
+        # Deterministic, evenly spaced sample
+        step = len(texts) / max_samples
+        texts = [texts[int(i * step)] for i in range(max_samples)]
+    return texts
@@ -0,0 +1,162 @@
+"""
+BPE encoder loading for token counts.
+
+`tiktoken.get_encoding("cl100k_base")` downloads its BPE file on first use,
+which stalls or fails on machines without outbound network. The encoder can
+instead be built from a local copy of `cl100k_base.tiktoken`, given by
+
+- `--bpe-path` on the commands that count tokens, or
+- the `AUSTIN_EXCEL_BPE_PATH` environment variable.
+
+The file is checked against the published cl100k_base digest, so chunk
+boundaries are the same on every machine. It is loaded once per process;
+`configure_encoding` does that up front and reports how long it took.
+Without a configured file, the copy tiktoken keeps in its on-disk cache is
+used, digest-checked the same way; the network is never touched. If no
+encoder can be loaded, token counts fall back to a `words * 0.75` estimate
+and a warning says so. A configured file that cannot be loaded is an error,
+never a fallback.
+"""
+
+import base64
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+BPE_PATH_ENV = "AUSTIN_EXCEL_BPE_PATH"
+ENCODING_NAME = "cl100k_base"
+
+# Where tiktoken downloads cl100k_base from; its cache file is named after it
+CL100K_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+
+# Published digest of cl100k_base.tiktoken
+CL100K_SHA256 = "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7"
+
+CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+"""
+    r"""|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+)
+CL100K_SPECIAL_TOKENS = {
+    "<|endoftext|>": 100257,
+    "<|fim_prefix|>": 100258,
+    "<|fim_middle|>": 100259,
+    "<|fim_suffix|>": 100260,
+    "<|endofprompt|>": 100276,
+}
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"loaded": False, "encoding": None, "source": None, "seconds": None, "error": None}
+
+
+def _tiktoken():
+    """Import tiktoken on first use; it is slow to import and only token counting needs it."""
+    try:
+        import tiktoken
+        return tiktoken
+    except ImportError:
+        return None
+
+
+def load_bpe_encoding(path: str, verify: bool = True):
+    """
+    Build the cl100k_base encoder from a local BPE file.
+
+    Raises:
+        ImportError: tiktoken is not installed
+        ValueError: the file is not the cl100k_base BPE file (with `verify`)
+            or cannot be parsed
+    """
+    tiktoken = _tiktoken()
+    if tiktoken is None:
+        raise ImportError("tiktoken is required to load a BPE file")
+
+    with open(path, 'rb') as f:
+        contents = f.read()
+    if verify:
+        digest = hashlib.sha256(contents).hexdigest()
+        if digest != CL100K_SHA256:
+            raise ValueError(f"{path} is not the {ENCODING_NAME} BPE file (sha256 {digest})")
+
+    ranks = {}
+    for line in contents.splitlines():
+        if not line:
+            continue
+        try:
+            token, rank = line.split()
+            ranks[base64.b64decode(token)] = int(rank)
+        except Exception as e:
+            raise ValueError(f"Error parsing line {line!r} in {path}") from e
+
+    return tiktoken.Encoding(
+        name=ENCODING_NAME,
+        pat_str=CL100K_PATTERN,
+        mergeable_ranks=ranks,
+        special_tokens=CL100K_SPECIAL_TOKENS,
+    )
+
+
+def tiktoken_cache_file() -> Optional[str]:
+    """Return where tiktoken caches the cl100k_base BPE file, or None if caching is off."""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, hashlib.sha1(CL100K_URL.encode()).hexdigest())
+
+
+def configure_encoding(bpe_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load the encoder for this process and return how it was loaded.
+
+    Uses `bpe_path`, else `AUSTIN_EXCEL_BPE_PATH`, else tiktoken's cached
+    copy; nothing is downloaded. A given path is exported to the environment
+    so worker processes load the same file.
+
+    Returns:
+        {"encoding", "source", "seconds", "error"}; `encoding` is None when
+        only the estimate is available
+    """
+    with _lock:
+        path = bpe_path or os.environ.get(BPE_PATH_ENV)
+        started = time.perf_counter()
+        encoding, source, error = None, None, None
+
+        if path:
+            encoding = load_bpe_encoding(path)
+            os.environ[BPE_PATH_ENV] = path
+            source = path
+        else:
+            cached = tiktoken_cache_file()
+            if _tiktoken() is None:
+                error = "tiktoken is not installed"
+            elif cached is None or not os.path.exists(cached):
+                error = f"{ENCODING_NAME} is not in tiktoken's cache"
+            else:
+                try:
+                    encoding = load_bpe_encoding(cached)
+                    source = cached
+                except (OSError, ValueError) as e:
+                    error = str(e)
+
+        _state.update(loaded=True, encoding=encoding, source=source,
+                      seconds=time.perf_counter() - started, error=error)
+        if encoding is None:
+            print(f"Warning: no BPE encoder ({error}); token counts are words * 0.75 estimates. "
+                  f"Set {BPE_PATH_ENV} or pass --bpe-path for exact counts.", file=sys.stderr)
+        return {key: _state[key] for key in ("encoding", "source", "seconds", "error")}
+
+
+def get_encoding():
+    """Return the process-wide encoder, loading it on first use; None if unavailable."""
+    if not _state["loaded"]:
+        configure_encoding()
+    return _state["encoding"]
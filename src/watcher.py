@@ -0,0 +1,217 @@
+"""
+Long-lived watch mode: reprocess workbooks in a directory as they change.
+
+A one-off CLI run pays for interpreter and library imports, the tokenizer
+load and pattern compilation every time, and rebuilds all state from
+scratch. `Watcher` pays those once and then polls an input directory. For
+each new or modified workbook it runs ingest -> semantic paths -> chunking
+and writes `<output_dir>/<stem>_semantic_chunked.jsonl` (the same records as
+`run`), keeping per workbook
+
+- the file's fingerprint (mtime, size) and content digest, so touched but
+  identical files are skipped,
+- its anchor index, to report which sections appeared or disappeared,
+- a `MemoryStageCache` of the previous run's chunk outputs, so only records
+  whose content or semantic path changed are chunked again.
+
+Workbooks whose output is already newer than them at startup are processed
+once without writing, to warm that state. A file is processed once its
+fingerprint has been stable for one poll, so workbooks still being copied
+in are not read half-written. Outputs are
+written to a temporary file and renamed into place. A workbook that fails
+to parse keeps its previous output and is retried when it changes again.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from loguru import logger
+
+from .chunker import chunk_record
+from .compression import with_compression
+from .excel_parser import ExcelParser
+from .models import ExcelIngestionConfig
+from .semantic_path_builder import add_semantic_path
+from .stage_cache import MemoryStageCache, restore_volatile_fields
+from .writers import JsonlWriter
+
+
+WATCH_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv", ".parquet")
+
+
+def _fingerprint(path: Path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class WorkbookState:
+    """What the watcher remembers about one workbook between runs."""
+
+    def __init__(self, max_tokens: int):
+        self.fingerprint = None
+        self.digest: Optional[str] = None
+        self.anchors: Dict[str, Dict[str, Any]] = {}
+        self.cache = MemoryStageCache("chunk", {"max_tokens": max_tokens})
+
+
+class Watcher:
+    """Poll a directory and refresh the chunked output of each changed workbook."""
+
+    def __init__(self, input_dir: str, output_dir: Optional[str] = None,
+                 config: Optional[ExcelIngestionConfig] = None, max_tokens: int = 300,
+                 interval: float = 1.0):
+        """
+        Args:
+            input_dir: Directory to watch (not recursive)
+            output_dir: Where outputs go (defaults to `input_dir`)
+            config: Ingestion config (doc id, reader, compression)
+            max_tokens: Maximum tokens per chunk
+            interval: Seconds between polls
+        """
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir) if output_dir else self.input_dir
+        self.config = config or ExcelIngestionConfig()
+        self.max_tokens = max_tokens
+        self.interval = interval
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Regex patterns are compiled once; the hierarchy context is reset per run
+        self.parser = ExcelParser(self.config)
+        self.states: Dict[Path, WorkbookState] = {}
+        self._seen: Dict[Path, Any] = {}
+
+    def output_path(self, path: Path) -> Path:
+        name = with_compression(f"{path.stem}_semantic_chunked.jsonl", self.config.compression)
+        return self.output_dir / name
+
+    def _workbooks(self) -> List[Path]:
+        return sorted(
+            path for path in self.input_dir.iterdir()
+            if path.is_file() and path.suffix.lower() in WATCH_EXTENSIONS
+            # Skip Office lock files and hidden/temporary files
+            and not path.name.startswith(("~$", "."))
+        )
+
+    def scan(self) -> Tuple[List[Path], List[Path]]:
+        """
+        Return (workbooks that changed and have been stable for one poll,
+        workbooks removed since the last scan).
+        """
+        ready = []
+        current = {}
+        for path in self._workbooks():
+            try:
+                fingerprint = _fingerprint(path)
+            except FileNotFoundError:
+                continue
+            current[path] = fingerprint
+            state = self.states.get(path)
+            if state is not None and state.fingerprint == fingerprint:
+                continue
+            if self._seen.get(path) == fingerprint:
+                ready.append(path)
+        removed = [path for path in self.states if path not in current]
+        for path in removed:
+            del self.states[path]
+        self._seen = current
+        return ready, removed
+
+    def process(self, path: Path) -> Dict[str, Any]:
+        """Ingest, add semantic paths and chunk one workbook; returns run statistics."""
+        output = self.output_path(path)
+        state = self.states.get(path)
+        # First sight of a workbook whose output is current: only warm the state
+        write = not (state is None and output.exists()
+                     and output.stat().st_mtime_ns >= _fingerprint(path)[0])
+        state = self.states.setdefault(path, WorkbookState(self.max_tokens))
+        state.fingerprint = _fingerprint(path)
+        digest = _file_digest(path)
+        if digest == state.digest and output.exists():
+            return {"file": str(path), "status": "unchanged"}
+
+        started = time.perf_counter()
+        self.parser.current_context = {'section': None, 'subsection': None, 'subsubsection': None}
+        anchors: Dict[str, Dict[str, Any]] = {}
+        cache = state.cache
+        temporary = output.with_name(f".{output.name}")
+        writer = JsonlWriter(str(temporary) if write else os.devnull)
+        rows = records = 0
+        try:
+            for row in self.parser.iter_rows(str(path)):
+                record = add_semantic_path(json.loads(row.json()), anchors)
+                key = cache.key(record)
+                chunked = cache.get(key)
+                if chunked is not None:
+                    chunked = restore_volatile_fields(chunked, record)
+                else:
+                    chunked = chunk_record(record, self.max_tokens)
+                    cache.put(key, chunked)
+                writer.write(chunked)
+                rows += 1
+                records += len(chunked)
+            writer.close()
+            if write:
+                os.replace(temporary, output)
+        except Exception:
+            writer.close()
+            if write:
+                temporary.unlink(missing_ok=True)
+            raise
+
+        stats = {
+            "file": str(path),
+            "status": "processed" if write else "warmed",
+            "output": str(output),
+            "rows": rows,
+            "records": records,
+            "reused": cache.stats["hits"],
+            "rechunked": cache.stats["misses"],
+            "added": len(anchors.keys() - state.anchors.keys()) if state.digest else len(anchors),
+            "removed": len(state.anchors.keys() - anchors.keys()) if state.digest else 0,
+            "seconds": time.perf_counter() - started,
+        }
+        cache.next_run()
+        state.anchors = anchors
+        state.digest = digest
+        return stats
+
+    def poll(self, on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+        """Process every ready workbook once; returns how many were processed."""
+        ready, removed = self.scan()
+        for path in removed:
+            if on_result:
+                on_result({"file": str(path), "status": "removed"})
+        processed = 0
+        for path in ready:
+            try:
+                stats = self.process(path)
+            except Exception as e:
+                logger.error(f"Failed to process {path.name}: {e}; keeping the previous output")
+                continue
+            processed += 1
+            if on_result:
+                on_result(stats)
+        return processed
+
+    def run(self, on_result: Optional[Callable[[Dict[str, Any]], None]] = None, once: bool = False) -> None:
+        """Poll until interrupted; with `once`, bring outputs up to date and return."""
+        if once:
+            self.scan()
+            time.sleep(self.interval)
+            self.poll(on_result)
+            return
+        while True:
+            self.poll(on_result)
+            time.sleep(self.interval)
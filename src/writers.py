@@ -0,0 +1,136 @@
+"""
+Incremental record writers shared by streaming stages.
+
+Each writer accepts batches of record dicts and can be closed once the
+stream ends, so output is produced while upstream stages are still running.
+"""
+
+import json
+from typing import List, Dict, Any, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .compression import open_text
+
+
+REF_TYPE = pa.struct([
+    ('text', pa.string()),
+    ('span', pa.list_(pa.int64())),
+    ('type', pa.string()),
+])
+
+# Parquet layout of ingested, semantic and chunked records. Section labels are
+# flattened into columns as in ExcelParser._write_parquet.
+RECORD_SCHEMA = pa.schema([
+    ('doc_id', pa.string()),
+    ('anchor', pa.string()),
+    ('node_id', pa.string()),
+    ('title', pa.string()),
+    ('subtitle', pa.string()),
+    ('content', pa.string()),
+    ('url', pa.string()),
+    ('path', pa.list_(pa.string())),
+    ('parent_anchor', pa.string()),
+    ('block_type', pa.string()),
+    ('order', pa.int64()),
+    ('tokens', pa.int64()),
+    ('confidence', pa.float64()),
+    ('refs', pa.list_(REF_TYPE)),
+    ('hash', pa.string()),
+    ('ingested_at', pa.string()),
+    ('source', pa.struct([('type', pa.string()), ('file', pa.string())])),
+    ('section', pa.string()),
+    ('chapter', pa.string()),
+    ('subsection', pa.string()),
+    ('semantic_path', pa.list_(pa.string())),
+    ('semantic_path_string', pa.string()),
+    ('semantic_content', pa.string()),
+    ('has_children', pa.bool_()),
+    ('child_count', pa.int64()),
+    ('chunk_meta', pa.struct([
+        ('chunk_no', pa.int64()),
+        ('chunk_count', pa.int64()),
+        ('char_span', pa.list_(pa.int64())),
+        ('est_tokens', pa.int64()),
+    ])),
+])
+
+
+def flatten_for_parquet(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten section_labels into section/chapter/subsection columns."""
+    row = dict(record)
+    labels = row.pop('section_labels', None) or {}
+    row['section'] = labels.get('section')
+    row['chapter'] = labels.get('chapter')
+    row['subsection'] = labels.get('subsection')
+    return row
+
+
+# Columns that only exist after the semantic/chunk stages; dropped when null
+# so Parquet rows round-trip to the same dicts as JSONL records.
+STAGE_COLUMNS = ('semantic_path', 'semantic_path_string', 'semantic_content',
+                 'has_children', 'child_count', 'chunk_meta')
+
+
+def record_from_parquet_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `flatten_for_parquet` for a row read back from Parquet."""
+    labels = {
+        'section': row.get('section'),
+        'chapter': row.get('chapter'),
+        'subsection': row.get('subsection'),
+    }
+    record = {}
+    for key, value in row.items():
+        if key == 'section':
+            record['section_labels'] = labels
+        elif key in ('chapter', 'subsection') or (key in STAGE_COLUMNS and value is None):
+            continue
+        else:
+            record[key] = value
+    record.setdefault('section_labels', labels)
+    return record
+
+
+class JsonlWriter:
+    """Append records to a JSONL file."""
+
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.count = 0
+        self._file = open_text(output_file, 'w')
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._file.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        self.count += len(records)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """Write records to a Parquet file, one row group per `row_group_size` records."""
+
+    def __init__(self, output_file: str, schema: pa.Schema = RECORD_SCHEMA,
+                 row_group_size: int = 10_000, compression: Optional[str] = None):
+        self.output_file = output_file
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._writer = pq.ParquetWriter(output_file, schema, compression=compression or "snappy")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._buffer.extend(flatten_for_parquet(r) for r in records)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=self.schema))
+            self.count += len(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()